@@ -1,12 +1,6 @@
 ## __main__.py for NarratorChat
 import sys
-from .tray_app import run_tray
-from .config import log_service_message
+from .cli import main
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1 and sys.argv[1].lower() == "tray":
-        log_service_message("Launching tray manually.")
-        run_tray()
-    else:
-        print("Usage:")
-        print("  python -m __main__.py tray")
+    sys.exit(main())
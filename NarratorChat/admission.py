@@ -0,0 +1,140 @@
+# admission.py
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+DEFAULT_ADMISSION = {
+    "messages_per_second": 2.0,
+    "burst": 20,
+    "user_cooldown_seconds": 1.0,
+    # opt-in: "gg" from many chatters is what chat said, not spam
+    "duplicate_window_seconds": 0.0,
+    "max_length": 300,
+    "max_age_seconds": 60.0,
+    "exempt_moderators": True,
+}
+
+REASONS = ("rate_limited", "user_cooldown", "duplicate")
+
+
+def _dedupe_key(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def truncate(text: str, max_length: int) -> str:
+    """Cut text to max_length characters, backing up to a word boundary when one is close."""
+    if max_length <= 0 or len(text) <= max_length:
+        return text
+    cut = text[:max_length]
+    space = cut.rfind(" ")
+    if space > max_length * 3 // 4:
+        cut = cut[:space]
+    return cut.rstrip()
+
+
+class AdmissionControl:
+    """
+    Decides which chat lines are worth synthesizing before they reach a speech
+    queue, so a raid or spam wave cannot build minutes of backlog:
+      - a global token bucket (messages_per_second, refilled up to burst)
+      - a per-user cooldown between spoken lines
+      - suppression of a line repeated in the same channel within
+        duplicate_window_seconds (off by default)
+      - truncation to max_length characters
+    Any limit set to 0 is off. Moderators skip the bucket and cooldown when
+    exempt_moderators is set. max_age_seconds is enforced by the speech worker
+    when the line comes off the queue. `clock` can be swapped for a fake to
+    replay a synthetic stream.
+    """
+
+    def __init__(self, settings: dict | None = None, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._tokens = 0.0
+        self._refilled_at = clock()
+        self._last_spoken: dict[str, float] = {}
+        self._recent: deque[tuple[float, tuple[str, str]]] = deque()
+        self._recent_counts: dict[tuple[str, str], int] = {}
+        self.admitted = 0
+        self.truncated = 0
+        self.rejected = {reason: 0 for reason in REASONS}
+        self.configure(settings or {})
+        self._tokens = float(self.burst)
+
+    def configure(self, settings: dict) -> None:
+        """Apply new limits, keeping the bucket, cooldowns and recent lines."""
+        cfg = {**DEFAULT_ADMISSION, **settings}
+        with self._lock:
+            self.rate = float(cfg["messages_per_second"])
+            self.burst = max(1, int(cfg["burst"]))
+            self.cooldown = float(cfg["user_cooldown_seconds"])
+            self.duplicate_window = float(cfg["duplicate_window_seconds"])
+            self.max_length = int(cfg["max_length"])
+            self.max_age = float(cfg["max_age_seconds"])
+            self.exempt_moderators = bool(cfg["exempt_moderators"])
+            self._tokens = min(self._tokens, float(self.burst))
+
+    def _forget_recent(self, now: float) -> None:
+        # caller holds the lock
+        horizon = now - self.duplicate_window
+        recent, counts = self._recent, self._recent_counts
+        while recent and recent[0][0] <= horizon:
+            _, key = recent.popleft()
+            if counts[key] == 1:
+                del counts[key]
+            else:
+                counts[key] -= 1
+
+    def _forget_cooldowns(self, now: float) -> None:
+        # caller holds the lock; only runs once the map is large
+        horizon = now - self.cooldown
+        self._last_spoken = {u: t for u, t in self._last_spoken.items() if t > horizon}
+
+    def admit(self, channel: str, username: str, text: str, moderator: bool = False) -> tuple[str | None, str]:
+        """
+        Return (text to speak, "ok"), possibly truncated, or (None, reason)
+        when the line should be dropped. reason is one of REASONS.
+        """
+        now = self.clock()
+        exempt = moderator and self.exempt_moderators
+        with self._lock:
+            key = (channel, _dedupe_key(text))
+            if self.duplicate_window > 0:
+                self._forget_recent(now)
+                if key in self._recent_counts:
+                    self.rejected["duplicate"] += 1
+                    return None, "duplicate"
+            if self.cooldown > 0 and not exempt:
+                last = self._last_spoken.get(username)
+                if last is not None and now - last < self.cooldown:
+                    self.rejected["user_cooldown"] += 1
+                    return None, "user_cooldown"
+            if self.rate > 0 and not exempt:
+                self._tokens = min(float(self.burst), self._tokens + (now - self._refilled_at) * self.rate)
+                self._refilled_at = now
+                if self._tokens < 1.0:
+                    self.rejected["rate_limited"] += 1
+                    return None, "rate_limited"
+                self._tokens -= 1.0
+            if self.duplicate_window > 0:
+                self._recent.append((now, key))
+                self._recent_counts[key] = self._recent_counts.get(key, 0) + 1
+            if self.cooldown > 0:
+                if len(self._last_spoken) >= 10000:
+                    self._forget_cooldowns(now)
+                self._last_spoken[username] = now
+            self.admitted += 1
+            cut = truncate(text, self.max_length)
+            if cut is not text:
+                self.truncated += 1
+            return cut, "ok"
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "admitted": self.admitted,
+                "truncated": self.truncated,
+                **self.rejected,
+                "tokens": self._tokens,
+            }
@@ -0,0 +1,79 @@
+# assigned_voices.py
+import os
+import threading
+import time
+import unicodedata
+from functools import lru_cache
+from .config import ASSIGNED_PATH, load_assigned_voices, log_service_message
+
+
+@lru_cache(maxsize=8192)
+def _normalize(name: str) -> str:
+    # Compose/decompose Unicode to a standard form, then case-insensitive match
+    return unicodedata.normalize("NFKC", name).casefold()
+
+
+def normalize_username(name: str) -> str:
+    """Normalize Twitch username for consistent comparison"""
+    if not isinstance(name, str):
+        return ""
+    return _normalize(name)
+
+
+class AssignedVoicesIndex:
+    """
+    In-memory view of AssignedVoices.json keyed by normalized username.
+    The file is stat'ed at most once per check_interval seconds and reloaded
+    only when its mtime or size changes; keys already seen keep their
+    normalized form so a reload only normalizes new names.
+    """
+
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._stamp: tuple[int, int] | None = None
+        self._next_check = 0.0
+        self._normalized: dict[str, str] = {}
+        self._index: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def load(self, assigned: dict) -> None:
+        """Rebuild the index from a raw name -> voice index mapping."""
+        with self._lock:
+            previous = self._normalized
+            normalized: dict[str, str] = {}
+            index: dict[str, int] = {}
+            for key, val in assigned.items():
+                if not isinstance(val, int) or isinstance(val, bool):
+                    log_service_message(f"Ignoring non-integer voice index for '{key}': {val!r}")
+                    continue
+                norm = previous.get(key)
+                if norm is None:
+                    norm = normalize_username(key)
+                normalized[key] = norm
+                # First entry wins, matching the old linear scan
+                index.setdefault(norm, val)
+            self._normalized = normalized
+            self._index = index
+
+    def refresh(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        try:
+            st = os.stat(ASSIGNED_PATH)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = None
+        if not force and stamp is not None and stamp == self._stamp:
+            return
+        self._stamp = stamp
+        self.load(load_assigned_voices())
+
+    def lookup(self, username: str) -> int | None:
+        """Return the manually assigned voice index for username, if any."""
+        self.refresh()
+        return self._index.get(normalize_username(username))
@@ -0,0 +1,221 @@
+# audio_cache.py
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from .backends import SAMPLE_RATE, SAMPLE_WIDTH, CHANNELS
+from .config import log_service_message
+
+# keys used once and not yet on disk that are remembered for disk_min_uses
+SEEN_KEYS = 10000
+
+
+def cache_key(voice_id: str, text: str) -> str:
+    fmt = f"{SAMPLE_RATE}:{SAMPLE_WIDTH}:{CHANNELS}"
+    return hashlib.sha256(f"{fmt}\0{voice_id}\0{text}".encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """
+    Content-addressed cache of rendered PCM keyed by (voice id, text).
+    A memory LRU tier holds up to max_bytes; with a folder set, entries used
+    disk_min_uses times are also written there and read back on a memory
+    miss, evicting the least recently used files once max_disk_bytes is
+    exceeded. Most chat lines are said once, so only repeats reach the disk.
+    Texts longer than max_text_length are not cached.
+    A disk_index saved from disk_index() replaces the startup folder scan;
+    the folder is then reconciled with it on a background thread.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, folder: str | None = None,
+                 max_disk_bytes: int = 256 * 1024 * 1024, max_text_length: int = 200,
+                 disk_index: list | None = None, disk_min_uses: int = 2):
+        self.max_bytes = max_bytes
+        self.folder = folder
+        self.max_disk_bytes = max_disk_bytes
+        self.max_text_length = max_text_length
+        self.disk_min_uses = disk_min_uses
+        # uses so far of keys not on disk yet, oldest first
+        self._seen: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: OrderedDict[str, int] = OrderedDict()
+        self._disk_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if not folder:
+            return
+        if disk_index is None:
+            self._scan_disk()
+            return
+        try:
+            for key, size in disk_index:
+                self._disk[str(key)] = int(size)
+                self._disk_bytes += int(size)
+        except (TypeError, ValueError):
+            self._disk.clear()
+            self._disk_bytes = 0
+            self._scan_disk()
+            return
+        threading.Thread(target=self._reconcile, name="AudioCacheScan", daemon=True).start()
+
+    def _list_disk(self) -> list[tuple[float, str, int]] | None:
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            entries = []
+            for entry in os.scandir(self.folder):
+                if entry.name.endswith(".pcm"):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, entry.name[:-4], st.st_size))
+        except OSError as e:
+            log_service_message(f"Audio cache folder unavailable, memory only: {e}")
+            self.folder = None
+            return None
+        return sorted(entries)
+
+    def _scan_disk(self) -> None:
+        for _, key, size in self._list_disk() or ():
+            self._disk[key] = size
+            self._disk_bytes += size
+
+    def _reconcile(self) -> None:
+        """Bring a restored disk index in line with the folder's actual contents."""
+        entries = self._list_disk()
+        if entries is None:
+            return
+        on_disk = {key: size for _, key, size in entries}
+        with self._lock:
+            # a key written since the scan started is not in on_disk but exists
+            for key in [k for k in self._disk if k not in on_disk and not os.path.exists(self._path(k))]:
+                self._disk_bytes -= self._disk.pop(key)
+            # files the index missed (e.g. after a crash) count as least recently used
+            missing = [(key, size) for key, size in on_disk.items() if key not in self._disk]
+            if missing:
+                self._disk = OrderedDict(missing + list(self._disk.items()))
+                self._disk_bytes += sum(size for _, size in missing)
+
+    def disk_index(self) -> list[list]:
+        """[key, size] pairs for the disk tier, least recently used first."""
+        with self._lock:
+            return [[key, size] for key, size in self._disk.items()]
+
+    def cacheable(self, text: str) -> bool:
+        return len(text) <= self.max_text_length
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.folder, key + ".pcm")
+
+    def _remember(self, key: str, pcm: bytes) -> None:
+        # caller holds the lock
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        if len(pcm) > self.max_bytes:
+            return
+        self._memory[key] = pcm
+        self._memory_bytes += len(pcm)
+        while self._memory_bytes > self.max_bytes:
+            _, old = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old)
+            self.evictions += 1
+
+    def _used(self, key: str) -> bool:
+        """Count one use of a key not on disk; True once it has earned a disk copy. Caller holds the lock."""
+        uses = self._seen.pop(key, 0) + 1
+        if uses >= self.disk_min_uses:
+            return True
+        self._seen[key] = uses
+        if len(self._seen) > SEEN_KEYS:
+            self._seen.popitem(last=False)
+        return False
+
+    def get(self, voice_id: str, text: str) -> bytes | None:
+        key = cache_key(voice_id, text)
+        with self._lock:
+            pcm = self._memory.get(key)
+            if pcm is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                promote = bool(self.folder) and key not in self._disk and self._used(key)
+            on_disk = key in self._disk
+        if pcm is not None:
+            if promote:
+                self._write_disk(key, pcm)
+            return pcm
+        if on_disk:
+            try:
+                with open(self._path(key), "rb") as f:
+                    pcm = f.read()
+            except OSError:
+                pcm = None
+            with self._lock:
+                if pcm is None:
+                    self._disk_bytes -= self._disk.pop(key, 0)
+                else:
+                    self._disk.move_to_end(key)
+                    self._remember(key, pcm)
+                    self.disk_hits += 1
+                    return pcm
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, voice_id: str, text: str, pcm: bytes) -> None:
+        if not self.cacheable(text):
+            return
+        key = cache_key(voice_id, text)
+        with self._lock:
+            self._remember(key, pcm)
+            if not self.folder or key in self._disk or not self._used(key):
+                return
+        self._write_disk(key, pcm)
+
+    def _write_disk(self, key: str, pcm: bytes) -> None:
+        path = self._path(key)
+        temp_path = path + ".tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(pcm)
+            os.replace(temp_path, path)
+        except OSError as e:
+            log_service_message(f"Failed to write audio cache entry: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        stale = []
+        with self._lock:
+            if key in self._disk:
+                # written twice at once; keep one entry
+                return
+            self._disk[key] = len(pcm)
+            self._disk_bytes += len(pcm)
+            while self._disk_bytes > self.max_disk_bytes and len(self._disk) > 1:
+                old, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                stale.append(old)
+        for old in stale:
+            try:
+                os.remove(self._path(old))
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._memory),
+                "bytes": self._memory_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+            }
@@ -0,0 +1,371 @@
+# backends.py
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from .config import log_service_message
+from .voice_pool import VoicePool
+
+# PCM format produced by synthesize(): 22kHz, 16-bit, mono
+SAMPLE_RATE = 22050
+SAMPLE_WIDTH = 2
+CHANNELS = 1
+SAFT22kHz16BitMono = 22
+# SpeechVoiceSpeakFlags
+SVSFlagsAsync = 1
+SVSFPurgeBeforeSpeak = 2
+# how often an async Speak checks for interrupt(), in milliseconds
+INTERRUPT_POLL_MS = 50
+# registry keys (under HKEY_LOCAL_MACHINE and HKEY_CURRENT_USER) whose
+# subkeys are the installed voice tokens and token enumerators
+VOICE_TOKEN_KEYS = (
+    r"SOFTWARE\Microsoft\Speech\Voices\Tokens",
+    r"SOFTWARE\Microsoft\Speech\Voices\TokenEnums",
+    r"SOFTWARE\Microsoft\Speech_OneCore\Voices\Tokens",
+)
+
+
+@dataclass(frozen=True)
+class VoiceInfo:
+    id: str
+    description: str
+
+    @property
+    def preferred(self) -> bool:
+        return "(Natural)" in self.description and "Online" in self.description
+
+
+class SpeechBackend:
+    """
+    Interface between the bot and a synthesizer.
+    thread_init/thread_exit run on any thread that will call create_voice(),
+    speak() or synthesize(), so backends needing per-thread setup (COM
+    apartments) can do it there. list_voices() may be called from any thread.
+    """
+
+    def thread_init(self) -> None:
+        pass
+
+    def thread_exit(self) -> None:
+        pass
+
+    def list_voices(self) -> list[VoiceInfo]:
+        raise NotImplementedError
+
+    def voice_stamp(self) -> str | None:
+        """
+        Cheap marker that changes when voices are installed or removed,
+        without enumerating them; None if the backend has none.
+        """
+        return None
+
+    def create_voice(self, voice_id: str):
+        """Return a new backend-specific voice instance bound to voice_id."""
+        raise NotImplementedError
+
+    def speak(self, voice_id: str, text: str) -> None:
+        raise NotImplementedError
+
+    def synthesize(self, voice_id: str, text: str) -> bytes:
+        """Render text to raw PCM in the SAMPLE_RATE/SAMPLE_WIDTH/CHANNELS format."""
+        raise NotImplementedError
+
+    def play(self, pcm: bytes) -> None:
+        """Play PCM returned by synthesize(), blocking until it finishes."""
+        raise NotImplementedError
+
+    def interrupt(self, thread: int | None = None) -> None:
+        """
+        Cut short the speak()/play() calls playing now, callable from any
+        thread. With a thread ident only that thread's call is cut, else
+        every thread's. Later calls play normally.
+        """
+        pass
+
+    def set_output(self, device: str) -> None:
+        """Send this thread's speak()/play() audio to the output device whose name contains `device`."""
+        pass
+
+    def voice_stats(self) -> dict:
+        """Voice instance pool counters: hits, misses, evictions, live."""
+        return {"hits": 0, "misses": 0, "evictions": 0, "live": 0}
+
+
+class SapiBackend(SpeechBackend):
+    """
+    Speaks through SAPI.SpVoice. COM objects are bound to the apartment of
+    the thread that made them, so each thread gets its own VoicePool (and a
+    second one for synthesize(), whose instances write to memory streams).
+    """
+
+    def __init__(self, max_voice_instances: int = 0):
+        self.max_voice_instances = max_voice_instances
+        self._local = threading.local()
+        self._pools: list[VoicePool] = []
+        self._retired = {"hits": 0, "misses": 0, "evictions": 0, "live": 0}
+        self._pools_lock = threading.Lock()
+        # bumped by interrupt(); a Speak started under an older value is purged
+        self._generation = 0
+        # bumped by interrupt(thread), by thread ident
+        self._thread_generations: dict[int, int] = {}
+
+    def thread_init(self) -> None:
+        import pythoncom
+        pythoncom.CoInitialize()
+        self._local.voices = VoicePool(self.create_voice, self.max_voice_instances)
+        self._local.renderers = VoicePool(self.create_voice, self.max_voice_instances)
+        self._local.player = None
+        self._local.device = ""
+        with self._pools_lock:
+            self._pools += [self._local.voices, self._local.renderers]
+
+    def thread_exit(self) -> None:
+        import pythoncom
+        with self._pools_lock:
+            for pool in (self._local.voices, self._local.renderers):
+                for key, val in pool.stats().items():
+                    if key != "live":
+                        self._retired[key] += val
+                pool.clear()
+                self._pools.remove(pool)
+        self._local.player = None
+        pythoncom.CoUninitialize()
+
+    def voice_stats(self) -> dict:
+        with self._pools_lock:
+            stats = dict(self._retired)
+            for pool in self._pools:
+                for key, val in pool.stats().items():
+                    stats[key] += val
+        return stats
+
+    def list_voices(self) -> list[VoiceInfo]:
+        import pythoncom
+        import win32com.client as wincl
+        pythoncom.CoInitialize()
+        try:
+            tokens = wincl.Dispatch("SAPI.SpVoice").GetVoices()
+            voices = []
+            for i in range(tokens.Count):
+                tok = tokens.Item(i)
+                voices.append(VoiceInfo(tok.Id, tok.GetDescription()))
+            return voices
+        finally:
+            pythoncom.CoUninitialize()
+
+    def voice_stamp(self) -> str | None:
+        # subkey count and last-write time of each token key: adding or
+        # deleting a token changes both, and reading them is a few registry
+        # calls, where GetVoices() loads every token (and voice adapter)
+        import winreg
+        parts = []
+        for hive in (winreg.HKEY_LOCAL_MACHINE, winreg.HKEY_CURRENT_USER):
+            for path in VOICE_TOKEN_KEYS:
+                try:
+                    with winreg.OpenKey(hive, path) as key:
+                        subkeys, _, modified = winreg.QueryInfoKey(key)
+                    parts.append(f"{subkeys}:{modified}")
+                except OSError:
+                    parts.append("-")
+        return "|".join(parts)
+
+    def create_voice(self, voice_id: str):
+        import win32com.client as wincl
+        inst = wincl.Dispatch("SAPI.SpVoice")
+        tokens = inst.GetVoices()
+        for i in range(tokens.Count):
+            tok = tokens.Item(i)
+            if tok.Id == voice_id:
+                inst.Voice = tok
+                break
+        else:
+            log_service_message(f"Voice token not found, using default: {voice_id}")
+        self._route(inst)
+        return inst
+
+    def set_output(self, device: str) -> None:
+        self._local.device = device
+        # instances made before this still point at the old device
+        self._local.voices.clear()
+        self._local.player = None
+
+    def _route(self, inst) -> None:
+        device = getattr(self._local, "device", "")
+        if not device:
+            return
+        outputs = inst.GetAudioOutputs()
+        for i in range(outputs.Count):
+            tok = outputs.Item(i)
+            if device.lower() in tok.GetDescription().lower():
+                inst.AudioOutput = tok
+                return
+        log_service_message(f"Audio output not found, using default: {device}")
+
+    def _current_generation(self) -> tuple[int, int]:
+        return self._generation, self._thread_generations.get(threading.get_ident(), 0)
+
+    def _wait(self, inst, generation: tuple[int, int]) -> None:
+        while not inst.WaitUntilDone(INTERRUPT_POLL_MS):
+            if self._current_generation() != generation:
+                inst.Speak("", SVSFPurgeBeforeSpeak)
+                return
+
+    def interrupt(self, thread: int | None = None) -> None:
+        if thread is None:
+            self._generation += 1
+        else:
+            self._thread_generations[thread] = self._thread_generations.get(thread, 0) + 1
+
+    def speak(self, voice_id: str, text: str) -> None:
+        generation = self._current_generation()
+        inst = self._local.voices.get(voice_id)
+        inst.Speak(text, SVSFlagsAsync)
+        self._wait(inst, generation)
+
+    @staticmethod
+    def _memory_stream():
+        import win32com.client as wincl
+        stream = wincl.Dispatch("SAPI.SpMemoryStream")
+        fmt = stream.Format
+        fmt.Type = SAFT22kHz16BitMono
+        stream.Format = fmt
+        return stream
+
+    def synthesize(self, voice_id: str, text: str) -> bytes:
+        inst = self._local.renderers.get(voice_id)
+        stream = self._memory_stream()
+        inst.AudioOutputStream = stream
+        inst.Speak(text)
+        return bytes(stream.GetData())
+
+    def play(self, pcm: bytes) -> None:
+        import win32com.client as wincl
+        generation = self._current_generation()
+        if self._local.player is None:
+            self._local.player = wincl.Dispatch("SAPI.SpVoice")
+            self._route(self._local.player)
+        stream = self._memory_stream()
+        stream.SetData(pcm)
+        self._local.player.SpeakStream(stream, SVSFlagsAsync)
+        self._wait(self._local.player, generation)
+
+
+DEFAULT_FAKE_VOICES = [
+    VoiceInfo(f"fake:natural:{i}", f"Microsoft Fake{i} Online (Natural) - English")
+    for i in range(8)
+] + [VoiceInfo("fake:desktop:0", "Microsoft Fake Desktop - English")]
+
+
+class FakeBackend(SpeechBackend):
+    """
+    Deterministic stand-in synthesizer for tests and benchmarks off Windows.
+    Each synthesis takes latency + per_char * len(text) seconds and yields
+    PCM whose length follows the text; list_voices() takes list_latency,
+    voice_stamp() stamp_latency and play() play_latency. speak() takes the synthesis time plus
+    play_latency, like Speak() on a voice. speak() calls are recorded in
+    `spoken` as (voice_id, text, start, end) and play() calls in `played` as
+    (pcm_length, start, end), using time.monotonic(); interrupt() ends the
+    speak()/play() calls in progress early. Both also go to `outputs` as
+    (device, start, end), the device being the calling thread's set_output().
+    """
+
+    def __init__(self, latency: float = 0.0, per_char: float = 0.0,
+                 voices: list[VoiceInfo] | None = None, list_latency: float = 0.0,
+                 play_latency: float = 0.0, stamp_latency: float = 0.0):
+        self.latency = latency
+        self.per_char = per_char
+        self.list_latency = list_latency
+        self.play_latency = play_latency
+        self.stamp_latency = stamp_latency
+        self.voices = list(DEFAULT_FAKE_VOICES if voices is None else voices)
+        self.spoken: list[tuple[str, str, float, float]] = []
+        self.played: list[tuple[int, float, float]] = []
+        self.synthesized = 0
+        self.pool = VoicePool(self.create_voice)
+        self._lock = threading.Lock()
+        self._interrupted = threading.Condition()
+        self._generation = 0
+        self._thread_generations: dict[int, int] = {}
+        self.outputs: list[tuple[str, float, float]] = []
+        self._local = threading.local()
+
+    def list_voices(self) -> list[VoiceInfo]:
+        if self.list_latency:
+            time.sleep(self.list_latency)
+        return list(self.voices)
+
+    def voice_stamp(self) -> str | None:
+        if self.stamp_latency:
+            time.sleep(self.stamp_latency)
+        return hashlib.md5("\0".join(sorted(v.id for v in self.voices)).encode("utf-8")).hexdigest()
+
+    def create_voice(self, voice_id: str):
+        return voice_id
+
+    def _delay(self, text: str) -> None:
+        delay = self.latency + self.per_char * len(text)
+        if delay:
+            time.sleep(delay)
+
+    def _current_generation(self) -> tuple[int, int]:
+        return self._generation, self._thread_generations.get(threading.get_ident(), 0)
+
+    def _sleep(self, seconds: float, generation: tuple[int, int]) -> None:
+        """Sleep, returning early once interrupt() reaches this thread."""
+        if seconds > 0:
+            with self._interrupted:
+                self._interrupted.wait_for(lambda: self._current_generation() != generation, seconds)
+
+    def interrupt(self, thread: int | None = None) -> None:
+        with self._interrupted:
+            if thread is None:
+                self._generation += 1
+            else:
+                self._thread_generations[thread] = self._thread_generations.get(thread, 0) + 1
+            self._interrupted.notify_all()
+
+    def set_output(self, device: str) -> None:
+        self._local.device = device
+
+    def peak_overlap(self) -> int:
+        """Most speak()/play() calls that were playing at the same moment."""
+        with self._lock:
+            edges = sorted([(start, 1) for _, start, _ in self.outputs] +
+                           [(end, -1) for _, _, end in self.outputs])
+        peak = current = 0
+        for _, step in edges:
+            current += step
+            peak = max(peak, current)
+        return peak
+
+    def voice_stats(self) -> dict:
+        return self.pool.stats()
+
+    def speak(self, voice_id: str, text: str) -> None:
+        generation = self._current_generation()
+        self.pool.get(voice_id)
+        start = time.monotonic()
+        self._sleep(self.latency + self.per_char * len(text) + self.play_latency, generation)
+        end = time.monotonic()
+        with self._lock:
+            self.spoken.append((voice_id, text, start, end))
+            self.outputs.append((getattr(self._local, "device", ""), start, end))
+
+    def synthesize(self, voice_id: str, text: str) -> bytes:
+        self.pool.get(voice_id)
+        self._delay(text)
+        with self._lock:
+            self.synthesized += 1
+        # ~60ms of audio per character
+        size = len(text) * SAMPLE_RATE * SAMPLE_WIDTH * CHANNELS * 6 // 100
+        seed = hashlib.md5(f"{voice_id}\0{text}".encode("utf-8")).digest()
+        return (seed * (size // len(seed) + 1))[:size]
+
+    def play(self, pcm: bytes) -> None:
+        generation = self._current_generation()
+        start = time.monotonic()
+        self._sleep(self.play_latency, generation)
+        end = time.monotonic()
+        with self._lock:
+            self.played.append((len(pcm), start, end))
+            self.outputs.append((getattr(self._local, "device", ""), start, end))
@@ -1,87 +1,104 @@
 # bot_logic.py
-import os
-import json
 import threading
 import time
 import traceback
-import pythoncom
-import socket
 import hashlib
-import win32com.client as wincl
-import re
-import unicodedata
-from datetime import datetime
-from .config import log_service_message, load_config, load_assigned_voices
+from collections import deque
+from .admission import AdmissionControl
+from .config import AUDIO_CACHE_FOLDER, CONFIG_STORE, configure_logging, log_service_message
+from .audio_cache import AudioCache
+from .assigned_voices import AssignedVoicesIndex
+from .normalize import TextNormalizer
+from .backends import SpeechBackend, SapiBackend
+from .speech_queue import SpeechItem, merge_stats
+from .state import RuntimeState
+from .channels import ChannelState, configured_channels, normalize_channel
+from .voice_catalog import catalog_for
+from .irc import IrcConnection, IrcMessage, parse_message
+from .metrics import METRICS, MetricsReporter, MetricsServer
+from .profiling import SLOW_MESSAGES, Profiler
 
 TWITCH_HOST = "irc.chat.twitch.tv"
 TWITCH_PORT = 6667
+RECONNECT_BASE_DELAY = 1.0
+RECONNECT_MAX_DELAY = 60.0
+# Twitch allows 20 JOINs per 10 seconds for regular accounts
+JOIN_RATE_LIMIT = 20
+JOIN_RATE_WINDOW = 10.0
+# longest wait for the old listener during reconnect()
+LISTENER_JOIN_TIMEOUT = 3.0
+
+# TwitchBot.status values and the moves allowed between them
+STOPPED = "stopped"
+STARTING = "starting"
+CONNECTED = "connected"
+RECONNECTING = "reconnecting"
+STOPPING = "stopping"
+_TRANSITIONS = {
+    STOPPED: {STARTING},
+    STARTING: {CONNECTED, RECONNECTING, STOPPING},
+    CONNECTED: {RECONNECTING, STOPPING},
+    RECONNECTING: {CONNECTED, STOPPING},
+    STOPPING: {STOPPED},
+}
 
-def normalize_username(name: str) -> str:
-    """Normalize Twitch username for consistent comparison"""
-    if not isinstance(name, str):
-        return ""
-    # Compose/decompose Unicode to a standard form
-    name = unicodedata.normalize("NFKC", name)
-    # Case-insensitive match
-    return name.casefold()
 
+def stable_hash(username: str) -> int:
+    return int(hashlib.md5(username.encode("utf-8")).hexdigest(), 16)
 
-def apply_substitutions(text: str) -> str:
-    for rule in load_config().get("substitutions", []):
-        try:
-            text = re.sub(rule["pattern"], rule["replacement"], text, flags=re.IGNORECASE)
-        except re.error as e:
-            log_service_message(f"Regex error: {e}")
-    return text
 
+_backend: SpeechBackend = SapiBackend(CONFIG_STORE.get().get("voice_pool", {}).get("max_instances", 0))
 
-def stable_hash(username: str) -> int:
-    return int(hashlib.md5(username.encode("utf-8")).hexdigest(), 16)
+
+def get_backend() -> SpeechBackend:
+    return _backend
 
 
-def get_voice_lists():
+def set_backend(backend: SpeechBackend) -> None:
+    """Swap the synthesizer used by the voice helpers and new TwitchBots (e.g. FakeBackend)."""
+    global _backend
+    _backend = backend
+
+
+def get_voice_lists(backend: SpeechBackend | None = None):
     """
-    Returns two lists of SAPI tokens:
+    Returns two lists of VoiceInfo from the cached voice catalog:
       - preferred: voices whose description contains "(Natural)" and "Online"
       - fallback: all remaining voices
     """
-    pythoncom.CoInitialize()
-    try:
-        probe = wincl.Dispatch("SAPI.SpVoice")
-        tokens = probe.GetVoices()
-        preferred, fallback = [], []
-        for i in range(tokens.Count):
-            tok = tokens.Item(i)
-            desc = tok.GetDescription()
-            if "(Natural)" in desc and "Online" in desc:
-                preferred.append(tok)
-            else:
-                fallback.append(tok)
-        return preferred, fallback
-    finally:
-        pythoncom.CoUninitialize()
+    return catalog_for(backend or _backend).lists()
+
 
+def refresh_voice_catalog(backend: SpeechBackend | None = None) -> None:
+    """Forget the cached voice list so the next lookup re-enumerates installed voices."""
+    catalog_for(backend or _backend).invalidate()
+    log_service_message("Voice catalog invalidated")
 
-def test_voice_indices():
+
+def test_voice_indices(backend: SpeechBackend | None = None, thread_ready: bool = False):
     """
     Announce totals and then speak each 'preferred' voice by index.
+    thread_ready: the calling thread has already run backend.thread_init().
     """
-    preferred, fallback = get_voice_lists()
+    backend = backend or _backend
+    preferred, fallback = get_voice_lists(backend)
     pool = preferred if preferred else fallback
     pref_count = len(preferred)
     fall_count = len(fallback)
     total = pref_count + fall_count
+    if not pool:
+        log_service_message("No voices installed")
+        return
 
-    pythoncom.CoInitialize()
+    if not thread_ready:
+        backend.thread_init()
     try:
-        probe = wincl.Dispatch("SAPI.SpVoice")
-        probe.Speak(f"Voice check: {total} total; {pref_count} preferred; {fall_count} others")
+        backend.speak(pool[0].id, f"Voice check: {total} total; {pref_count} preferred; {fall_count} others")
         time.sleep(0.5)
         for idx, voice in enumerate(pool):
-            desc = voice.GetDescription()
+            desc = voice.description
             try:
-                probe.Voice = voice
-                probe.Speak(f"Voice {idx}: {desc}")
+                backend.speak(voice.id, f"Voice {idx}: {desc}")
                 log_service_message(f"Spoke index {idx}: '{desc}'")
             except Exception as e:
                 log_service_message(f"Failed voice {idx} '{desc}': {e}")
@@ -90,169 +107,662 @@ def test_voice_indices():
             f"Completed voice index test using {'preferred' if preferred else 'fallback'} pool (size {len(pool)})"
         )
     finally:
-        pythoncom.CoUninitialize()
+        if not thread_ready:
+            backend.thread_exit()
 
 
-def speak_voice_index(index: int, extra_text: str = ""):
+def speak_voice_index(index: int, extra_text: str = "", backend: SpeechBackend | None = None,
+                      thread_ready: bool = False):
     """
     Speak 'Voice {index}' from preferred pool (or fallback),
     appending any extra_text provided.
     """
-    preferred, fallback = get_voice_lists()
+    backend = backend or _backend
+    preferred, fallback = get_voice_lists(backend)
     pool = preferred if preferred else fallback
     count = len(pool)
     if index < 0 or index >= count:
         log_service_message(f"Invalid voice index: {index}")
         return
 
-    pythoncom.CoInitialize()
+    if not thread_ready:
+        backend.thread_init()
     try:
-        probe = wincl.Dispatch("SAPI.SpVoice")
         voice = pool[index]
-        desc = voice.GetDescription()
-        probe.Voice = voice
-        message = f"Voice {index}: {desc}"
+        message = f"Voice {index}: {voice.description}"
         if extra_text:
             message += f". {extra_text}"
-        probe.Speak(message)
+        backend.speak(voice.id, message)
         log_service_message(f"Spoken voice index {index}: '{message}'")
     finally:
-        pythoncom.CoUninitialize()
+        if not thread_ready:
+            backend.thread_exit()
 
 
 class TwitchBot:
-    def __init__(self, shutdown_event: threading.Event):
+    """
+    Twitch chat reader feeding one speech queue per channel.
+
+    Lifecycle: stopped -> starting -> connected <-> reconnecting -> stopping
+    -> stopped (see status). Each listener thread gets its own stop event and
+    is joined before a replacement starts, so reconnect() never leaves two
+    readers; queues, workers and caches carry over. stop() drains the speech
+    queues for a bounded time and returns once every thread has exited or
+    the deadline passes. shutdown_event stops everything when set.
+    """
+
+    def __init__(self, shutdown_event: threading.Event, backend: SpeechBackend | None = None):
         self.shutdown_event = shutdown_event
-        self.config = load_config()
+        self.status = STOPPED
+        self._status_cond = threading.Condition()
+        self._lifecycle_lock = threading.Lock()
+        # set to end the current listener (and its backoff waits)
+        self._listen_stop = threading.Event()
+        # read-only snapshot from the shared store, replaced by _on_config_change
+        self.config = CONFIG_STORE.get()
+        configure_logging(self.config)
         self.tts_enabled = self.config.get("tts_enabled", True)
-        self.socket: socket.socket | None = None
+        self.connection = IrcConnection(TWITCH_HOST, TWITCH_PORT)
         self.connected = False
+        self.received = 0
+        # when each recent JOINed channel was sent, for JOIN_RATE_LIMIT
+        self._joins: deque[float] = deque()
+        self._join_lock = threading.Lock()
+        self.backend = backend or _backend
         # load preferred list for chat assignments
-        self.preferred_voices, _ = get_voice_lists()
-        self.voice_index_shift = self.config.get("voice_index", 0)
-        self.user_voice_map: dict[str, wincl.CDispatch] = {}
+        self.preferred_voices, _ = get_voice_lists(self.backend)
+        self._voices_lock = threading.Lock()
+        self.assigned_voices = AssignedVoicesIndex()
+        # hashed base voice index per chatter (before each channel's shift);
+        # voice instances live in the backend's pool
+        self.user_voice_index: dict[str, int] = {}
+        self.max_users = self.config.get("voice_pool", {}).get("max_users", 50000)
+        # warm state from the last run; sections are read on first use
+        state_cfg = self.config.get("state", {})
+        self.state = RuntimeState() if state_cfg.get("persist", True) else None
+        self.state_interval = state_cfg.get("save_seconds", 300)
+        self.state_thread: threading.Thread | None = None
+        self._users_restored = self.state is None
         self.listen_thread: threading.Thread | None = None
+        self._apply_priorities()
+        # chat cleanup around the substitutions; follows the shared config
+        self.normalizer = TextNormalizer()
+        # global rate, per-user cooldown, duplicate and length limits
+        self.admission = AdmissionControl(self.config.get("admission", {}))
+        cache_cfg = self.config.get("audio_cache", {})
+        self.audio_cache = None
+        if cache_cfg.get("enabled", True):
+            disk = cache_cfg.get("disk", True)
+            self.audio_cache = AudioCache(
+                int(cache_cfg.get("max_memory_mb", 32) * 1024 * 1024),
+                AUDIO_CACHE_FOLDER if disk else None,
+                int(cache_cfg.get("max_disk_mb", 256) * 1024 * 1024),
+                cache_cfg.get("max_text_length", 200),
+                self.state.section("audio_cache") if self.state and disk else None,
+                cache_cfg.get("disk_min_uses", 2),
+            )
+        # each channel speaks from its own queue and worker, so the socket
+        # reader never blocks on Speak
+        self.channels: dict[str, ChannelState] = {}
+        self._sync_channels()
+        METRICS.set_gauge("speech_queue_depth",
+                          lambda: sum(len(c.speech_queue) for c in list(self.channels.values())))
+        metrics_cfg = self.config.get("metrics", {})
+        self.metrics_reporter = MetricsReporter(shutdown_event, metrics_cfg.get("summary_seconds", 300))
+        self.metrics_server: MetricsServer | None = None
+        if metrics_cfg.get("http_enabled", False):
+            try:
+                self.metrics_server = MetricsServer(port=metrics_cfg.get("http_port", 9464))
+                self.metrics_server.start()
+            except OSError as e:
+                log_service_message(f"Metrics endpoint unavailable: {e}")
+        # on-demand stack sampling of the listener and speech threads
+        self.profiler = Profiler()
+        CONFIG_STORE.subscribe(self._on_config_change)
+
+    def _apply_priorities(self):
+        queue_cfg = self.config.get("speech_queue", {})
+        self.assigned_priority = queue_cfg.get("assigned_priority", 1)
+        self.moderator_priority = queue_cfg.get("moderator_priority", 2)
+
+    def _sync_channels(self) -> tuple[list[str], list[str]]:
+        """
+        Create state for newly configured channels and retire removed ones.
+        The dict is replaced rather than mutated so the listener can keep
+        reading it. Returns the (added, removed) channel names.
+        """
+        wanted = configured_channels(self.config)
+        channels = {}
+        added = []
+        for name in wanted:
+            channel = self.channels.get(name)
+            if channel is None:
+                channel = ChannelState(name, self.config, self.backend, self.shutdown_event, self.audio_cache)
+                added.append(name)
+            else:
+                channel.apply_config(self.config)
+            channels[name] = channel
+        removed = [name for name in self.channels if name not in channels]
+        for name in removed:
+            self.channels[name].speech_worker.stop()
+            self.channels[name].substitutions.close()
+        self.channels = channels
+        return added, removed
+
+    def _set_status(self, status: str) -> bool:
+        with self._status_cond:
+            if status == self.status:
+                return True
+            if status not in _TRANSITIONS[self.status]:
+                log_service_message(f"Ignoring bot status change {self.status} -> {status}", "debug")
+                return False
+            log_service_message(f"Bot status {self.status} -> {status}", "debug")
+            self.status = status
+            self._status_cond.notify_all()
+            return True
+
+    def wait_status(self, status: str, timeout: float | None = None) -> bool:
+        with self._status_cond:
+            return self._status_cond.wait_for(lambda: self.status == status, timeout)
+
+    def _on_config_change(self, config):
+        """Apply a new config snapshot in place: voices, TTS switch, priorities and channels."""
+        if self.shutdown_event.is_set() or self.status in (STOPPING, STOPPED):
+            return
+        old_irc = self.config.get("irc", {})
+        self.config = config
+        configure_logging(config)
+        self.tts_enabled = config.get("tts_enabled", True)
+        self._apply_priorities()
+        self.admission.configure(config.get("admission", {}))
+        SLOW_MESSAGES.configure(config.get("profiling", {}))
+        self.profiler.configure(config.get("profiling", {}))
+        added, removed = self._sync_channels()
+        for name in added:
+            self.channels[name].speech_worker.start()
+        if not self.connected:
+            return
+        irc = config.get("irc", {})
+        if any(irc.get(k) != old_irc.get(k) for k in ("username", "oauth", "host", "port")):
+            log_service_message("IRC login settings changed; use Reconnect to apply them")
+        try:
+            if removed:
+                self.connection.send_line("PART " + ",".join(removed))
+        except (OSError, ConnectionError) as e:
+            log_service_message(f"Failed to update joined channels: {e}")
+        if added:
+            # may wait out the JOIN rate limit; keep the config watcher free
+            threading.Thread(target=self._join_added, args=(added, self._listen_stop),
+                             name="ChannelJoiner", daemon=True).start()
 
     def start(self):
+        with self._lifecycle_lock:
+            if self.shutdown_event.is_set():
+                log_service_message("TwitchBot was shut down; create a new one to start again")
+                return
+            if not self._set_status(STARTING):
+                return
+            self._start()
+
+    def _start(self):
         log_service_message("TwitchBot starting")
-        pythoncom.CoInitialize()
-        self.config = load_config()
+        CONFIG_STORE.start()
+        self.config = CONFIG_STORE.get()
+        configure_logging(self.config)
         self.tts_enabled = self.config.get("tts_enabled", True)
-        self._connect_to_twitch()
-        if self.connected:
-            self._start_listening()
-
-    def _connect_to_twitch(self):
+        self._apply_priorities()
+        self._sync_channels()
+        for channel in self.channels.values():
+            channel.speech_worker.start()
+        self.metrics_reporter.start()
+        if self.state and self.state_interval > 0 and not (self.state_thread and self.state_thread.is_alive()):
+            self.state_thread = threading.Thread(target=self._state_loop, name="StateSaver", daemon=True)
+            self.state_thread.start()
+        # the listener connects (and retries with backoff) on its own thread
+        self._listen_stop = threading.Event()
+        self._start_listening(self._listen_stop)
+        SLOW_MESSAGES.configure(self.config.get("profiling", {}))
+        self.profiler.configure(self.config.get("profiling", {}))
+
+    def _connect_to_twitch(self, stop: threading.Event):
+        irc = self.config["irc"]
         try:
-            self.socket = socket.socket()
-            self.socket.connect((TWITCH_HOST, TWITCH_PORT))
-            irc = self.config["irc"]
-            self.socket.sendall(f"PASS {irc['oauth']}\r\n".encode())
-            self.socket.sendall(f"NICK {irc['username']}\r\n".encode())
-            self.socket.sendall(f"JOIN {irc['channel']}\r\n".encode())
+            self.connection.close()
+            self.connection = IrcConnection(irc.get("host", TWITCH_HOST), irc.get("port", TWITCH_PORT))
+            self.connection.connect()
+            if stop.is_set():
+                # reconnect() or stop() gave up on this listener while it dialled
+                self.connection.close()
+                return
+            # tags give us display names, badges and message ids
+            self.connection.send_line("CAP REQ :twitch.tv/tags twitch.tv/commands")
+            self.connection.send_line(f"PASS {irc['oauth']}")
+            self.connection.send_line(f"NICK {irc['username']}")
+            self._join_channels(stop)
             self.connected = True
-            log_service_message(f"Connected to {irc['channel']}")
+            self._set_status(CONNECTED)
+            log_service_message(f"Connected to {', '.join(self.channels)}")
         except Exception as e:
-            log_service_message(f"Connection/Auth failed: {e}")
-
-    def reconnect(self):
-        log_service_message("TwitchBot reconnect requested")
-        try:
-            # Stop listening thread if it's still running
-            if self.listen_thread and self.listen_thread.is_alive():
-                try:
-                    self.shutdown_event.set()
-                    if self.socket:
-                        self.socket.close()
-                except Exception as e:
-                    log_service_message(f"Error closing socket during reconnect: {e}")
-
-            # Reset state
             self.connected = False
-            self.listen_thread = None
-            self.shutdown_event.clear()  # Allow new loop to run
-            self.user_voice_map.clear()  # Optional: reset voices
-
-            # Start fresh connection
-            self.start()
-        except Exception as e:
-            log_service_message(f"Reconnect failed: {e}")
+            self._set_status(RECONNECTING)
+            log_service_message(f"Connection/Auth failed: {e}")
 
+    def _join_channels(self, stop: threading.Event, names: list[str] | None = None):
+        """
+        JOIN `names` (every channel by default), staying under Twitch's JOIN
+        rate limit across calls: channels joined in the last JOIN_RATE_WINDOW
+        seconds count against it, whichever call sent them.
+        """
+        names = list(self.channels) if names is None else list(names)
+        while names:
+            with self._join_lock:
+                now = time.monotonic()
+                while self._joins and now - self._joins[0] >= JOIN_RATE_WINDOW:
+                    self._joins.popleft()
+                room = JOIN_RATE_LIMIT - len(self._joins)
+                if room > 0:
+                    batch, names = names[:room], names[room:]
+                    self.connection.send_line("JOIN " + ",".join(batch))
+                    self._joins.extend([now] * len(batch))
+                    continue
+                wait = JOIN_RATE_WINDOW - (now - self._joins[0])
+            if stop.wait(wait):
+                return
 
-    def _start_listening(self):
-        self.listen_thread = threading.Thread(target=self._listen_loop, daemon=True)
-        self.listen_thread.start()
+    def _join_added(self, names: list[str], stop: threading.Event):
+        """JOIN channels added by a config change."""
+        try:
+            self._join_channels(stop, names)
+        except (OSError, ConnectionError) as e:
+            log_service_message(f"Failed to update joined channels: {e}")
+
+    def _reconnect_with_backoff(self, stop: threading.Event) -> bool:
+        """Reconnect until it works or stop is set, doubling the wait each try."""
+        delay = RECONNECT_BASE_DELAY
+        while not stop.is_set():
+            self._connect_to_twitch(stop)
+            if self.connected:
+                return True
+            log_service_message(f"Retrying connection in {delay:.0f}s")
+            if stop.wait(delay):
+                break
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+        return False
+
+    def _stop_listener(self, timeout: float) -> bool:
+        """End the current listener thread and close its socket. True if it exited in time."""
+        self._listen_stop.set()
+        self.connection.wake()
+        thread = self.listen_thread
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout)
+            if thread.is_alive():
+                log_service_message("Listener thread did not exit in time", "warning")
+                return False
+        self.connection.close()
+        self.connected = False
+        return True
 
-    def _listen_loop(self):
-        buffer = ""
-        while not self.shutdown_event.is_set():
+    def reconnect(self):
+        """Drop the connection and dial again; queued speech and caches are kept."""
+        log_service_message("TwitchBot reconnect requested")
+        with self._lifecycle_lock:
+            if self.status == STOPPED:
+                if not self.shutdown_event.is_set() and self._set_status(STARTING):
+                    self._start()
+                return
+            if not self._set_status(RECONNECTING):
+                return
             try:
-                data = self.socket.recv(2048).decode("utf-8", errors="ignore")
+                if not self._stop_listener(LISTENER_JOIN_TIMEOUT):
+                    # never run two readers: the old one still owns the socket
+                    # (e.g. stuck dialling), so start the new one once it exits
+                    threading.Thread(target=self._restart_after, args=(self.listen_thread,),
+                                     name="ListenerRestart", daemon=True).start()
+                    return
+                self._listen_stop = threading.Event()
+                self._start_listening(self._listen_stop)
             except Exception as e:
-                log_service_message(f"Socket recv error: {e}")
-                break
+                log_service_message(f"Reconnect failed: {e}")
+
+    def _restart_after(self, old: threading.Thread):
+        """Start a new listener once `old`, which reconnect() already told to stop, has exited."""
+        old.join()
+        with self._lifecycle_lock:
+            if self.listen_thread is not old or self.shutdown_event.is_set() or \
+                    self.status not in (CONNECTED, RECONNECTING):
+                return
+            self._set_status(RECONNECTING)
+            try:
+                self._stop_listener(0)
+                self._listen_stop = threading.Event()
+                self._start_listening(self._listen_stop)
+            except Exception as e:
+                log_service_message(f"Reconnect failed: {e}")
+
+    def drain(self, timeout: float) -> bool:
+        """Wait up to timeout for every queued line to be spoken. True if all were."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if all(c.speech_worker.idle() for c in list(self.channels.values())):
+                return True
+            time.sleep(0.02)
+        return all(c.speech_worker.idle() for c in list(self.channels.values()))
+
+    def stop(self, timeout: float = 5.0, drain: float | None = None) -> bool:
+        """
+        Shut down within timeout seconds: stop reading chat, give queued
+        speech up to `drain` seconds (speech_queue.drain_seconds by default)
+        to finish, then stop every thread. True if all of them exited.
+        """
+        deadline = time.monotonic() + timeout
+        with self._lifecycle_lock:
+            if self.status == STOPPED:
+                self.shutdown_event.set()
+                self._unsubscribe()
+                return True
+            self._set_status(STOPPING)
+            log_service_message("TwitchBot stopping")
+            clean = self._stop_listener(max(deadline - time.monotonic(), 0))
+            if drain is None:
+                drain = self.config.get("speech_queue", {}).get("drain_seconds", 2.0)
+            drain = min(drain, max(deadline - time.monotonic(), 0))
+            if drain > 0 and not self.drain(drain):
+                log_service_message("Speech queue not drained before shutdown")
+            self.shutdown_event.set()
+            for channel in list(self.channels.values()):
+                channel.speech_worker.wake()
+            self._unsubscribe()
+            if self.metrics_server is not None:
+                self.metrics_server.stop()
+            self.profiler.stop()
+            for channel in list(self.channels.values()):
+                channel.speech_worker.join(max(deadline - time.monotonic(), 0))
+                clean = clean and not channel.speech_worker.is_alive()
+            self.save_state()
+            self._set_status(STOPPED)
+            log_service_message(f"TwitchBot stopped{'' if clean else ' (some threads still running)'}")
+            return clean
+
+    def _unsubscribe(self):
+        """Stop following the config store: the bot, its normalizer and every channel's rules."""
+        CONFIG_STORE.unsubscribe(self._on_config_change)
+        self.normalizer.close()
+        for channel in list(self.channels.values()):
+            channel.substitutions.close()
+
+    def _start_listening(self, stop: threading.Event):
+        self.listen_thread = threading.Thread(target=self._listen_loop, args=(stop,),
+                                              name="TwitchListener", daemon=True)
+        self.listen_thread.start()
 
-            buffer += data
-            lines = buffer.split("\r\n")
-            buffer = lines.pop()
-            for line in lines:
-                if line.startswith("PING"):
-                    self.socket.sendall("PONG :tmi.twitch.tv\r\n".encode())
-                    continue
-                if "PRIVMSG" in line:
-                    user_host, _, msg = line.partition("PRIVMSG")
-                    username = user_host.lstrip(":").split("!")[0]
-                    chat = msg.split(" :", 1)[1] if " :" in msg else ""
-                    chat = apply_substitutions(chat)
-
-                    # skip self
-                    if username.lower() == self.config["irc"]["username"].lower():
-                        continue
-
-                    # choose voice: manual assignment first
-                    assigned_voices = load_assigned_voices()
-                    chat_user_norm = normalize_username(username)
-
-                    # Match ignoring case/Unicode differences
-                    idx = None
-                    for key, val in assigned_voices.items():
-                        if normalize_username(key) == chat_user_norm:
-                            idx = val
-                            break
-
-                    if idx is not None:
-                        if idx < 0:
-                            log_service_message(f"Skipping negative index for @{username}(filtered)")
-                            continue
-                    else:
-                        idx = (stable_hash(username) + self.voice_index_shift) % len(self.preferred_voices)
-
-
-                    voice = self.preferred_voices[idx]
-                    log_service_message(f"TTS assign @{username} -> idx={idx}")
-
-                    # create or reuse voice instance
-                    try:
-                        if username not in self.user_voice_map:
-                            inst = wincl.Dispatch("SAPI.SpVoice")
-                            inst.Voice = voice
-                            self.user_voice_map[username] = inst
-                        speaker = self.user_voice_map[username]
-                    except Exception as e:
-                        log_service_message(f"Error instantiating voice for @{username}: {e}")
-                        continue
-
-                    if self.tts_enabled:
-                        try:
-                            speaker.Speak(chat)
-                        except Exception as e:
-                            log_service_message(f"TTS speak error @{username}: {e}")
-
-        # cleanup
-        if self.socket:
+    def _listen_loop(self, stop: threading.Event):
+        if not self._reconnect_with_backoff(stop):
+            log_service_message("Bot loop exiting")
+            return
+        while not stop.is_set() and not self.shutdown_event.is_set():
             try:
-                self.socket.close()
-            except:
-                pass
-        pythoncom.CoUninitialize()
+                if not self.connection.wait_readable(timeout=1.0):
+                    continue
+                received_at = time.perf_counter()
+                lines = self.connection.read_available()
+                METRICS.observe("recv", time.perf_counter() - received_at)
+                for line in lines:
+                    if line and not self._handle_line(line, received_at, stop):
+                        # remaining lines belong to the old connection
+                        break
+            except (OSError, ConnectionError) as e:
+                # reads and sends (PONG) alike: the connection is gone
+                if stop.is_set() or self.shutdown_event.is_set():
+                    break
+                log_service_message(f"Socket error: {e}")
+                self.connected = False
+                self._set_status(RECONNECTING)
+                if not self._reconnect_with_backoff(stop):
+                    break
+
+        if stop is self._listen_stop:
+            # still the current listener (not replaced by reconnect())
+            self.connection.close()
+            self.connected = False
         log_service_message("Bot loop exiting")
+
+    def _handle_line(self, line: str, received_at: float, stop: threading.Event) -> bool:
+        """
+        Handle one IRC line. Returns False after a server-requested
+        reconnect, when the rest of the read is stale. Socket errors are
+        raised for the listener to reconnect; any other error is logged and
+        only this line is skipped.
+        """
+        try:
+            start = time.perf_counter()
+            msg = parse_message(line)
+            METRICS.observe("parse", time.perf_counter() - start)
+            if msg.command == "PING":
+                self.connection.send_line(f"PONG :{msg.trailing or 'tmi.twitch.tv'}")
+            elif msg.command == "PRIVMSG":
+                self._handle_privmsg(msg, received_at)
+            elif msg.command == "RECONNECT":
+                log_service_message("Server requested reconnect")
+                self.connected = False
+                self._set_status(RECONNECTING)
+                self._reconnect_with_backoff(stop)
+                return False
+        except (OSError, ConnectionError):
+            raise
+        except Exception as e:
+            METRICS.inc("messages_failed")
+            log_service_message(f"Skipped IRC line after error: {e}\n{traceback.format_exc()}", "warning")
+        return True
+
+    def _handle_privmsg(self, msg: IrcMessage, received_at: float = 0.0):
+        channel = self.channels.get(normalize_channel(msg.params[0]) if msg.params else "")
+        if channel is None:
+            return
+        username = msg.nick
+        self.received += 1
+        channel.received += 1
+        METRICS.inc("messages_received")
+        start = time.perf_counter()
+        # per-stage times carried on the SpeechItem for the slow-message trace
+        stages = {"read": start - received_at} if received_at else {}
+        # character cleanup, then the user's rules, then emotes and repeats,
+        # so rules still see emote names as typed
+        chat = self.normalizer.prepare(msg.trailing)
+        now = time.perf_counter()
+        stages["normalize"] = now - start
+        start = now
+        chat = channel.substitutions.apply(chat)
+        now = time.perf_counter()
+        stages["substitute"] = now - start
+        METRICS.observe("substitute", stages["substitute"])
+        start = now
+        chat = self.normalizer.finish(chat)
+        now = time.perf_counter()
+        stages["normalize"] += now - start
+        METRICS.observe("normalize", stages["normalize"])
+        start = now
+
+        # skip self
+        if username.lower() == self.config["irc"]["username"].lower():
+            return
+        # nothing left to say, e.g. an emote-only line whose emotes are skipped
+        if not chat.strip():
+            channel.filtered += 1
+            METRICS.inc("messages_empty")
+            return
+
+        # choose voice: manual assignment first, ignoring case/Unicode differences
+        idx = self.assigned_voices.lookup(username)
+        assigned = idx is not None
+        if assigned and idx < 0:
+            channel.filtered += 1
+            METRICS.inc("messages_filtered")
+            log_service_message(f"Skipping negative index for @{username}(filtered)", "debug")
+            return
+
+        # refresh_voices() swaps the list and the indexes into it together
+        with self._voices_lock:
+            voices = self.preferred_voices
+            if assigned and idx >= len(voices):
+                log_service_message(f"Assigned index {idx} for @{username} is out of range, using hashed voice",
+                                    "warning")
+                assigned = False
+            if not assigned:
+                base = self.user_voice_index.get(username)
+                if base is None and not self._users_restored:
+                    self._restore_users()
+                    base = self.user_voice_index.get(username)
+                if base is None:
+                    if len(self.user_voice_index) >= self.max_users:
+                        self.user_voice_index.clear()
+                        for state in list(self.channels.values()):
+                            state.voiced.clear()
+                    base = stable_hash(username) % len(voices)
+                    self.user_voice_index[username] = base
+                channel.voiced.add(username)
+                idx = channel.voice_overrides.get(username)
+                if idx is None:
+                    idx = (base + channel.voice_index_shift) % len(voices)
+            voice = voices[idx]
+        log_service_message(f"TTS assign {channel.name} @{username} -> idx={idx}", "debug")
+        now = time.perf_counter()
+        stages["assign"] = now - start
+        METRICS.observe("assign", stages["assign"])
+
+        if self.tts_enabled and channel.tts_enabled:
+            chat, verdict = self.admission.admit(channel.name, username, chat, msg.is_moderator)
+            if chat is None:
+                METRICS.inc(f"messages_{verdict}")
+                return
+            priority = 0
+            if assigned:
+                priority = self.assigned_priority
+            if msg.is_moderator:
+                priority = max(priority, self.moderator_priority)
+            item = SpeechItem(username, voice.id, chat, priority, received_at=received_at, stages=stages)
+            # set before put(): the speech thread may pick the item up at once
+            stages["dispatch"] = 0.0
+            if not channel.speech_queue.put(item):
+                METRICS.inc("messages_dropped")
+            stages["dispatch"] = time.perf_counter() - now
+            METRICS.observe("dispatch", stages["dispatch"])
+
+    def _restore_users(self):
+        """Give returning chatters the voice they heard last run, even if the voice list changed."""
+        self._users_restored = True
+        restored = self._apply_heard(self.state.section("users") or {})
+        log_service_message(f"Restored voices for {restored} chatters "
+                            f"(state read in {self.state.load_seconds * 1000:.1f} ms)")
+
+    def _apply_heard(self, saved: dict) -> int:
+        """
+        Point chatters back at the voices in `saved` (see _heard_voices()):
+        a chatter's first entry sets their base index; where a later one no
+        longer follows from it, it becomes that channel's voice override.
+        State files from before channels were recorded map chatter -> id,
+        read as unshifted voices. Returns how many entries were applied.
+        """
+        index = {voice.id: i for i, voice in enumerate(self.preferred_voices)}
+        count = len(self.preferred_voices)
+        entries = []
+        for key, value in saved.items():
+            if isinstance(value, str):
+                entries.append(("", key, value))
+            elif isinstance(value, dict):
+                entries.extend((key, username, voice_id) for username, voice_id in value.items())
+        applied = 0
+        for channel_name, username, voice_id in entries[-self.max_users:]:
+            channel = self.channels.get(channel_name)
+            i = index.get(voice_id)
+            if i is None or (channel is None and channel_name):
+                continue
+            shift = channel.voice_index_shift if channel else 0
+            base = self.user_voice_index.get(username)
+            if base is None:
+                self.user_voice_index[username] = (i - shift) % count
+            elif channel is not None and (base + shift) % count != i:
+                channel.voice_overrides[username] = i
+            if channel is not None:
+                channel.voiced.add(username)
+            applied += 1
+        return applied
+
+    def _heard_voices(self) -> dict:
+        """
+        The voice id each known chatter hears, as channel -> chatter -> id.
+        "" holds the unshifted voice of chatters not voiced in any current
+        channel; it is listed first, so it is the first dropped past max_users.
+        Caller holds _voices_lock.
+        """
+        voices = self.preferred_voices
+        base_of = self.user_voice_index
+        users = {}
+        for channel in list(self.channels.values()):
+            heard = users.setdefault(channel.name, {})
+            for username in list(channel.voiced):
+                i = channel.voice_overrides.get(username)
+                if i is None and username in base_of:
+                    i = (base_of[username] + channel.voice_index_shift) % len(voices)
+                if i is not None and i < len(voices):
+                    heard[username] = voices[i].id
+        voiced = {username for heard in users.values() for username in heard}
+        return {"": {u: voices[i].id for u, i in list(base_of.items())
+                     if u not in voiced and i < len(voices)}, **users}
+
+    def refresh_voices(self) -> int:
+        """
+        Re-enumerate installed voices and use the new list from the next
+        chat line on. Chatters keep the voice they were hearing if it is
+        still installed. Returns the number of preferred voices.
+        """
+        refresh_voice_catalog(self.backend)
+        preferred, _ = get_voice_lists(self.backend)
+        if not preferred:
+            log_service_message("No voices found after refresh; keeping the current list", "warning")
+            return len(self.preferred_voices)
+        with self._voices_lock:
+            heard = self._heard_voices()
+            self.preferred_voices = preferred
+            self.user_voice_index = {}
+            for channel in list(self.channels.values()):
+                channel.voiced = set()
+                channel.voice_overrides = {}
+            kept = self._apply_heard(heard)
+        log_service_message(f"Voice list refreshed: {len(preferred)} voices, {kept} chatter voices kept")
+        return len(preferred)
+
+    def save_state(self) -> bool:
+        """Write chatter voices and the audio cache index to RuntimeState.json."""
+        if self.state is None:
+            return False
+        if not self._users_restored:
+            # nothing was looked up this run; keep what the last run saved
+            users = self.state.section("users") or {}
+        else:
+            # refresh_voices() rebuilds the map under this lock
+            with self._voices_lock:
+                users = self._heard_voices()
+        sections = {"users": users}
+        if self.audio_cache is not None and self.audio_cache.folder:
+            sections["audio_cache"] = self.audio_cache.disk_index()
+        return self.state.save(sections)
+
+    def _state_loop(self):
+        while not self.shutdown_event.wait(self.state_interval):
+            self.save_state()
+
+    def speech_stats(self) -> dict:
+        channel_stats = {name: channel.stats() for name, channel in list(self.channels.items())}
+        stats = merge_stats(list(channel_stats.values()))
+        stats["spoken"] = sum(c["spoken"] for c in channel_stats.values())
+        stats["errors"] = sum(c["errors"] for c in channel_stats.values())
+        stats["expired"] = sum(c["expired"] for c in channel_stats.values())
+        stats["filtered"] = sum(c["filtered"] for c in channel_stats.values())
+        stats["admission"] = self.admission.stats()
+        stats["channels"] = channel_stats
+        stats["voices"] = self.backend.voice_stats()
+        stats["users"] = len(self.user_voice_index)
+        if self.audio_cache is not None:
+            stats["audio_cache"] = self.audio_cache.stats()
+        return stats
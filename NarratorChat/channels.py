@@ -0,0 +1,110 @@
+# channels.py
+import time
+from .admission import DEFAULT_ADMISSION
+from .audio_cache import AudioCache
+from .backends import SpeechBackend
+from .config import log_service_message
+from .lanes import SpeechLanes
+from .speech_queue import PipelinedSpeechWorker, SpeechQueue, SpeechWorker
+from .substitutions import SubstitutionEngine
+
+
+def normalize_channel(name: str) -> str:
+    name = name.strip().lstrip("#").lower()
+    return f"#{name}" if name else ""
+
+
+def configured_channels(config: dict) -> list[str]:
+    """Channels to join: irc.channels if set, else the single irc.channel."""
+    irc = config.get("irc", {})
+    names = irc.get("channels") or [irc.get("channel", "")]
+    return [n for n in dict.fromkeys(normalize_channel(n) for n in names) if n]
+
+
+def channel_settings(config: dict, channel: str) -> dict:
+    """Per-channel overrides from the top-level "channels" section."""
+    for name, settings in config.get("channels", {}).items():
+        if normalize_channel(name) == channel:
+            return settings
+    return {}
+
+
+def channel_rules(config: dict, channel: str) -> list[dict]:
+    """Global substitutions followed by the channel's own."""
+    return list(config.get("substitutions", [])) + list(channel_settings(config, channel).get("substitutions", []))
+
+
+class ChannelState:
+    """Voice shift, TTS switch, substitution rules and speech queue for one joined channel."""
+
+    def __init__(self, name: str, config: dict, backend: SpeechBackend, stop_event,
+                 audio_cache: AudioCache | None = None):
+        self.name = name
+        self.substitutions = SubstitutionEngine(select=lambda cfg: channel_rules(cfg, name))
+        queue_cfg = config.get("speech_queue", {})
+        lookahead = queue_cfg.get("lookahead", 3)
+        lanes = queue_cfg.get("lanes", 1)
+        if lanes > 1:
+            # several lines heard at once, each lane with its own worker and device
+            try:
+                self.speech_queue = self.speech_worker = SpeechLanes(
+                    lanes, backend, stop_event, audio_cache, name=f"SpeechWorker-{name}",
+                    max_size=queue_cfg.get("max_size", 100), overflow=queue_cfg.get("overflow", "drop_oldest"),
+                    schedule=queue_cfg.get("lane_schedule", "user"),
+                    max_concurrency=queue_cfg.get("max_concurrency", 0),
+                    devices=list(queue_cfg.get("lane_devices", [])),
+                    lookahead=lookahead, synth_workers=queue_cfg.get("synth_workers", 2))
+            except ValueError as e:
+                log_service_message(f"Invalid speech_queue config: {e}")
+                lanes = 1
+        if lanes <= 1:
+            try:
+                self.speech_queue = SpeechQueue(queue_cfg.get("max_size", 100),
+                                                queue_cfg.get("overflow", "drop_oldest"))
+            except ValueError as e:
+                log_service_message(f"Invalid speech_queue config: {e}")
+                self.speech_queue = SpeechQueue()
+            if lookahead > 0:
+                # synthesize the next lines while the current one plays
+                self.speech_worker = PipelinedSpeechWorker(self.speech_queue, backend, stop_event, audio_cache,
+                                                           name=f"SpeechWorker-{name}", lookahead=lookahead,
+                                                           synth_workers=queue_cfg.get("synth_workers", 2))
+            else:
+                self.speech_worker = SpeechWorker(self.speech_queue, backend, stop_event, audio_cache,
+                                                  name=f"SpeechWorker-{name}")
+        self.received = 0
+        self.filtered = 0
+        # chatters given a hashed voice here, so their voice can be saved;
+        # restored chatters whose voice here no longer follows their base
+        # index + voice_index_shift get it from voice_overrides instead
+        self.voiced: set[str] = set()
+        self.voice_overrides: dict[str, int] = {}
+        self.started_at = time.monotonic()
+        self.apply_config(config)
+
+    def apply_config(self, config: dict) -> None:
+        settings = channel_settings(config, self.name)
+        self.voice_index_shift = settings.get("voice_index", config.get("voice_index", 0))
+        self.tts_enabled = settings.get("tts_enabled", True)
+        admission = config.get("admission", {})
+        self.speech_worker.max_age = admission.get("max_age_seconds", DEFAULT_ADMISSION["max_age_seconds"])
+        queue_cfg = config.get("speech_queue", {})
+        self.speech_queue.merge_window = queue_cfg.get("merge_window_seconds", 0.0)
+        self.speech_queue.merge_max_length = queue_cfg.get("merge_max_length", 200)
+        if isinstance(self.speech_worker, (PipelinedSpeechWorker, SpeechLanes)):
+            self.speech_worker.lookahead = max(1, queue_cfg.get("lookahead", 3))
+
+    def stats(self) -> dict:
+        stats = self.speech_queue.stats()
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        stats.update({
+            "received": self.received,
+            "filtered": self.filtered,
+            "spoken": self.speech_worker.spoken,
+            "errors": self.speech_worker.errors,
+            "expired": self.speech_worker.expired,
+            "discarded": self.speech_worker.discarded,
+            "received_per_sec": self.received / elapsed,
+            "spoken_per_sec": self.speech_worker.spoken / elapsed,
+        })
+        return stats
@@ -0,0 +1,125 @@
+# cli.py
+# `narratorchat run` starts the bot without the tray: pystray, PIL and the icon
+# are never imported, and the bot modules only once the arguments are parsed.
+# SIGINT/SIGTERM stop it (draining queued speech like the tray's Exit),
+# SIGHUP reloads config.json and the installed voice list, and SIGUSR1
+# reconnects to Twitch. The control API
+# (control.py) is served when config enables it or --control-port is given.
+import sys
+import time
+import signal
+import argparse
+import threading
+
+# checked between signals, so a stop or --duration is noticed on Windows too
+POLL_SECONDS = 1.0
+
+
+def _signals() -> dict[int, str]:
+    actions = {signal.SIGINT: "stop", signal.SIGTERM: "stop"}
+    for name, action in (("SIGBREAK", "stop"), ("SIGHUP", "reload"), ("SIGUSR1", "reconnect")):
+        if hasattr(signal, name):
+            actions[getattr(signal, name)] = action
+    return actions
+
+
+def run(args: argparse.Namespace) -> int:
+    started = time.perf_counter()
+    from .config import CONFIG_STORE, flush_service_log, log_service_message
+    from .bot_logic import TwitchBot
+
+    backend = None
+    if args.dry_run or args.benchmark:
+        from .backends import FakeBackend
+        backend = FakeBackend(latency=args.latency_ms / 1000)
+
+    pending: list[str] = []
+    wake = threading.Event()
+    actions = _signals()
+
+    def on_signal(signum, _frame):
+        pending.append(actions[signum])
+        wake.set()
+
+    for signum in actions:
+        signal.signal(signum, on_signal)
+
+    bot = TwitchBot(threading.Event(), backend)
+    bot.start()
+    control = server = None
+    if args.control_port is not None or CONFIG_STORE.get().get("control", {}).get("enabled", False):
+        from .control import BotControl, start_control_server
+        control = BotControl(lambda: bot, bot.backend)
+        server = start_control_server(control, args.control_port)
+    mode = " (dry run)" if args.dry_run else " (benchmark)" if args.benchmark else ""
+    log_service_message(f"Headless bot started{mode} in {(time.perf_counter() - started) * 1000:.0f} ms")
+    print(f"NarratorChat running{mode}; Ctrl+C to stop", flush=True)
+
+    deadline = time.monotonic() + args.duration if args.duration else None
+    while True:
+        timeout = POLL_SECONDS if deadline is None else min(POLL_SECONDS, max(deadline - time.monotonic(), 0))
+        wake.wait(timeout)
+        wake.clear()
+        actions_now, pending[:] = list(pending), []
+        if "stop" in actions_now or (deadline is not None and time.monotonic() >= deadline):
+            break
+        if "reload" in actions_now:
+            log_service_message("Reloading config and voices (signal)")
+            CONFIG_STORE.reload()
+            # enumerating voices can take seconds; the loop keeps handling signals
+            threading.Thread(target=bot.refresh_voices, daemon=True).start()
+        if "reconnect" in actions_now:
+            threading.Thread(target=bot.reconnect, daemon=True).start()
+
+    print("Stopping...", flush=True)
+    if server:
+        server.stop()
+    clean = bot.stop(timeout=args.stop_timeout)
+    if control:
+        control.close()
+    if args.benchmark:
+        from .metrics import METRICS
+        stats = bot.speech_stats()
+        print(f"spoken {stats['spoken']}, errors {stats['errors']}, expired {stats['expired']}, "
+              f"filtered {stats['filtered']}, chatters {stats['users']}")
+        print(METRICS.summary_line())
+    flush_service_log()
+    return 0 if clean else 1
+
+
+def tray(_args: argparse.Namespace) -> int:
+    from .config import log_service_message
+    from .tray_app import run_tray
+    log_service_message("Launching tray manually.")
+    run_tray()
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="narratorchat", description="TTS bot for Twitch IRC")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the bot headless, without the tray icon")
+    fake = run_parser.add_mutually_exclusive_group()
+    fake.add_argument("--dry-run", action="store_true", help="read chat but speak through a fake synthesizer")
+    fake.add_argument("--benchmark", action="store_true",
+                      help="like --dry-run, and print pipeline metrics on exit")
+    run_parser.add_argument("--duration", type=float, default=0.0,
+                            help="stop after this many seconds (default: run until signalled)")
+    run_parser.add_argument("--latency-ms", type=float, default=0.0,
+                            help="fake synthesizer time per line (--dry-run/--benchmark)")
+    run_parser.add_argument("--control-port", type=int,
+                            help="serve the control API on this localhost port (default: from config)")
+    run_parser.add_argument("--stop-timeout", type=float, default=5.0,
+                            help="longest time to spend draining and stopping")
+    run_parser.set_defaults(handler=run)
+
+    tray_parser = commands.add_parser("tray", help="run with the system tray icon")
+    tray_parser.set_defaults(handler=tray)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
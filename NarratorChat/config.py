@@ -1,17 +1,27 @@
 ### config.py
 import os
+import re
 import json
 import time
+import atexit
 from datetime import datetime
 import threading
+from types import MappingProxyType
+from typing import Callable
+from .service_log import ServiceLogger
 
-_config_lock = threading.Lock()
+# re-entrant: load_config() saves a fresh default while holding it
+_config_lock = threading.RLock()
 _ASSIGNED_LOCK = threading.Lock()
 APPDATA = os.getenv("APPDATA") or os.path.expanduser("~")
 CONFIG_FOLDER = os.path.join(APPDATA, "NarratorChat")
 CONFIG_PATH = os.path.join(CONFIG_FOLDER, "config.json")
 ASSIGNED_PATH = os.path.join(CONFIG_FOLDER, "AssignedVoices.json")
 LOG_FILE = os.path.join(CONFIG_FOLDER, "service.log")
+CATALOG_PATH = os.path.join(CONFIG_FOLDER, "VoiceCatalog.json")
+AUDIO_CACHE_FOLDER = os.path.join(CONFIG_FOLDER, "AudioCache")
+PROFILE_FOLDER = os.path.join(CONFIG_FOLDER, "Profiles")
+STATE_PATH = os.path.join(CONFIG_FOLDER, "RuntimeState.json")
 
 DEFAULT_CONFIG = {
     "tts_enabled": True,
@@ -31,6 +41,95 @@ DEFAULT_CONFIG = {
             "replacement": "censored"
         }
     ],
+    "speech_queue": {
+        "max_size": 100,
+        "overflow": "drop_oldest",
+        "assigned_priority": 1,
+        "moderator_priority": 2,
+        "lookahead": 3,
+        "synth_workers": 2,
+        "merge_window_seconds": 0.0,
+        "merge_max_length": 200,
+        "drain_seconds": 2.0,
+        "lanes": 1,
+        "max_concurrency": 0,
+        "lane_schedule": "user",
+        "lane_devices": []
+    },
+    "admission": {
+        "messages_per_second": 2.0,
+        "burst": 20,
+        "user_cooldown_seconds": 1.0,
+        "duplicate_window_seconds": 0.0,
+        "max_length": 300,
+        "max_age_seconds": 60.0,
+        "exempt_moderators": True
+    },
+    "normalization": {
+        "enabled": True,
+        "max_repeat": 3,
+        "max_combining": 2,
+        "max_symbols": 3,
+        "dedupe_tokens": True,
+        "max_length": 500,
+        "emotes": {
+            "LUL": "lol",
+            "LULW": "lol",
+            "OMEGALUL": "lol",
+            "KEKW": "kek",
+            "PogChamp": "pog",
+            "Pog": "pog",
+            "PogU": "pog",
+            "Kappa": "kappa",
+            "monkaS": "yikes",
+            "Sadge": "sad",
+            "catJAM": "",
+            "<3": "heart"
+        }
+    },
+    "voice_pool": {
+        "max_instances": 0,
+        "max_users": 50000
+    },
+    "voice_catalog": {
+        "ttl_seconds": 86400,
+        "persist": True
+    },
+    "audio_cache": {
+        "enabled": True,
+        "max_memory_mb": 32,
+        "disk": True,
+        "max_disk_mb": 256,
+        "max_text_length": 200,
+        "disk_min_uses": 2
+    },
+    "logging": {
+        "level": "info",
+        "json": False,
+        "max_mb": 5,
+        "backups": 3,
+        "rotate_hours": 0
+    },
+    "metrics": {
+        "http_enabled": False,
+        "http_port": 9464,
+        "summary_seconds": 300
+    },
+    "state": {
+        "persist": True,
+        "save_seconds": 300
+    },
+    "control": {
+        "enabled": False,
+        "port": 9465,
+        "token": ""
+    },
+    "profiling": {
+        "slow_message_ms": 5000,
+        "capture": False,
+        "capture_seconds": 30,
+        "sample_ms": 5
+    },
 }
 
 def load_assigned_voices() -> dict[str, int]:
@@ -116,11 +215,213 @@ def load_config() -> dict:
             return DEFAULT_CONFIG.copy()
 
 
-def log_service_message(msg: str) -> None:
-    timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-    line = f"[{timestamp}] {msg}\n"
+_service_log = ServiceLogger(LOG_FILE)
+atexit.register(_service_log.flush)
+
+
+def configure_logging(config: dict) -> None:
+    """Apply the "logging" section: level, json lines and rotation limits."""
+    cfg = config.get("logging", {})
+    _service_log.configure(
+        cfg.get("level", "info"),
+        cfg.get("json", False),
+        int(cfg.get("max_mb", 5) * 1024 * 1024),
+        cfg.get("backups", 3),
+        cfg.get("rotate_hours", 0) * 3600,
+    )
+
+
+def log_enabled(level: str) -> bool:
+    return _service_log.enabled(level)
+
+
+def log_service_message(msg: str, level: str = "info", **fields) -> None:
+    _service_log.log(msg, level, **fields)
+
+
+def flush_service_log(timeout: float = 2.0) -> bool:
+    return _service_log.flush(timeout)
+
+
+def validate_config(data) -> list[str]:
+    """Return a list of problems that make config.json unusable (empty if fine)."""
+    if not isinstance(data, dict):
+        return ["config.json must contain a JSON object"]
+    errors = []
+    irc = data.get("irc")
+    if not isinstance(irc, dict):
+        errors.append("irc section is missing")
+    else:
+        for key in ("username", "oauth"):
+            if not isinstance(irc.get(key), str):
+                errors.append(f"irc.{key} must be a string")
+        if not irc.get("channel") and not irc.get("channels"):
+            errors.append("irc.channel or irc.channels is required")
+    if not isinstance(data.get("voice_index", 0), int):
+        errors.append("voice_index must be an integer")
+    if not isinstance(data.get("tts_enabled", True), bool):
+        errors.append("tts_enabled must be true or false")
+    queue = data.get("speech_queue", {})
+    if not isinstance(queue, dict):
+        errors.append("speech_queue must be an object")
+    else:
+        from .lanes import SCHEDULES
+        from .speech_queue import OVERFLOW_POLICIES
+        for key, low in (("max_size", 1), ("lanes", 1), ("synth_workers", 1), ("merge_max_length", 1),
+                         ("lookahead", 0), ("max_concurrency", 0), ("assigned_priority", None),
+                         ("moderator_priority", None)):
+            value = queue.get(key, 1)
+            if isinstance(value, bool) or not isinstance(value, int) or (low is not None and value < low):
+                kind = "an integer" if low is None else "a non-negative integer" if low == 0 else f"an integer >= {low}"
+                errors.append(f"speech_queue.{key} must be {kind}")
+        for key in ("merge_window_seconds", "drain_seconds"):
+            value = queue.get(key, 0)
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+                errors.append(f"speech_queue.{key} must be a non-negative number")
+        if queue.get("overflow", "drop_oldest") not in OVERFLOW_POLICIES:
+            errors.append(f"speech_queue.overflow must be one of {', '.join(OVERFLOW_POLICIES)}")
+        if queue.get("lane_schedule", "user") not in SCHEDULES:
+            errors.append(f"speech_queue.lane_schedule must be one of {', '.join(SCHEDULES)}")
+        devices = queue.get("lane_devices", [])
+        if not isinstance(devices, list) or not all(isinstance(d, str) for d in devices):
+            errors.append("speech_queue.lane_devices must be a list of device names")
+    admission = data.get("admission", {})
+    if not isinstance(admission, dict):
+        errors.append("admission must be an object")
+    else:
+        for key, value in admission.items():
+            if key != "exempt_moderators" and (isinstance(value, bool) or not isinstance(value, (int, float))):
+                errors.append(f"admission.{key} must be a number")
+    normalization = data.get("normalization", {})
+    if not isinstance(normalization, dict):
+        errors.append("normalization must be an object")
+    else:
+        for key in ("max_repeat", "max_combining", "max_symbols", "max_length"):
+            value = normalization.get(key, 0)
+            if isinstance(value, bool) or not isinstance(value, int):
+                errors.append(f"normalization.{key} must be an integer")
+        emotes = normalization.get("emotes", {})
+        if not isinstance(emotes, dict) or not all(isinstance(v, str) for v in emotes.values()):
+            errors.append("normalization.emotes must map emote names to spoken text")
+    profiling = data.get("profiling", {})
+    if not isinstance(profiling, dict):
+        errors.append("profiling must be an object")
+    else:
+        if not isinstance(profiling.get("capture", False), bool):
+            errors.append("profiling.capture must be true or false")
+        for key in ("slow_message_ms", "capture_seconds", "sample_ms"):
+            value = profiling.get(key, 1)
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+                errors.append(f"profiling.{key} must be a non-negative number")
+    rules = data.get("substitutions", [])
+    if not isinstance(rules, list):
+        errors.append("substitutions must be a list")
+        rules = []
+    for i, rule in enumerate(rules):
+        if not isinstance(rule, dict) or not isinstance(rule.get("pattern"), str) \
+                or not isinstance(rule.get("replacement"), str):
+            errors.append(f"substitutions[{i}] needs string pattern and replacement")
+            continue
+        try:
+            re.compile(rule["pattern"])
+        except re.error as e:
+            errors.append(f"substitutions[{i}] pattern is invalid: {e}")
+    return errors
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _config_stamp() -> tuple[int, int] | None:
     try:
-        with open(LOG_FILE, 'a', encoding='utf-8') as f:
-            f.write(line)
-    except:
-        pass
+        st = os.stat(CONFIG_PATH)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+class ConfigStore:
+    """
+    Single in-memory copy of config.json shared by the bot, substitution
+    engines and tray. get() returns a read-only snapshot (dicts become
+    mappings, lists become tuples). Once start()ed, a watcher thread stats
+    the file every `interval` seconds; a changed file is validated and,
+    if usable, published to every subscriber. An invalid edit is logged and
+    the previous snapshot stays in force.
+    """
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self.version = 0
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._stamp: tuple[int, int] | None = None
+        self._subscribers: list[Callable] = []
+        self._thread: threading.Thread | None = None
+
+    def get(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.reload()
+            snapshot = self._snapshot
+        return snapshot
+
+    def reload(self) -> bool:
+        """Re-read config.json now. Returns True if a new snapshot was published."""
+        stamp = _config_stamp()
+        data = load_config()
+        errors = validate_config(data)
+        if errors:
+            log_service_message("Invalid config.json: " + "; ".join(errors), "error")
+            if self._snapshot is not None:
+                self._stamp = stamp
+                return False
+        snapshot = _freeze(data)
+        with self._lock:
+            first = self._snapshot is None
+            self._snapshot = snapshot
+            self._stamp = stamp
+            self.version += 1
+            subscribers = list(self._subscribers)
+        if not first:
+            log_service_message(f"Config reloaded (version {self.version})")
+        for callback in subscribers:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                log_service_message(f"Config subscriber failed: {e}", "error")
+        return True
+
+    def subscribe(self, callback: Callable) -> None:
+        """Call callback(snapshot) from the watcher thread whenever the config changes."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable) -> None:
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._watch, name="ConfigWatcher", daemon=True)
+            self._thread.start()
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                if _config_stamp() != self._stamp:
+                    self.reload()
+            except Exception as e:
+                log_service_message(f"Config watcher error: {e}", "error")
+
+
+CONFIG_STORE = ConfigStore()
@@ -0,0 +1,293 @@
+# control.py
+import json
+import hmac
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+from urllib.parse import parse_qsl, urlsplit
+from .backends import SpeechBackend
+from .bot_logic import (TwitchBot, get_backend, get_voice_lists, refresh_voice_catalog, speak_voice_index,
+                        test_voice_indices)
+from .channels import normalize_channel
+from .config import CONFIG_STORE, load_config, log_service_message, save_config
+from .metrics import METRICS
+
+
+class UnknownChannel(LookupError):
+    """A control call named a channel the bot is not in."""
+
+
+class BotControl:
+    """
+    Runtime controls shared by the tray menu and the ControlServer. Quick
+    ones (TTS toggle, skip, clear, stats) run on the caller's thread.
+    Speaking voices goes to one shared worker thread that stays initialized
+    for the backend, so repeated voice tests reuse its voices instead of
+    setting up a fresh thread each time. Reconnect and refresh-voices have
+    a worker of their own, so they never wait behind a voice test.
+    get_bot returns the running TwitchBot, or None while it is stopped.
+    """
+
+    def __init__(self, get_bot: Callable[[], TwitchBot | None], backend: SpeechBackend | None = None):
+        self.get_bot = get_bot
+        self.backend = backend or get_backend()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ControlWorker",
+                                           initializer=self.backend.thread_init)
+        self.bot_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ControlBotWorker")
+        self._futures: list[Future] = []
+        self._lock = threading.Lock()
+
+    def _submit(self, fn, *args, executor: ThreadPoolExecutor | None = None, **kwargs) -> Future:
+        future = (executor or self.executor).submit(fn, *args, **kwargs)
+        with self._lock:
+            self._futures = [f for f in self._futures if not f.done()] + [future]
+        return future
+
+    def _voice_pool(self) -> list:
+        preferred, fallback = get_voice_lists(self.backend)
+        return preferred if preferred else fallback
+
+    def voices(self) -> list[dict]:
+        return [{"index": i, "id": v.id, "description": v.description} for i, v in enumerate(self._voice_pool())]
+
+    def stats(self) -> dict:
+        bot = self.get_bot()
+        if bot is None:
+            return {"status": "stopped", "tts_enabled": CONFIG_STORE.get().get("tts_enabled", True)}
+        return {"status": bot.status, "tts_enabled": bot.tts_enabled, **bot.speech_stats(),
+                "metrics": METRICS.snapshot()}
+
+    def set_tts(self, enabled: bool | None = None) -> bool:
+        """Turn TTS on or off in config.json (None toggles it) and return the new setting."""
+        cfg = load_config()
+        cfg["tts_enabled"] = not cfg.get("tts_enabled", True) if enabled is None else enabled
+        save_config(cfg)
+        # publish now rather than waiting for the watcher; the bot is subscribed
+        CONFIG_STORE.reload()
+        log_service_message(f"TTS {'enabled' if cfg['tts_enabled'] else 'disabled'}")
+        return cfg["tts_enabled"]
+
+    def set_profiling(self, enabled: bool | None = None) -> bool:
+        """Turn continuous profiling (profiling.capture) on or off in config.json (None toggles it)."""
+        cfg = load_config()
+        profiling = cfg.setdefault("profiling", {})
+        profiling["capture"] = not profiling.get("capture", False) if enabled is None else enabled
+        save_config(cfg)
+        CONFIG_STORE.reload()
+        return profiling["capture"]
+
+    def profile(self, seconds: float | None = None) -> bool:
+        """Take one sampling profile of the running bot. False if stopped or a capture is running."""
+        bot = self.get_bot()
+        if seconds is not None and not 0 < seconds <= 3600:
+            raise ValueError(f"seconds must be between 0 and 3600, got {seconds}")
+        return bot.profiler.capture(seconds) if bot else False
+
+    def reconnect(self) -> Future | None:
+        bot = self.get_bot()
+        return self._submit(bot.reconnect, executor=self.bot_executor) if bot else None
+
+    def refresh_voices(self) -> Future:
+        """Re-enumerate installed voices for the bot and the voice commands."""
+        return self._submit(self._refresh_voices, executor=self.bot_executor)
+
+    def _refresh_voices(self) -> None:
+        bot = self.get_bot()
+        if bot is not None:
+            bot.refresh_voices()
+        if bot is None or bot.backend is not self.backend:
+            refresh_voice_catalog(self.backend)
+
+    def speak_index(self, index: int, extra_text: str = "") -> Future:
+        if not 0 <= index < len(self._voice_pool()):
+            raise ValueError(f"no voice with index {index}")
+        return self._submit(speak_voice_index, index, extra_text, self.backend, thread_ready=True)
+
+    def test_voices(self) -> Future:
+        return self._submit(test_voice_indices, self.backend, thread_ready=True)
+
+    @staticmethod
+    def _channels(bot: TwitchBot, channel: str | None) -> list:
+        """The bot's ChannelStates, or just `channel` ("name", "#Name", ...). Raises UnknownChannel."""
+        channels = bot.channels
+        if channel is None:
+            return list(channels.values())
+        state = channels.get(normalize_channel(str(channel)))
+        if state is None:
+            raise UnknownChannel(f"not in channel {channel!r}")
+        return [state]
+
+    def skip(self, channel: str | None = None) -> int:
+        """Cut short the lines being spoken in one channel (or all of them); queued lines carry on. Returns how many."""
+        bot = self.get_bot()
+        if bot is None:
+            return 0
+        channels = self._channels(bot, channel)
+        skipped = sum(c.speech_worker.skip() for c in channels)
+        METRICS.inc("messages_skipped", skipped)
+        log_service_message(f"Skipped {skipped} playing lines")
+        return skipped
+
+    def clear(self, channel: str | None = None) -> int:
+        """Drop queued speech in one channel (or all of them). Returns how many lines were queued."""
+        bot = self.get_bot()
+        if bot is None:
+            return 0
+        channels = self._channels(bot, channel)
+        cleared = sum(c.speech_worker.clear() for c in channels)
+        log_service_message(f"Cleared {cleared} queued lines")
+        return cleared
+
+    def close(self) -> None:
+        with self._lock:
+            for future in self._futures:
+                future.cancel()
+        self.executor.submit(self.backend.thread_exit)
+        self.executor.shutdown(wait=False)
+        self.bot_executor.shutdown(wait=False)
+
+
+def _flag(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    if str(value).lower() in ("1", "true", "on", "yes"):
+        return True
+    if str(value).lower() in ("0", "false", "off", "no"):
+        return False
+    raise ValueError(f"expected true or false, got {value!r}")
+
+
+class ControlServer:
+    """
+    Localhost HTTP API over a BotControl, for stream automation:
+
+      GET  /stats          status, speech and queue stats, pipeline metrics
+      GET  /voices         voices by index
+      POST /refresh-voices re-enumerate installed voices
+      POST /tts            {"enabled": true|false}, or no body to toggle
+      POST /reconnect
+      POST /speak          {"index": 3, "text": "optional extra text"}
+      POST /test-voices
+      POST /skip           {"channel": "#name"} or no body for every channel:
+                           cut the line playing short
+      POST /clear          {"channel": "#name"} or no body for every channel;
+                           a channel the bot is not in is 404
+      POST /profile        {"seconds": 30}: sample the listener and speech
+                           threads, written to the Profiles folder
+
+    Parameters come from a JSON body or the query string. Requests are
+    served one at a time and never wait for speech: slow actions are queued
+    on the BotControl workers and answered with 202. With a token, requests
+    need "Authorization: Bearer <token>"; requests from web pages (with an
+    Origin header) are refused. port=0 picks a free port (see .port).
+    """
+
+    def __init__(self, control: BotControl, port: int = 0, host: str = "127.0.0.1", token: str = ""):
+        self.control = control
+        self.token = token
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            timeout = 5
+
+            def _reply(self, status: int, payload: dict) -> None:
+                body = json.dumps(payload, default=str).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _handle(self, method: str) -> None:
+                url = urlsplit(self.path)
+                params = dict(parse_qsl(url.query))
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    if length:
+                        body = json.loads(self.rfile.read(length))
+                        if not isinstance(body, dict):
+                            raise ValueError("body must be a JSON object")
+                        params.update(body)
+                    if not server.authorized(self.headers):
+                        self._reply(403, {"ok": False, "error": "forbidden"})
+                        return
+                    status, payload = server.dispatch(method, url.path.rstrip("/") or "/", params)
+                except (ValueError, TypeError) as e:
+                    status, payload = 400, {"ok": False, "error": str(e)}
+                except Exception as e:
+                    log_service_message(f"Control request {method} {url.path} failed: {e}")
+                    status, payload = 500, {"ok": False, "error": str(e)}
+                self._reply(status, payload)
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = HTTPServer((host, port), Handler)
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="ControlServer", daemon=True)
+
+    def authorized(self, headers) -> bool:
+        if headers.get("Origin"):
+            return False
+        if not self.token:
+            return True
+        return hmac.compare_digest(headers.get("Authorization", ""), f"Bearer {self.token}")
+
+    def dispatch(self, method: str, path: str, params: dict) -> tuple[int, dict]:
+        control = self.control
+        routes = {
+            ("GET", "/stats"): lambda: (200, control.stats()),
+            ("GET", "/voices"): lambda: (200, {"voices": control.voices()}),
+            ("POST", "/tts"): lambda: (200, {"tts_enabled": control.set_tts(
+                _flag(params["enabled"]) if "enabled" in params else None)}),
+            ("POST", "/reconnect"): lambda: (202, {"queued": control.reconnect() is not None}),
+            ("POST", "/refresh-voices"): lambda: (202, {"queued": bool(control.refresh_voices())}),
+            ("POST", "/speak"): lambda: (202, {"queued": bool(control.speak_index(
+                int(params["index"]), str(params.get("text", ""))))}),
+            ("POST", "/test-voices"): lambda: (202, {"queued": bool(control.test_voices())}),
+            ("POST", "/skip"): lambda: (200, {"skipped": control.skip(params.get("channel"))}),
+            ("POST", "/clear"): lambda: (200, {"cleared": control.clear(params.get("channel"))}),
+            ("POST", "/profile"): lambda: (202, {"started": control.profile(
+                float(params["seconds"]) if "seconds" in params else None)}),
+        }
+        route = routes.get((method, path))
+        if route is None:
+            return 404, {"ok": False, "error": f"no {method} {path}"}
+        try:
+            status, payload = route()
+        except UnknownChannel as e:
+            return 404, {"ok": False, "error": str(e)}
+        except KeyError as e:
+            raise ValueError(f"missing parameter {e}")
+        return status, {"ok": True, **payload}
+
+    def start(self) -> None:
+        self.thread.start()
+        log_service_message(f"Control API on http://127.0.0.1:{self.port}/")
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def start_control_server(control: BotControl, port: int | None = None) -> ControlServer | None:
+    """Start a ControlServer if the "control" config section enables it (or a port is given)."""
+    cfg = CONFIG_STORE.get().get("control", {})
+    if port is None and not cfg.get("enabled", False):
+        return None
+    try:
+        server = ControlServer(control, cfg.get("port", 9465) if port is None else port,
+                               token=cfg.get("token", ""))
+    except OSError as e:
+        log_service_message(f"Control API unavailable: {e}")
+        return None
+    server.start()
+    return server
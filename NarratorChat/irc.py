@@ -0,0 +1,205 @@
+# irc.py
+import selectors
+import socket
+import threading
+from dataclasses import dataclass, field
+
+_TAG_ESCAPES = {":": ";", "s": " ", "\\": "\\", "r": "\r", "n": "\n"}
+
+
+def _unescape_tag(value: str) -> str:
+    if "\\" not in value:
+        return value
+    out = []
+    chars = iter(value)
+    for ch in chars:
+        if ch == "\\":
+            nxt = next(chars, "")
+            out.append(_TAG_ESCAPES.get(nxt, nxt))
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+@dataclass
+class IrcMessage:
+    command: str
+    params: list[str] = field(default_factory=list)
+    prefix: str = ""
+    tags: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def nick(self) -> str:
+        return self.prefix.split("!", 1)[0]
+
+    @property
+    def trailing(self) -> str:
+        return self.params[-1] if self.params else ""
+
+    @property
+    def display_name(self) -> str:
+        return self.tags.get("display-name") or self.nick
+
+    @property
+    def badges(self) -> set[str]:
+        return {b.split("/", 1)[0] for b in self.tags.get("badges", "").split(",") if b}
+
+    @property
+    def is_moderator(self) -> bool:
+        return self.tags.get("mod") == "1" or not {"moderator", "broadcaster"}.isdisjoint(self.badges)
+
+    @property
+    def is_subscriber(self) -> bool:
+        return self.tags.get("subscriber") == "1" or not {"subscriber", "founder"}.isdisjoint(self.badges)
+
+    @property
+    def message_id(self) -> str:
+        return self.tags.get("id", "")
+
+
+def parse_message(line: str) -> IrcMessage:
+    """Parse one IRC line (without CRLF), including IRCv3 message tags."""
+    tags: dict[str, str] = {}
+    if line.startswith("@"):
+        raw_tags, _, line = line[1:].partition(" ")
+        for item in raw_tags.split(";"):
+            key, _, value = item.partition("=")
+            tags[key] = _unescape_tag(value)
+        line = line.lstrip(" ")
+    prefix = ""
+    if line.startswith(":"):
+        prefix, _, line = line[1:].partition(" ")
+        line = line.lstrip(" ")
+    head, sep, trailing = line.partition(" :")
+    if not sep and head.startswith(":"):
+        head, trailing, sep = "", head[1:], ":"
+    params = head.split()
+    if sep:
+        params.append(trailing)
+    command = params.pop(0).upper() if params else ""
+    return IrcMessage(command, params, prefix, tags)
+
+
+class LineFramer:
+    """
+    Splits a byte stream into CRLF-terminated lines and decodes each complete
+    line, so multibyte UTF-8 split across reads is never corrupted. Bytes are
+    only copied once per feed() no matter how many lines a burst contains.
+    A line longer than max_line is dropped whole: its bytes are discarded up
+    to the next line end, so its tail is never framed as a line of its own.
+    """
+
+    def __init__(self, max_line: int = 64 * 1024):
+        self.max_line = max_line
+        self._buffer = bytearray()
+        # inside a dropped line; skip bytes until its line end
+        self._discarding = False
+
+    def feed(self, data: bytes) -> list[str]:
+        if self._discarding:
+            end = data.find(b"\n")
+            if end < 0:
+                return []
+            data = data[end + 1:]
+            self._discarding = False
+        buf = self._buffer
+        buf += data
+        lines = []
+        start = 0
+        while True:
+            end = buf.find(b"\n", start)
+            if end < 0:
+                break
+            stop = end - 1 if end > start and buf[end - 1] == 0x0D else end
+            lines.append(buf[start:stop].decode("utf-8", errors="replace"))
+            start = end + 1
+        if start:
+            del buf[:start]
+        if len(buf) > self.max_line:
+            # no newline in sight; drop the runaway line rather than grow forever
+            buf.clear()
+            self._discarding = True
+        return lines
+
+
+class IrcConnection:
+    """
+    Blocking-with-timeout IRC socket read through a selector, so a reader can
+    wake up regularly (e.g. to check a shutdown event) without busy looping.
+    wake() interrupts a wait_readable() in another thread straight away.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.sock: socket.socket | None = None
+        self.framer = LineFramer()
+        self._selector = selectors.DefaultSelector()
+        # the listener (PONG) and config watcher (JOIN/PART) may both send
+        self._send_lock = threading.Lock()
+        self._waker: tuple[socket.socket, socket.socket] | None = None
+
+    def connect(self) -> None:
+        self.close()
+        self.sock = socket.create_connection((self.host, self.port), self.timeout)
+        self.sock.settimeout(self.timeout)
+        self.framer = LineFramer()
+        self._selector.register(self.sock, selectors.EVENT_READ)
+        self._waker = socket.socketpair()
+        self._waker[0].setblocking(False)
+        self._selector.register(self._waker[0], selectors.EVENT_READ)
+
+    def send_line(self, line: str) -> None:
+        if self.sock is None:
+            raise ConnectionError("not connected")
+        with self._send_lock:
+            self.sock.sendall(f"{line}\r\n".encode("utf-8"))
+
+    def wait_readable(self, timeout: float) -> bool:
+        """True once the socket has data; False on timeout or wake()."""
+        if self.sock is None:
+            raise ConnectionError("not connected")
+        readable = False
+        for key, _ in self._selector.select(timeout):
+            if key.fileobj is self.sock:
+                readable = True
+            else:
+                try:
+                    key.fileobj.recv(4096)
+                except OSError:
+                    pass
+        return readable
+
+    def wake(self) -> None:
+        waker = self._waker
+        if waker is None:
+            return
+        try:
+            waker[1].send(b"\0")
+        except OSError:
+            pass
+
+    def read_available(self) -> list[str]:
+        """Read once from a readable socket and return the complete lines."""
+        if self.sock is None:
+            raise ConnectionError("not connected")
+        data = self.sock.recv(65536)
+        if not data:
+            raise ConnectionError("connection closed by server")
+        return self.framer.feed(data)
+
+    def close(self) -> None:
+        if self.sock is None:
+            return
+        for fileobj in (self.sock, *(self._waker or ())):
+            try:
+                self._selector.unregister(fileobj)
+            except (KeyError, ValueError):
+                pass
+            try:
+                fileobj.close()
+            except OSError:
+                pass
+        self.sock = None
+        self._waker = None
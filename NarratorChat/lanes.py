@@ -0,0 +1,158 @@
+# lanes.py
+import threading
+import time
+import zlib
+from .audio_cache import AudioCache
+from .backends import SpeechBackend
+from .speech_queue import PipelinedSpeechWorker, SpeechItem, SpeechQueue, SpeechWorker, merge_stats
+
+SCHEDULES = ("user", "voice")
+
+
+class SpeechLanes:
+    """
+    Several speech queues, each drained by its own worker and output device,
+    so chatters can be heard over each other instead of waiting in line.
+    A line goes to the lane picked by hashing its chatter or its voice
+    ("schedule"), which keeps one chatter's lines in order on one lane, or
+    one voice's instances on one thread. With max_concurrency below the lane
+    count, only that many lanes play at once while the rest render ahead.
+    Stands in for both a channel's SpeechQueue and its SpeechWorker.
+    """
+
+    def __init__(self, count: int, backend: SpeechBackend, stop_event: threading.Event,
+                 audio_cache: AudioCache | None = None, name: str = "SpeechWorker",
+                 max_size: int = 100, overflow: str = "drop_oldest", schedule: str = "user",
+                 max_concurrency: int = 0, devices: list[str] | None = None,
+                 lookahead: int = 3, synth_workers: int = 2):
+        if count < 1:
+            raise ValueError(f"lane count must be at least 1, got {count}")
+        if schedule not in SCHEDULES:
+            raise ValueError(f"schedule must be one of {SCHEDULES}, got {schedule!r}")
+        self.schedule = schedule
+        self.max_concurrency = max_concurrency if 0 < max_concurrency < count else count
+        slots = threading.BoundedSemaphore(self.max_concurrency) if self.max_concurrency < count else None
+        devices = devices or []
+        self.lanes: list[SpeechWorker] = []
+        for i in range(count):
+            queue = SpeechQueue(max_size, overflow)
+            if lookahead > 0:
+                worker = PipelinedSpeechWorker(queue, backend, stop_event, audio_cache, f"{name}-lane{i}",
+                                               lookahead=lookahead, synth_workers=synth_workers)
+            else:
+                worker = SpeechWorker(queue, backend, stop_event, audio_cache, f"{name}-lane{i}")
+            worker.device = devices[i % len(devices)] if devices else ""
+            worker.output_slots = slots
+            self.lanes.append(worker)
+
+    def lane_for(self, item: SpeechItem) -> SpeechWorker:
+        key = item.username if self.schedule == "user" else item.voice_id
+        return self.lanes[zlib.crc32(key.encode("utf-8")) % len(self.lanes)]
+
+    # SpeechQueue side
+
+    def put(self, item: SpeechItem) -> bool:
+        return self.lane_for(item).queue.put(item)
+
+    def __len__(self) -> int:
+        return sum(len(lane.queue) for lane in self.lanes)
+
+    def stats(self) -> dict:
+        lane_stats = [lane.queue.stats() for lane in self.lanes]
+        stats = merge_stats(lane_stats)
+        stats["lanes"] = [{
+            "device": lane.device,
+            "playing": lane.playing,
+            "depth": s["depth"],
+            "max_depth": s["max_depth"],
+            "enqueued": s["enqueued"],
+            "spoken": lane.spoken,
+            "wait_avg": s["wait_avg"],
+            "wait_max": s["wait_max"],
+        } for lane, s in zip(self.lanes, lane_stats)]
+        stats["max_concurrency"] = self.max_concurrency
+        return stats
+
+    @property
+    def merge_window(self) -> float:
+        return self.lanes[0].queue.merge_window
+
+    @merge_window.setter
+    def merge_window(self, value: float) -> None:
+        for lane in self.lanes:
+            lane.queue.merge_window = value
+
+    @property
+    def merge_max_length(self) -> int:
+        return self.lanes[0].queue.merge_max_length
+
+    @merge_max_length.setter
+    def merge_max_length(self, value: int) -> None:
+        for lane in self.lanes:
+            lane.queue.merge_max_length = value
+
+    # SpeechWorker side
+
+    @property
+    def max_age(self) -> float:
+        return self.lanes[0].max_age
+
+    @max_age.setter
+    def max_age(self, value: float) -> None:
+        for lane in self.lanes:
+            lane.max_age = value
+
+    @property
+    def lookahead(self) -> int:
+        return getattr(self.lanes[0], "lookahead", 0)
+
+    @lookahead.setter
+    def lookahead(self, value: int) -> None:
+        for lane in self.lanes:
+            if isinstance(lane, PipelinedSpeechWorker):
+                lane.lookahead = value
+
+    @property
+    def spoken(self) -> int:
+        return sum(lane.spoken for lane in self.lanes)
+
+    @property
+    def errors(self) -> int:
+        return sum(lane.errors for lane in self.lanes)
+
+    @property
+    def expired(self) -> int:
+        return sum(lane.expired for lane in self.lanes)
+
+    @property
+    def discarded(self) -> int:
+        return sum(lane.discarded for lane in self.lanes)
+
+    def start(self) -> None:
+        for lane in self.lanes:
+            lane.start()
+
+    def stop(self) -> None:
+        for lane in self.lanes:
+            lane.stop()
+
+    def wake(self) -> None:
+        for lane in self.lanes:
+            lane.wake()
+
+    def join(self, timeout: float | None = None) -> None:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for lane in self.lanes:
+            lane.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+
+    def is_alive(self) -> bool:
+        return any(lane.is_alive() for lane in self.lanes)
+
+    def idle(self) -> bool:
+        return all(lane.idle() for lane in self.lanes)
+
+    def clear(self) -> int:
+        return sum(lane.clear() for lane in self.lanes)
+
+    def skip(self) -> int:
+        return sum(lane.skip() for lane in self.lanes)
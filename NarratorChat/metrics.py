@@ -0,0 +1,210 @@
+# metrics.py
+import json
+import threading
+from bisect import bisect_left
+from typing import Callable
+from .config import log_service_message
+
+PREFIX = "narratorchat"
+# 1us .. ~95s, each bucket sqrt(2) wider than the last
+BUCKETS = [1e-6 * 2 ** (i / 2) for i in range(54)]
+
+
+class Histogram:
+    """Fixed-bucket latency histogram: O(log buckets) to record, percentiles by interpolation."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        i = bisect_left(BUCKETS, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, p: float) -> float:
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = p * self.count
+            seen = 0
+            for i, n in enumerate(self.counts):
+                if n and seen + n >= rank:
+                    lower = BUCKETS[i - 1] if i else 0.0
+                    upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                    return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+                seen += n
+            return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+
+class MetricsRegistry:
+    """
+    Named counters, gauges (sampled from callables) and per-stage histograms.
+    Recording costs a dict lookup and an uncontended lock, so it stays on.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: dict[str, int] = {}
+        self.gauges: dict[str, Callable[[], float]] = {}
+        self.stages: dict[str, Histogram] = {}
+
+    def inc(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_gauge(self, name: str, fn: Callable[[], float]) -> None:
+        self.gauges[name] = fn
+
+    def stage(self, name: str) -> Histogram:
+        hist = self.stages.get(name)
+        if hist is None:
+            with self._lock:
+                hist = self.stages.setdefault(name, Histogram())
+        return hist
+
+    def observe(self, stage: str, seconds: float) -> None:
+        self.stage(stage).observe(seconds)
+
+    def _gauge_values(self) -> dict[str, float]:
+        values = {}
+        for name, fn in list(self.gauges.items()):
+            try:
+                values[name] = fn()
+            except Exception:
+                pass
+        return values
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            "counters": counters,
+            "gauges": self._gauge_values(),
+            "stages": {name: hist.summary() for name, hist in list(self.stages.items())},
+        }
+
+    def prometheus(self) -> str:
+        """Render everything in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            counters = dict(self.counters)
+        for name, value in sorted(counters.items()):
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            lines.append(f"{PREFIX}_{name}_total {value}")
+        for name, value in sorted(self._gauge_values().items()):
+            lines.append(f"# TYPE {PREFIX}_{name} gauge")
+            lines.append(f"{PREFIX}_{name} {value}")
+        metric = f"{PREFIX}_stage_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        for stage, hist in sorted(self.stages.items()):
+            with hist._lock:
+                counts, count, total = list(hist.counts), hist.count, hist.sum
+            cumulative = 0
+            for bound, n in zip(BUCKETS, counts):
+                cumulative += n
+                lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound:.6g}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{metric}_sum{{stage="{stage}"}} {total}')
+            lines.append(f'{metric}_count{{stage="{stage}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def summary_line(self) -> str:
+        snap = self.snapshot()
+        parts = [f"{k}={v}" for k, v in sorted(snap["counters"].items())]
+        parts += [f"{k}={v}" for k, v in sorted(snap["gauges"].items())]
+        for name, s in sorted(snap["stages"].items()):
+            parts.append(f"{name}(n={s['count']} p50={s['p50'] * 1000:.2f}ms "
+                         f"p95={s['p95'] * 1000:.2f}ms p99={s['p99'] * 1000:.2f}ms)")
+        return "Metrics: " + " ".join(parts)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.stages.clear()
+
+
+METRICS = MetricsRegistry()
+
+
+class MetricsServer:
+    """
+    Serves the registry on localhost: /metrics in Prometheus text format and
+    /metrics.json as JSON. port=0 picks a free port (see .port).
+    """
+
+    def __init__(self, registry: MetricsRegistry = METRICS, port: int = 0, host: str = "127.0.0.1"):
+        self.registry = registry
+
+        # imported here: http.server is most of this module's import time
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] == "/metrics":
+                    body = registry.prometheus().encode("utf-8")
+                    ctype = "text/plain; version=0.0.4"
+                elif self.path.split("?", 1)[0] == "/metrics.json":
+                    body = json.dumps(registry.snapshot()).encode("utf-8")
+                    ctype = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="MetricsServer", daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+        log_service_message(f"Metrics endpoint on http://127.0.0.1:{self.port}/metrics")
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class MetricsReporter:
+    """Logs a one-line metrics summary every `interval` seconds until stop_event is set."""
+
+    def __init__(self, stop_event: threading.Event, interval: float, registry: MetricsRegistry = METRICS):
+        self.stop_event = stop_event
+        self.interval = interval
+        self.registry = registry
+        self.thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self.interval <= 0 or (self.thread and self.thread.is_alive()):
+            return
+        self.thread = threading.Thread(target=self._run, name="MetricsReporter", daemon=True)
+        self.thread.start()
+
+    def _run(self) -> None:
+        while not self.stop_event.wait(self.interval):
+            log_service_message(self.registry.summary_line())
@@ -0,0 +1,122 @@
+# normalize.py
+import re
+import threading
+from itertools import groupby
+from .admission import truncate
+from .config import CONFIG_STORE, ConfigStore
+
+DEFAULT_EMOTES = {
+    "LUL": "lol",
+    "LULW": "lol",
+    "OMEGALUL": "lol",
+    "KEKW": "kek",
+    "PogChamp": "pog",
+    "Pog": "pog",
+    "PogU": "pog",
+    "Kappa": "kappa",
+    "monkaS": "yikes",
+    "Sadge": "sad",
+    "catJAM": "",
+    "<3": "heart",
+}
+
+DEFAULT_NORMALIZATION = {
+    "enabled": True,
+    "max_repeat": 3,
+    "max_combining": 2,
+    "max_symbols": 3,
+    "dedupe_tokens": True,
+    "max_length": 500,
+    "emotes": DEFAULT_EMOTES,
+}
+
+# combining marks (zalgo)
+_MARKS = "\u0300-\u036f\u0483-\u0489\u0591-\u05bd\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f"
+# box drawing, block elements, geometric shapes and braille: chat ASCII art
+_ART = re.compile("[\u2500-\u25ff\u2800-\u28ff]+")
+# arrows, misc symbols, dingbats, emoji and friends
+_SYMBOLS = "\u2190-\u21ff\u2300-\u23ff\u2600-\u27bf\u2b00-\u2bff\U0001f000-\U0001faff\ufe0f\u200d"
+
+
+class TextNormalizer:
+    """
+    Makes chat easier and faster to synthesize, in two passes around the
+    substitutions. prepare() runs first, so floods never reach the
+    substitution patterns: it cuts raw input to max_length, keeps at most
+    max_combining combining marks per character, drops ASCII art and
+    shortens runs of one letter or symbol to max_repeat (digits are left
+    alone) and of emoji to max_symbols. finish() runs after, so rules can
+    still match emote names: it replaces emotes with the spoken form from
+    the emotes table ("" drops them) and collapses a token repeated back to
+    back into one. Character steps are precompiled patterns (the
+    Unicode-only ones skipped for ASCII lines), token steps one pass over
+    text.split(); all are linear in the input.
+    Settings follow the "normalization" section of the shared config.
+    """
+
+    def __init__(self, settings: dict | None = None, store: ConfigStore | None = CONFIG_STORE):
+        self.store = store
+        self._lock = threading.Lock()
+        if settings is None and store is not None:
+            settings = store.get().get("normalization", {})
+        self.configure(settings or {})
+        if store is not None:
+            store.subscribe(self._on_config)
+
+    def _on_config(self, config) -> None:
+        self.configure(config.get("normalization", {}))
+
+    def configure(self, settings: dict) -> None:
+        cfg = {**DEFAULT_NORMALIZATION, **settings}
+        unicode_steps = []
+        max_combining = int(cfg["max_combining"])
+        marks = f"[{_MARKS}]"
+        if max_combining > 0:
+            unicode_steps.append((re.compile(f"({marks}{{{max_combining}}}){marks}+"), r"\1"))
+        else:
+            unicode_steps.append((re.compile(f"{marks}+"), ""))
+        unicode_steps.append((_ART, " "))
+        max_symbols = max(1, int(cfg["max_symbols"]))
+        symbol = f"[{_SYMBOLS}]\\s*"
+        unicode_steps.append((re.compile(f"((?:{symbol}){{{max_symbols}}})(?:{symbol})+"), r"\1 "))
+        max_repeat = max(1, int(cfg["max_repeat"]))
+        # letters and punctuation, not digits: "100000" is what was said
+        repeat = (re.compile(f"([^\\W\\d_]|[^\\w\\s])\\1{{{max_repeat},}}"), "\\1" * max_repeat)
+        with self._lock:
+            self.enabled = bool(cfg["enabled"])
+            self.max_length = int(cfg["max_length"])
+            self.dedupe_tokens = bool(cfg["dedupe_tokens"])
+            self.emotes = dict(cfg["emotes"])
+            self._unicode_steps = unicode_steps
+            self._repeat = repeat
+
+    def close(self) -> None:
+        if self.store is not None:
+            self.store.unsubscribe(self._on_config)
+
+    def apply(self, text: str) -> str:
+        """Both passes, for text that gets no substitutions."""
+        return self.finish(self.prepare(text))
+
+    def prepare(self, text: str) -> str:
+        """Character pass, run before substitutions."""
+        if not self.enabled:
+            return text
+        text = truncate(text, self.max_length)
+        if not text.isascii():
+            for pattern, repl in self._unicode_steps:
+                text = pattern.sub(repl, text)
+        pattern, repl = self._repeat
+        return pattern.sub(repl, text)
+
+    def finish(self, text: str) -> str:
+        """Token pass (emotes, repeated tokens), run after substitutions."""
+        if not self.enabled:
+            return text
+        tokens = text.split()
+        if self.emotes:
+            emotes = self.emotes
+            tokens = [word for word in (emotes.get(t, t) for t in tokens) if word]
+        if self.dedupe_tokens:
+            tokens = [word for word, _ in groupby(tokens)]
+        return " ".join(tokens)
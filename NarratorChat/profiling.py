@@ -0,0 +1,201 @@
+# profiling.py
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from datetime import datetime
+from .config import PROFILE_FOLDER, log_service_message
+from .metrics import METRICS
+
+DEFAULT_PROFILING = {
+    "slow_message_ms": 5000,
+    "capture": False,
+    "capture_seconds": 30,
+    "sample_ms": 5,
+}
+# threads sampled by Profiler: the chat reader and every speech worker/lane/renderer
+PROFILE_THREADS = ("TwitchListener", "SpeechWorker")
+# at most one slow-message line per this many seconds
+SLOW_LOG_INTERVAL = 5.0
+
+
+class SlowMessageTracer:
+    """
+    Logs chat lines that took longer than threshold_ms from the socket to
+    their first audio, with the time spent in each stage (SpeechItem.stages)
+    and what is left over as "other". At most one line is logged per
+    SLOW_LOG_INTERVAL seconds; the ones skipped are counted in the next.
+    threshold_ms <= 0 turns it off.
+    """
+
+    def __init__(self, threshold_ms: float = 0.0, clock=time.monotonic):
+        self.threshold = threshold_ms / 1000
+        self.clock = clock
+        self.slow = 0
+        self._suppressed = 0
+        self._last_log = float("-inf")
+        self._lock = threading.Lock()
+
+    def configure(self, settings: dict) -> None:
+        self.threshold = settings.get("slow_message_ms", DEFAULT_PROFILING["slow_message_ms"]) / 1000
+
+    def observe(self, where: str, item) -> bool:
+        """Check one spoken line. True if it was slow."""
+        total = item.stages.get("to_audio")
+        if self.threshold <= 0 or total is None or total < self.threshold:
+            return False
+        METRICS.inc("messages_slow")
+        now = self.clock()
+        with self._lock:
+            self.slow += 1
+            if now - self._last_log < SLOW_LOG_INTERVAL:
+                self._suppressed += 1
+                return True
+            self._last_log = now
+            suppressed, self._suppressed = self._suppressed, 0
+        stages = {k: v for k, v in item.stages.items() if k != "to_audio"}
+        before_audio = sum(v for k, v in stages.items() if k != "speak")
+        parts = [f"{k} {v * 1000:.1f}ms" for k, v in sorted(stages.items(), key=lambda kv: -kv[1])]
+        parts.append(f"other {max(total - before_audio, 0) * 1000:.1f}ms")
+        more = f" (+{suppressed} more slow since the last report)" if suppressed else ""
+        log_service_message(f"Slow message in {where} @{item.username}: {total * 1000:.0f}ms to audio: "
+                            f"{', '.join(parts)}{more}", "warning")
+        return True
+
+
+SLOW_MESSAGES = SlowMessageTracer(DEFAULT_PROFILING["slow_message_ms"])
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Profiler:
+    """
+    Sampling profiler for the listener and speech threads. While a capture
+    runs, a background thread reads every PROFILE_THREADS thread's stack
+    each sample_ms, and at the end writes to `folder`:
+      - profile-<time>.folded: one "thread;outer;...;inner count" line per
+        distinct stack (flamegraph.pl / speedscope format)
+      - profile-<time>.txt: samples per thread and the functions with the
+        most samples, on their own and including what they call
+    capture() takes one profile; with "capture": true in the "profiling"
+    config section, profiles are taken back to back until it is turned off.
+    Only a thread's stack is read, so the sampled threads are never paused
+    beyond the GIL hand-off.
+    """
+
+    def __init__(self, folder: str = PROFILE_FOLDER, threads: tuple[str, ...] = PROFILE_THREADS):
+        self.folder = folder
+        self.threads = threads
+        self.capture_seconds = DEFAULT_PROFILING["capture_seconds"]
+        self.interval = DEFAULT_PROFILING["sample_ms"] / 1000
+        self.last_paths: list[str] = []
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._continuous = False
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def configure(self, settings: dict) -> None:
+        cfg = {**DEFAULT_PROFILING, **settings}
+        self.capture_seconds = cfg["capture_seconds"]
+        self.interval = max(cfg["sample_ms"], 1) / 1000
+        if cfg["capture"] and not self._continuous:
+            self._begin(self.capture_seconds, continuous=True)
+        elif not cfg["capture"] and self._continuous:
+            self.stop()
+
+    def capture(self, seconds: float | None = None) -> bool:
+        """Start one capture of `seconds` (capture_seconds by default). False if one is already running."""
+        return self._begin(seconds or self.capture_seconds, continuous=False)
+
+    def _begin(self, seconds: float, continuous: bool) -> bool:
+        with self._lock:
+            if self.running:
+                if continuous:
+                    log_service_message("Profile capture already running; continuous profiling starts after it")
+                    self._continuous = True
+                return False
+            self._stop = threading.Event()
+            self._continuous = continuous
+            self._thread = threading.Thread(target=self._run, args=(seconds, self._stop),
+                                            name="ProfileSampler", daemon=True)
+            self._thread.start()
+        log_service_message(f"Profiling {', '.join(self.threads)} threads for {seconds:g}s"
+                            f"{' at a time until turned off' if continuous else ''}")
+        return True
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """End the running capture early; what was sampled so far is still written."""
+        self._continuous = False
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def _run(self, seconds: float, stop: threading.Event) -> None:
+        while True:
+            stacks, samples, elapsed = self._sample(seconds, stop)
+            try:
+                self.last_paths = self._write(stacks, samples, elapsed)
+                log_service_message(f"Profile written: {self.last_paths[-1]}")
+            except OSError as e:
+                log_service_message(f"Failed to write profile: {e}")
+            if stop.is_set() or not self._continuous:
+                return
+
+    def _sample(self, seconds: float, stop: threading.Event) -> tuple[Counter, Counter, float]:
+        stacks: Counter = Counter()
+        samples: Counter = Counter()
+        start = time.monotonic()
+        deadline = start + seconds
+        names: dict[int, str] = {}
+        rounds = 0
+        while time.monotonic() < deadline and not stop.is_set():
+            if rounds % 50 == 0:
+                # thread names change rarely; refresh now and then
+                names = {t.ident: t.name for t in threading.enumerate() if t.name.startswith(self.threads)}
+            rounds += 1
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident)
+                if name is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(name)
+                stacks[tuple(reversed(stack))] += 1
+                samples[name] += 1
+            stop.wait(self.interval)
+        return stacks, samples, time.monotonic() - start
+
+    def _write(self, stacks: Counter, samples: Counter, elapsed: float) -> list[str]:
+        os.makedirs(self.folder, exist_ok=True)
+        base = os.path.join(self.folder, f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+        with open(base + ".folded", "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+        own: Counter = Counter()
+        inclusive: Counter = Counter()
+        for stack, count in stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack[1:]):
+                inclusive[label] += count
+        total = sum(samples.values()) or 1
+        lines = [f"Sampled {elapsed:.1f}s every {self.interval * 1000:g}ms: {total} stack samples", "",
+                 "samples  thread"]
+        lines += [f"{count:>7}  {name}" for name, count in samples.most_common()]
+        for title, counts in (("own", own), ("including callees", inclusive)):
+            lines += ["", f"{'samples':>7} {'%':>6}  function ({title})"]
+            lines += [f"{count:>7} {count / total * 100:>5.1f}%  {label}" for label, count in counts.most_common(30)]
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return [base + ".folded", base + ".txt"]
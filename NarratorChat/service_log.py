@@ -0,0 +1,152 @@
+# service_log.py
+import os
+import json
+import queue
+import threading
+import time
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+# after a failed rotation, keep appending and try again this much later
+ROTATE_RETRY_SECONDS = 60.0
+
+
+class ServiceLogger:
+    """
+    Writes service.log from a background thread so callers never touch the disk.
+    Lines are queued, written in batches through a file kept open, and the file
+    is rotated to service.log.1..N once it passes max_bytes or has been open for
+    rotate_seconds. If rotating fails (on Windows, while another process has
+    service.log open), lines keep going to the current file and rotation is
+    retried after ROTATE_RETRY_SECONDS. Lines below `level` are dropped
+    before formatting; with json_lines each record is written as one JSON
+    object.
+    """
+
+    def __init__(self, path: str, level: str = "info", json_lines: bool = False,
+                 max_bytes: int = 5 * 1024 * 1024, backups: int = 3, rotate_seconds: float = 0):
+        self.path = path
+        self.configure(level, json_lines, max_bytes, backups, rotate_seconds)
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._file = None
+        self._opened_at = 0.0
+        self._retry_rotate_at = 0.0
+        self.dropped_writes = 0
+        self.rotate_failures = 0
+
+    def configure(self, level: str = "info", json_lines: bool = False, max_bytes: int = 5 * 1024 * 1024,
+                  backups: int = 3, rotate_seconds: float = 0) -> None:
+        self.level = LEVELS.get(str(level).lower(), LEVELS["info"])
+        self.json_lines = json_lines
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.rotate_seconds = rotate_seconds
+
+    def enabled(self, level: str) -> bool:
+        return LEVELS.get(level, LEVELS["info"]) >= self.level
+
+    def log(self, msg: str, level: str = "info", **fields) -> None:
+        if LEVELS.get(level, LEVELS["info"]) < self.level:
+            return
+        if self._thread is None:
+            self._start()
+        self._queue.put((time.time(), level, msg, fields))
+
+    def flush(self, timeout: float = 2.0) -> bool:
+        """Block until everything queued so far is on disk."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ServiceLogger", daemon=True)
+                self._thread.start()
+
+    def _format(self, record) -> str:
+        ts, level, msg, fields = record
+        if self.json_lines:
+            data = {"ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(ts)), "level": level, "msg": msg}
+            data.update(fields)
+            return json.dumps(data, ensure_ascii=False, default=str) + "\n"
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
+        tag = "" if level == "info" else f"[{level.upper()}] "
+        extra = "".join(f" {k}={v}" for k, v in fields.items())
+        return f"[{timestamp}] {tag}{msg}{extra}\n"
+
+    def _open(self) -> None:
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._opened_at = time.time()
+
+    def _close(self) -> None:
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+    def _rotation_due(self, incoming: int) -> bool:
+        size = self._file.tell()
+        if not size or time.monotonic() < self._retry_rotate_at:
+            return False
+        return bool((self.max_bytes and size + incoming > self.max_bytes) or
+                    (self.rotate_seconds and time.time() - self._opened_at >= self.rotate_seconds))
+
+    def _rotate(self) -> None:
+        # the file must be closed before it can be renamed on Windows
+        self._close()
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def _write(self, text: str) -> None:
+        try:
+            if self._file is None:
+                self._open()
+            if self._rotation_due(len(text)):
+                opened_at = self._opened_at
+                try:
+                    self._rotate()
+                    self._open()
+                except OSError as e:
+                    self.rotate_failures += 1
+                    self._retry_rotate_at = time.monotonic() + ROTATE_RETRY_SECONDS
+                    self._open()
+                    self._opened_at = opened_at
+                    text = self._format((time.time(), "warning", f"Could not rotate {os.path.basename(self.path)}, "
+                                         f"retrying in {ROTATE_RETRY_SECONDS:.0f}s: {e}", {})) + text
+            self._file.write(text)
+            self._file.flush()
+        except Exception:
+            self.dropped_writes += 1
+            self._close()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 1000:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines = []
+            waiters = []
+            for record in batch:
+                if isinstance(record, threading.Event):
+                    waiters.append(record)
+                else:
+                    lines.append(self._format(record))
+            if lines:
+                self._write("".join(lines))
+            for done in waiters:
+                done.set()
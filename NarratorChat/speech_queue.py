@@ -0,0 +1,516 @@
+# speech_queue.py
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from queue import Empty, SimpleQueue
+from dataclasses import dataclass, field
+from .audio_cache import AudioCache
+from .backends import SpeechBackend
+from .config import log_service_message
+from .metrics import METRICS
+from .profiling import SLOW_MESSAGES
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "coalesce")
+
+
+def join_lines(first: str, second: str) -> str:
+    """Join two chat lines into one utterance with a sentence break between them."""
+    first = first.rstrip()
+    if first and first[-1] not in ".!?":
+        first += "."
+    return f"{first} {second.lstrip()}"
+
+
+@dataclass
+class SpeechItem:
+    username: str
+    voice_id: str
+    text: str
+    priority: int = 0
+    enqueued_at: float = field(default_factory=time.monotonic)
+    # time.perf_counter() when the chat line came off the socket
+    received_at: float = 0.0
+    # seconds spent in each pipeline stage, for the slow-message trace
+    stages: dict[str, float] = field(default_factory=dict)
+
+
+class SpeechQueue:
+    """
+    Bounded queue of chat lines waiting to be spoken.
+    Higher priority items are spoken first, FIFO within a priority.
+    When full, `overflow` decides what gives:
+      - drop_oldest: the oldest item of the lowest queued priority is dropped
+      - drop_newest: the incoming item is dropped
+      - coalesce: a line already queued for the same user is replaced by the
+        new one; otherwise behaves like drop_oldest
+    An incoming item never displaces one with a higher priority than its own.
+    With merge_window > 0, a line from a user whose previous line is still
+    queued (same voice and priority, first queued at most merge_window
+    seconds ago) is appended to that line instead, while the result stays
+    within merge_max_length characters, saving a synthesis call.
+    """
+
+    def __init__(self, max_size: int = 100, overflow: str = "drop_oldest",
+                 merge_window: float = 0.0, merge_max_length: int = 200):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.max_size = max(1, max_size)
+        self.overflow = overflow
+        self.merge_window = merge_window
+        self.merge_max_length = merge_max_length
+        self._levels: dict[int, deque[SpeechItem]] = {}
+        # each user's most recently queued item, for merging
+        self._latest: dict[str, SpeechItem] = {}
+        self._size = 0
+        self._cond = threading.Condition()
+        # bumped by wake() to release blocked get() calls
+        self._wakeups = 0
+        self.enqueued = 0
+        self.dequeued = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.merged = 0
+        self.max_depth = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _lowest(self) -> tuple[int, deque[SpeechItem]] | None:
+        for prio in sorted(self._levels):
+            if self._levels[prio]:
+                return prio, self._levels[prio]
+        return None
+
+    def _forget(self, item: SpeechItem) -> None:
+        # caller holds the lock; item just left the queue
+        if self._latest.get(item.username) is item:
+            del self._latest[item.username]
+
+    def _coalesce(self, item: SpeechItem) -> bool:
+        for level in self._levels.values():
+            for i, queued in enumerate(level):
+                if queued.username == item.username:
+                    # keep the original place in line, speak the newest text
+                    item.enqueued_at = queued.enqueued_at
+                    if item.priority == queued.priority:
+                        level[i] = item
+                    else:
+                        del level[i]
+                        self._levels.setdefault(item.priority, deque()).append(item)
+                    self._forget(queued)
+                    return True
+        return False
+
+    def _merge(self, item: SpeechItem) -> bool:
+        # caller holds the lock
+        latest = self._latest.get(item.username)
+        if (latest is None or latest.voice_id != item.voice_id or latest.priority != item.priority
+                or item.enqueued_at - latest.enqueued_at > self.merge_window):
+            return False
+        text = join_lines(latest.text, item.text)
+        if len(text) > self.merge_max_length:
+            return False
+        latest.text = text
+        return True
+
+    def put(self, item: SpeechItem) -> bool:
+        """
+        Queue an item. Returns False if it was dropped or coalesced away;
+        a line merged into the user's queued one counts as queued.
+        """
+        with self._cond:
+            self.enqueued += 1
+            if self.merge_window > 0 and self._merge(item):
+                self.merged += 1
+                METRICS.inc("messages_merged")
+                return True
+            if self._size >= self.max_size:
+                if self.overflow == "coalesce" and self._coalesce(item):
+                    self.coalesced += 1
+                    self._cond.notify()
+                    return False
+                lowest_prio, lowest = self._lowest()
+                if self.overflow == "drop_newest" or item.priority < lowest_prio:
+                    self.dropped += 1
+                    return False
+                self._forget(lowest.popleft())
+                self._size -= 1
+                self.dropped += 1
+            self._levels.setdefault(item.priority, deque()).append(item)
+            self._latest[item.username] = item
+            self._size += 1
+            self.max_depth = max(self.max_depth, self._size)
+            self._cond.notify()
+            return True
+
+    def get(self, timeout: float | None = None) -> SpeechItem | None:
+        """Pop the next item to speak, or None if nothing arrived within timeout."""
+        with self._cond:
+            wakeups = self._wakeups
+            if not self._size and not self._cond.wait_for(
+                    lambda: self._size or self._wakeups != wakeups, timeout):
+                return None
+            if not self._size:
+                return None
+            for prio in sorted(self._levels, reverse=True):
+                if self._levels[prio]:
+                    item = self._levels[prio].popleft()
+                    break
+            self._forget(item)
+            self._size -= 1
+            self.dequeued += 1
+            waited = time.monotonic() - item.enqueued_at
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            return item
+
+    def wake(self) -> None:
+        """Make every blocked get() return None now."""
+        with self._cond:
+            self._wakeups += 1
+            self._cond.notify_all()
+
+    def clear(self) -> int:
+        with self._cond:
+            cleared = self._size
+            self._levels.clear()
+            self._latest.clear()
+            self._size = 0
+            self.dropped += cleared
+            return cleared
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "depth": self._size,
+                "max_depth": self.max_depth,
+                "enqueued": self.enqueued,
+                "dequeued": self.dequeued,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+                "merged": self.merged,
+                "wait_avg": self.wait_total / self.dequeued if self.dequeued else 0.0,
+                "wait_max": self.wait_max,
+            }
+
+
+def merge_stats(stats: list[dict]) -> dict:
+    """Combine SpeechQueue.stats() from several queues into one summary."""
+    dequeued = sum(s["dequeued"] for s in stats)
+    merged = {key: sum(s[key] for s in stats)
+              for key in ("depth", "enqueued", "dequeued", "dropped", "coalesced", "merged")}
+    merged["max_depth"] = max((s["max_depth"] for s in stats), default=0)
+    merged["wait_avg"] = sum(s["wait_avg"] * s["dequeued"] for s in stats) / dequeued if dequeued else 0.0
+    merged["wait_max"] = max((s["wait_max"] for s in stats), default=0.0)
+    return merged
+
+
+class SpeechWorker:
+    """
+    Thread draining a SpeechQueue into a SpeechBackend until stop_event is set.
+    With an AudioCache, short lines are rendered once with synthesize() and
+    repeats play the cached PCM instead of being synthesized again.
+    Lines that waited longer than max_age seconds (0 = no limit) are dropped.
+    """
+
+    def __init__(self, queue: SpeechQueue, backend: SpeechBackend, stop_event: threading.Event,
+                 audio_cache: AudioCache | None = None, name: str = "SpeechWorker"):
+        self.queue = queue
+        self.backend = backend
+        self.stop_event = stop_event
+        self.audio_cache = audio_cache
+        self.name = name
+        self.max_age = 0.0
+        self.spoken = 0
+        self.errors = 0
+        self.expired = 0
+        # dequeued lines dropped by clear() before they were spoken
+        self.discarded = 0
+        # output device for this worker's audio ("" = default) and, when
+        # several workers share a limit on simultaneous playback, its slots
+        self.device = ""
+        self.output_slots: threading.Semaphore | None = None
+        self.playing = False
+        self.thread: threading.Thread | None = None
+        self._stopped = False
+        # time.monotonic() when the last utterance finished, for the gap metric
+        self._finished_at = 0.0
+
+    def is_alive(self) -> bool:
+        return bool(self.thread and self.thread.is_alive())
+
+    def start(self) -> None:
+        if self.is_alive():
+            return
+        self._stopped = False
+        self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Stop this worker alone, leaving stop_event untouched."""
+        self._stopped = True
+        self.wake()
+
+    def wake(self) -> None:
+        """Interrupt idle waits so a stop is noticed straight away."""
+        self.queue.wake()
+
+    def join(self, timeout: float | None = None) -> None:
+        if self.thread:
+            self.thread.join(timeout)
+
+    def idle(self) -> bool:
+        """True when nothing is queued and every dequeued line has been dealt with."""
+        return not len(self.queue) and \
+            self.spoken + self.errors + self.expired + self.discarded >= self.queue.dequeued
+
+    def clear(self) -> int:
+        """Drop every line waiting to be spoken; the one playing now finishes. Returns the queued count."""
+        return self.queue.clear()
+
+    def skip(self) -> int:
+        """Cut short the line this worker is playing; other workers carry on. Returns 1 if one was playing."""
+        if not self.playing or self.thread is None:
+            return 0
+        self.backend.interrupt(self.thread.ident)
+        return 1
+
+    def _speak(self, item: SpeechItem) -> None:
+        cache = self.audio_cache
+        if cache is None or not cache.cacheable(item.text):
+            self._output(item, self.backend.speak, item.voice_id, item.text)
+            return
+        pcm = cache.get(item.voice_id, item.text)
+        if pcm is None:
+            try:
+                start = time.perf_counter()
+                pcm = self.backend.synthesize(item.voice_id, item.text)
+                item.stages["synthesize"] = time.perf_counter() - start
+            except Exception as e:
+                log_service_message(f"Synthesis to buffer failed, speaking directly: {e}")
+                self._output(item, self.backend.speak, item.voice_id, item.text)
+                return
+            cache.put(item.voice_id, item.text, pcm)
+        self._output(item, self.backend.play, pcm)
+
+    def _output(self, item: SpeechItem, play, *args) -> None:
+        """Run speak()/play() for item, holding one of the shared output slots if there are any."""
+        slots = self.output_slots
+        if slots is not None:
+            start = time.perf_counter()
+            while not slots.acquire(timeout=0.1):
+                if not self._running():
+                    return
+            item.stages["output_wait"] = time.perf_counter() - start
+            METRICS.observe("output_wait", item.stages["output_wait"])
+        try:
+            self._audio_starting(item)
+            self.playing = True
+            play(*args)
+        finally:
+            self.playing = False
+            if slots is not None:
+                slots.release()
+
+    def _running(self) -> bool:
+        return not self.stop_event.is_set() and not self._stopped
+
+    def _next_item(self, timeout: float) -> SpeechItem | None:
+        """Dequeue the next item that is not too old to speak."""
+        while True:
+            item = self.queue.get(timeout=timeout)
+            if item is None:
+                return None
+            waited = time.monotonic() - item.enqueued_at
+            item.stages["queue_wait"] = waited
+            METRICS.observe("queue_wait", waited)
+            if not self.max_age or waited <= self.max_age:
+                return item
+            self.expired += 1
+            METRICS.inc("messages_expired")
+
+    def _audio_starting(self, item: SpeechItem) -> None:
+        """Called right before speak()/play(), when the line is about to be heard."""
+        if item.received_at:
+            item.stages["to_audio"] = time.perf_counter() - item.received_at
+            METRICS.observe("to_audio", item.stages["to_audio"])
+        # silence between two utterances that were both waiting; with speak()
+        # synthesis happens inside the call, so the true gap is larger
+        if self._finished_at and item.enqueued_at <= self._finished_at:
+            METRICS.observe("gap", time.monotonic() - self._finished_at)
+
+    def _end_utterance(self, item: SpeechItem, start: float, error: Exception | None) -> None:
+        if error is None:
+            self.spoken += 1
+            METRICS.inc("messages_spoken")
+        else:
+            self.errors += 1
+            METRICS.inc("messages_errored")
+            log_service_message(f"TTS speak error @{item.username}: {error}")
+        item.stages["speak"] = time.perf_counter() - start
+        METRICS.observe("speak", item.stages["speak"])
+        self._finished_at = time.monotonic()
+        SLOW_MESSAGES.observe(self.name, item)
+
+    def _init_thread(self) -> bool:
+        try:
+            self.backend.thread_init()
+            if self.device:
+                self.backend.set_output(self.device)
+        except Exception as e:
+            log_service_message(f"Speech backend init failed: {e}")
+            return False
+        return True
+
+    def _run(self) -> None:
+        if not self._init_thread():
+            return
+        try:
+            while self._running():
+                item = self._next_item(timeout=0.5)
+                if item is None:
+                    continue
+                start = time.perf_counter()
+                error = None
+                try:
+                    self._speak(item)
+                except Exception as e:
+                    error = e
+                self._end_utterance(item, start, error)
+        finally:
+            self.backend.thread_exit()
+            log_service_message(f"{self.name} exiting")
+
+
+class PipelinedSpeechWorker(SpeechWorker):
+    """
+    SpeechWorker that renders upcoming lines while the current one plays.
+    The playback thread keeps up to `lookahead` dequeued items in flight,
+    hands each to a pool of `synth_workers` threads that synthesize() it to
+    PCM (through the AudioCache when there is one), and plays the results
+    strictly in dequeue order, so a channel's lines never overtake each other.
+    A line whose synthesis fails is spoken directly instead.
+    """
+
+    def __init__(self, queue: SpeechQueue, backend: SpeechBackend, stop_event: threading.Event,
+                 audio_cache: AudioCache | None = None, name: str = "SpeechWorker",
+                 lookahead: int = 3, synth_workers: int = 2):
+        super().__init__(queue, backend, stop_event, audio_cache, name)
+        self.lookahead = max(1, lookahead)
+        self.synth_workers = max(1, synth_workers)
+        self._jobs: SimpleQueue = SimpleQueue()
+        self._synth_threads: list[threading.Thread] = []
+        # set by clear(); the playback thread then drops the lines rendering ahead
+        self._discard = False
+
+    def start(self) -> None:
+        if self.is_alive():
+            return
+        super().start()
+        self._synth_threads = [t for t in self._synth_threads if t.is_alive()]
+        for i in range(len(self._synth_threads), self.synth_workers):
+            thread = threading.Thread(target=self._synth_run, name=f"{self.name}-synth{i}", daemon=True)
+            thread.start()
+            self._synth_threads.append(thread)
+
+    def wake(self) -> None:
+        super().wake()
+        for _ in self._synth_threads:
+            self._jobs.put(None)
+
+    def clear(self) -> int:
+        self._discard = True
+        return super().clear()
+
+    def _render(self, item: SpeechItem) -> bytes:
+        cache = self.audio_cache
+        if cache is not None and cache.cacheable(item.text):
+            pcm = cache.get(item.voice_id, item.text)
+            if pcm is not None:
+                return pcm
+        start = time.perf_counter()
+        pcm = self.backend.synthesize(item.voice_id, item.text)
+        item.stages["synthesize"] = time.perf_counter() - start
+        METRICS.observe("synthesize", item.stages["synthesize"])
+        if cache is not None:
+            cache.put(item.voice_id, item.text, pcm)
+        return pcm
+
+    def _synth_run(self) -> None:
+        try:
+            self.backend.thread_init()
+        except Exception as e:
+            log_service_message(f"Speech backend init failed: {e}")
+            return
+        try:
+            while self._running():
+                try:
+                    job = self._jobs.get(timeout=0.5)
+                except Empty:
+                    continue
+                if job is None:
+                    continue
+                item, future = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(self._render(item))
+                except Exception as e:
+                    future.set_exception(e)
+        finally:
+            self.backend.thread_exit()
+
+    def _fill(self, pending: deque, wait: bool) -> None:
+        """Hand queued lines to the synthesizers until `lookahead` are in flight."""
+        while len(pending) < self.lookahead:
+            item = self._next_item(timeout=0.5 if wait and not pending else 0)
+            if item is None:
+                return
+            future: Future = Future()
+            self._jobs.put((item, future))
+            pending.append((item, future))
+
+    def _run(self) -> None:
+        if not self._init_thread():
+            return
+        pending: deque[tuple[SpeechItem, Future]] = deque()
+        try:
+            while self._running():
+                if self._discard:
+                    self._discard = False
+                    for _, future in pending:
+                        future.cancel()
+                    self.discarded += len(pending)
+                    pending.clear()
+                self._fill(pending, wait=not pending)
+                if not pending:
+                    continue
+                item, future = pending[0]
+                try:
+                    pcm = future.result(timeout=0.05)
+                except FutureTimeout:
+                    continue
+                except Exception as e:
+                    log_service_message(f"Synthesis to buffer failed, speaking directly: {e}")
+                    pcm = None
+                pending.popleft()
+                # queue the next lines so they render while this one plays
+                self._fill(pending, wait=False)
+                start = time.perf_counter()
+                error = None
+                try:
+                    if pcm is None:
+                        self._output(item, self.backend.speak, item.voice_id, item.text)
+                    else:
+                        self._output(item, self.backend.play, pcm)
+                except Exception as e:
+                    error = e
+                self._end_utterance(item, start, error)
+        finally:
+            for _, future in pending:
+                future.cancel()
+            self.backend.thread_exit()
+            log_service_message(f"{self.name} exiting")
@@ -0,0 +1,61 @@
+# state.py
+import os
+import json
+import threading
+import time
+from .config import STATE_PATH, log_service_message
+
+STATE_VERSION = 1
+
+
+class RuntimeState:
+    """
+    Snapshot of warm runtime state kept in RuntimeState.json between runs:
+    which voice each recent chatter was given and the audio cache's disk
+    index. The file is only read the first time a section is asked for, and
+    save() writes it atomically (temp file + os.replace) like save_config.
+    """
+
+    def __init__(self, path: str = STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data: dict | None = None
+        self.load_seconds = 0.0
+
+    def _read(self) -> dict:
+        start = time.perf_counter()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if not isinstance(data, dict) or data.get("version") != STATE_VERSION:
+                data = {}
+        except FileNotFoundError:
+            data = {}
+        except Exception as e:
+            log_service_message(f"Ignoring unreadable runtime state: {e}", "warning")
+            data = {}
+        self.load_seconds = time.perf_counter() - start
+        return data
+
+    def section(self, name: str):
+        """Return one saved section, or None if there is none."""
+        with self._lock:
+            if self._data is None:
+                self._data = self._read()
+            return self._data.get(name)
+
+    def save(self, sections: dict) -> bool:
+        data = {"version": STATE_VERSION, "saved_at": time.time(), **sections}
+        temp_path = self.path + ".tmp"
+        with self._lock:
+            try:
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+                os.replace(temp_path, self.path)
+            except Exception as e:
+                log_service_message(f"Failed to save runtime state: {e}")
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                return False
+            self._data = data
+        return True
@@ -0,0 +1,123 @@
+# substitutions.py
+import re
+import threading
+from typing import Callable
+from .config import CONFIG_STORE, ConfigStore, log_service_message
+
+# Matches rules written as a plain word list, e.g. "\b(badword1|badword2)\b"
+_WORD_LIST_RULE = re.compile(r"^\\b\((?:\?:)?(\w+(?:\|\w+)*)\)\\b$")
+
+
+def _trie_regex(node: dict) -> str:
+    """Turn a character trie into an alternation that never re-scans a shared prefix."""
+    end = "" in node
+    branches = [re.escape(ch) + _trie_regex(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ""
+    if len(branches) == 1 and not end:
+        return branches[0]
+    body = "(?:" + "|".join(branches) + ")"
+    return body + "?" if end else body
+
+
+def word_list_regex(words: list[str]) -> str:
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+    return _trie_regex(trie)
+
+
+def _word_list(rule: dict) -> list[str] | None:
+    """Return the literal words of a word-list rule, or None for any other pattern."""
+    m = _WORD_LIST_RULE.match(rule.get("pattern", ""))
+    if not m or "\\" in rule.get("replacement", ""):
+        return None
+    return list(dict.fromkeys(m.group(1).split("|")))
+
+
+def compile_rules(rules: list[dict]) -> list[tuple[re.Pattern, object]]:
+    """
+    Compile substitution rules into (pattern, replacement) steps applied in order.
+    Consecutive word-list rules with plain replacements are merged into one
+    trie-backed alternation, as long as no replacement re-triggers the group.
+    """
+    steps: list[tuple[re.Pattern, object]] = []
+    group: list[tuple[list[str], str]] = []
+
+    def flush():
+        if not group:
+            return
+        if len(group) > 1:
+            merged = "|".join(
+                f"(?P<r{i}>{word_list_regex(words)})" for i, (words, _) in enumerate(group)
+            )
+            pattern = re.compile(rf"\b(?:{merged})\b", re.IGNORECASE)
+            if not any(pattern.search(repl) for _, repl in group):
+                repls = {f"r{i}": repl for i, (_, repl) in enumerate(group)}
+                steps.append((pattern, lambda m: repls[m.lastgroup]))
+                group.clear()
+                return
+        for words, repl in group:
+            steps.append((re.compile(rf"\b({word_list_regex(words)})\b", re.IGNORECASE), repl))
+        group.clear()
+
+    for rule in rules:
+        words = _word_list(rule)
+        if words is not None:
+            group.append((words, rule["replacement"]))
+            continue
+        flush()
+        try:
+            steps.append((re.compile(rule["pattern"], re.IGNORECASE), rule["replacement"]))
+        except re.error as e:
+            log_service_message(f"Regex error: {e}")
+        except (KeyError, TypeError) as e:
+            log_service_message(f"Invalid substitution rule {rule!r}: {e}")
+    flush()
+    return steps
+
+
+class SubstitutionEngine:
+    """
+    Applies the "substitutions" rules from config.json using patterns compiled once.
+    Rules come from the shared config store and are recompiled only when it
+    publishes a new snapshot; apply() itself never touches the disk.
+    `select` picks the rule list out of the config (the top-level
+    "substitutions" by default).
+    """
+
+    def __init__(self, select: Callable[[dict], list[dict]] | None = None,
+                 store: ConfigStore = CONFIG_STORE):
+        self.select = select or (lambda cfg: cfg.get("substitutions", []))
+        self.store = store
+        self._lock = threading.Lock()
+        self._steps: list[tuple[re.Pattern, object]] = []
+        self.load_rules(self.select(store.get()))
+        store.subscribe(self._on_config)
+
+    def _on_config(self, config) -> None:
+        self.load_rules(self.select(config))
+
+    def load_rules(self, rules: list[dict]) -> None:
+        steps = compile_rules(rules)
+        with self._lock:
+            self._steps = steps
+
+    def refresh(self) -> None:
+        """Recompile from the store's current snapshot."""
+        self._on_config(self.store.get())
+
+    def close(self) -> None:
+        """Stop following config changes."""
+        self.store.unsubscribe(self._on_config)
+
+    def apply(self, text: str) -> str:
+        for pattern, repl in self._steps:
+            try:
+                text = pattern.sub(repl, text)
+            except re.error as e:
+                log_service_message(f"Regex error: {e}")
+        return text
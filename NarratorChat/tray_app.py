@@ -7,13 +7,16 @@ import traceback
 import pystray
 from pystray import MenuItem as item
 from PIL import Image
-from .config import load_config, save_config, log_service_message, CONFIG_FOLDER
-from .bot_logic import test_voice_indices, speak_voice_index, get_voice_lists, TwitchBot
+from .config import CONFIG_STORE, log_service_message, CONFIG_FOLDER
+from .bot_logic import get_voice_lists, TwitchBot
+from .control import BotControl, start_control_server
 
 # Global bot instance and thread handles
 global_bot_instance: TwitchBot | None = None
 bot_thread: threading.Thread | None = None
 bot_shutdown_event: threading.Event | None = None
+# menu actions and the control API both go through this
+control = BotControl(lambda: global_bot_instance)
 
 icon_path = os.path.join(os.path.dirname(__file__), "Asset 3@4x.ico")
 try:
@@ -35,10 +38,13 @@ def start_bot_thread():
 
 def stop_bot_thread():
     global bot_thread, bot_shutdown_event, global_bot_instance
-    if bot_shutdown_event:
+    if global_bot_instance:
+        # bounded: drains queued speech briefly, then stops every bot thread
+        global_bot_instance.stop(timeout=5)
+    elif bot_shutdown_event:
         bot_shutdown_event.set()
     if bot_thread:
-        bot_thread.join(timeout=5)
+        bot_thread.join(timeout=1)
     bot_thread = None
     bot_shutdown_event = None
     global_bot_instance = None
@@ -46,8 +52,7 @@ def stop_bot_thread():
 
 
 def reconnect_bot():
-    if global_bot_instance:
-        threading.Thread(target=global_bot_instance.reconnect, daemon=True).start()
+    control.reconnect()
 
 
 
@@ -66,7 +71,7 @@ def prompt_and_speak():
 
         preferred, fallback = get_voice_lists()
         pool = preferred if preferred else fallback
-        choices = [f"{i}: {pool[i].GetDescription()}" for i in range(len(pool))]
+        choices = [f"{i}: {pool[i].description}" for i in range(len(pool))]
 
         root = tk.Tk()
         root.title("Select Voice")
@@ -85,43 +90,57 @@ def prompt_and_speak():
         if not selection:
             return
         idx = int(selection.split(":", 1)[0])
-        desc = pool[idx].GetDescription()
-        speak_voice_index(idx, extra_text=f"This is {desc}")
+        desc = pool[idx].description
+        control.speak_index(idx, extra_text=f"This is {desc}")
     except Exception as e:
         log_service_message(f"Speak voice input error: {e}")
 
 
 def run_tray():
     start_bot_thread()
+    server = start_control_server(control)
 
     def on_exit(icon, _):
+        if server:
+            server.stop()
         stop_bot_thread()
+        control.close()
         icon.stop()
 
     def toggle_tts(icon, _):
-        cfg = load_config()
-        cfg["tts_enabled"] = not cfg.get("tts_enabled", True)
-        save_config(cfg)
-        if global_bot_instance:
-            global_bot_instance.tts_enabled = cfg["tts_enabled"]
+        control.set_tts()
 
     def tts_text(_):
-        return "Disable TTS" if load_config().get("tts_enabled", True) else "Enable TTS"
+        return "Disable TTS" if CONFIG_STORE.get().get("tts_enabled", True) else "Enable TTS"
+
+    def toggle_profiling(icon, _):
+        control.set_profiling()
+
+    def profiling_text(_):
+        return "Stop Profiling" if CONFIG_STORE.get().get("profiling", {}).get("capture", False) \
+            else "Start Profiling"
 
     menu = (
         item(tts_text, toggle_tts),
         item("Reconnect", lambda i, j: reconnect_bot()),
-        item("Test Voice Indices", lambda i, j: threading.Thread(
-            target=test_voice_indices, daemon=True).start()),
+        item("Test Voice Indices", lambda i, j: control.test_voices()),
         item("Speak Voice by Index...", lambda i, j: threading.Thread(
             target=prompt_and_speak, daemon=True).start()),
+        item("Refresh Voice List", lambda i, j: control.refresh_voices()),
+        item(profiling_text, toggle_profiling),
         item("Open Config Folder", lambda i, j: open_config_folder()),
         item("Exit", on_exit),
     )
 
     icon = pystray.Icon("TTSBot", icon_image,
                         "NarratorChat TTS", pystray.Menu(*menu))
-    icon.run()
+    # keep the menu labels in step with edits made to config.json by hand
+    on_config = lambda _cfg: icon.update_menu()
+    CONFIG_STORE.subscribe(on_config)
+    try:
+        icon.run()
+    finally:
+        CONFIG_STORE.unsubscribe(on_config)
 
 
 if __name__ == "__main__":
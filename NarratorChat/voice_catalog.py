@@ -0,0 +1,138 @@
+# voice_catalog.py
+import os
+import json
+import threading
+import time
+import weakref
+from .backends import SpeechBackend, VoiceInfo
+from .config import CATALOG_PATH, CONFIG_STORE, log_service_message
+
+
+class VoiceCatalog:
+    """
+    Cached snapshot of a backend's installed voices.
+    Enumeration (slow with online Natural voices) happens at most once per
+    ttl seconds unless invalidate() is called. With persist=True the snapshot
+    is also written to VoiceCatalog.json so the next start can skip it, as
+    long as the backend's voice_stamp() still matches the one saved with
+    it: installing or removing a voice between runs re-enumerates.
+    `last_load` records where the last snapshot came from and how long it took.
+    """
+
+    def __init__(self, backend: SpeechBackend, ttl: float = 86400, persist: bool = False,
+                 path: str = CATALOG_PATH):
+        self.backend = backend
+        self.ttl = ttl
+        self.persist = persist
+        self.path = path
+        self._lock = threading.Lock()
+        self._voices: list[VoiceInfo] | None = None
+        self._loaded_at = 0.0
+        self.last_load: dict = {}
+
+    def _read_disk(self) -> tuple[list[VoiceInfo], float, str | None] | None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("backend") != type(self.backend).__name__:
+                return None
+            voices = [VoiceInfo(v["id"], v["description"]) for v in data["voices"]]
+            return voices, float(data["saved_at"]), data.get("stamp")
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            log_service_message(f"Ignoring unreadable voice catalog: {e}")
+            return None
+
+    def _write_disk(self, voices: list[VoiceInfo], saved_at: float, stamp: str | None) -> None:
+        temp_path = self.path + ".tmp"
+        data = {
+            "backend": type(self.backend).__name__,
+            "saved_at": saved_at,
+            "stamp": stamp,
+            "voices": [{"id": v.id, "description": v.description} for v in voices],
+        }
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            log_service_message(f"Failed to save voice catalog: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _load(self) -> None:
+        start = time.perf_counter()
+        source = "backend"
+        stamp = self._stamp() if self.persist else None
+        loaded = self._read_disk() if self.persist and self._voices is None else None
+        if loaded and time.time() - loaded[1] < self.ttl and self._still_installed(loaded[2], stamp):
+            voices, saved_at, _ = loaded
+            source = "disk"
+        else:
+            voices, saved_at = self.backend.list_voices(), time.time()
+            if self.persist:
+                self._write_disk(voices, saved_at, stamp)
+        self._voices = voices
+        # age the in-memory snapshot from when it was enumerated
+        self._loaded_at = time.monotonic() - (time.time() - saved_at)
+        self.last_load = {
+            "source": source,
+            "seconds": time.perf_counter() - start,
+            "voices": len(voices),
+        }
+        log_service_message(
+            f"Voice catalog loaded from {source} in {self.last_load['seconds'] * 1000:.1f} ms ({len(voices)} voices)"
+        )
+
+    def _stamp(self) -> str | None:
+        try:
+            return self.backend.voice_stamp()
+        except Exception as e:
+            log_service_message(f"Could not check installed voices: {e}")
+            return None
+
+    def _still_installed(self, saved: str | None, stamp: str | None) -> bool:
+        if stamp is not None and stamp != saved:
+            log_service_message("Installed voices changed since the catalog was saved; re-enumerating")
+            return False
+        return True
+
+    def voices(self) -> list[VoiceInfo]:
+        with self._lock:
+            if self._voices is None or time.monotonic() - self._loaded_at >= self.ttl:
+                self._load()
+            return list(self._voices)
+
+    def lists(self) -> tuple[list[VoiceInfo], list[VoiceInfo]]:
+        """Split into (preferred, fallback) like get_voice_lists()."""
+        preferred, fallback = [], []
+        for voice in self.voices():
+            (preferred if voice.preferred else fallback).append(voice)
+        return preferred, fallback
+
+    def invalidate(self) -> None:
+        """Drop the snapshot (and skip the disk copy) so the next read re-enumerates."""
+        with self._lock:
+            self._voices = None
+            self._loaded_at = 0.0
+            if self.persist:
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+
+
+_catalogs: "weakref.WeakKeyDictionary[SpeechBackend, VoiceCatalog]" = weakref.WeakKeyDictionary()
+_catalogs_lock = threading.Lock()
+
+
+def catalog_for(backend: SpeechBackend) -> VoiceCatalog:
+    """Return the shared catalog for backend, configured from config.json's voice_catalog."""
+    with _catalogs_lock:
+        catalog = _catalogs.get(backend)
+        if catalog is None:
+            cfg = CONFIG_STORE.get().get("voice_catalog", {})
+            catalog = VoiceCatalog(backend, cfg.get("ttl_seconds", 86400), cfg.get("persist", True))
+            _catalogs[backend] = catalog
+        return catalog
@@ -0,0 +1,54 @@
+# voice_pool.py
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+
+class VoicePool:
+    """
+    Voice instances keyed by voice id rather than by chatter, so a stream
+    with thousands of chatters still holds only one instance per voice.
+    With max_size > 0 the least recently used instance is released when
+    the pool is full.
+    """
+
+    def __init__(self, factory: Callable[[str], object], max_size: int = 0):
+        self.factory = factory
+        self.max_size = max_size
+        self._instances: OrderedDict[str, object] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._instances)
+
+    def get(self, voice_id: str):
+        with self._lock:
+            inst = self._instances.get(voice_id)
+            if inst is not None:
+                self._instances.move_to_end(voice_id)
+                self.hits += 1
+                return inst
+            self.misses += 1
+        inst = self.factory(voice_id)
+        with self._lock:
+            self._instances[voice_id] = inst
+            while self.max_size and len(self._instances) > self.max_size:
+                self._instances.popitem(last=False)
+                self.evictions += 1
+        return inst
+
+    def clear(self) -> None:
+        with self._lock:
+            self._instances.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "live": len(self._instances),
+            }
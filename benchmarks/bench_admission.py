@@ -0,0 +1,94 @@
+# bench_admission.py
+"""
+Replays synthetic chat through AdmissionControl on a fake clock and reports
+what each policy let through, plus the per-message cost of admit().
+
+Streams: steady chat, a raid (hundreds of new chatters in a few seconds),
+copy-paste spam and one user flooding. With the speech backend saying one
+line every `speak_seconds`, the backlog column is how far behind live chat
+the voice would end up (before max_age_seconds drops stale lines).
+
+    python benchmarks/bench_admission.py [speak_seconds]
+"""
+import os
+import sys
+import tempfile
+import time
+
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="narratorchat-bench-")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from NarratorChat.admission import AdmissionControl, DEFAULT_ADMISSION, REASONS
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def steady():
+    # 3 lines/s from 40 chatters for 60 s
+    return [(i / 3, f"user{i % 40}", f"chatting away line {i}") for i in range(180)]
+
+
+def raid():
+    # 500 raiders within 5 s, two thirds pasting the raid message
+    return [(i / 100, f"raider{i}", "RAID HYPE tehePelo tehePelo" if i % 3 else f"hello from raider {i}")
+            for i in range(500)]
+
+
+def spam():
+    # 30 bots pasting 4 different lines, 20 lines/s for 30 s
+    return [(i / 20, f"bot{i % 30}", f"buy followers at site{i % 4} dot com") for i in range(600)]
+
+
+def flood():
+    # one user sending 10 unique lines/s for 20 s
+    return [(i / 10, "flooder", f"message number {i} " * 20) for i in range(200)]
+
+
+def backlog(times: list[float], speak_seconds: float) -> float:
+    """Seconds between the last line arriving and the voice finishing it."""
+    free_at = 0.0
+    for t in times:
+        free_at = max(free_at, t) + speak_seconds
+    return max(free_at - times[-1], 0.0) if times else 0.0
+
+
+def main():
+    speak_seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    header = f"{'stream':>8} {'lines':>6} {'admitted':>9} {'truncated':>10}"
+    header += "".join(f" {r:>14}" for r in REASONS) + f" {'backlog before':>15} {'after':>8}"
+    print(header)
+    # duplicate suppression is opt-in; switched on here to show what it catches
+    settings = {**DEFAULT_ADMISSION, "duplicate_window_seconds": 30.0}
+    for name, stream in (("steady", steady()), ("raid", raid()), ("spam", spam()), ("flood", flood())):
+        clock = FakeClock()
+        admission = AdmissionControl(settings, clock=clock)
+        admitted = []
+        for t, user, text in stream:
+            clock.now = t
+            if admission.admit("#bench", user, text)[0] is not None:
+                admitted.append(t)
+        stats = admission.stats()
+        row = f"{name:>8} {len(stream):>6} {stats['admitted']:>9} {stats['truncated']:>10}"
+        row += "".join(f" {stats[r]:>14}" for r in REASONS)
+        before = backlog([t for t, _, _ in stream], speak_seconds)
+        row += f" {before:>14.0f}s {backlog(admitted, speak_seconds):>7.0f}s"
+        print(row)
+
+    admission = AdmissionControl(settings)
+    stream = raid() + spam() + steady()
+    start = time.perf_counter()
+    for _ in range(20):
+        for _, user, text in stream:
+            admission.admit("#bench", user, text)
+    per = (time.perf_counter() - start) / (20 * len(stream)) * 1e6
+    print(f"\nadmit() cost: {per:.2f} us/message")
+
+
+if __name__ == "__main__":
+    main()
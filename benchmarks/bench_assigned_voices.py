@@ -0,0 +1,58 @@
+# bench_assigned_voices.py
+"""
+Per-lookup cost of manual voice assignments with 10k entries in AssignedVoices.json.
+
+Compares the old path (load_assigned_voices() + normalize every key) with
+AssignedVoicesIndex. Runs against a scratch config folder.
+
+    python benchmarks/bench_assigned_voices.py [entries]
+"""
+import os
+import sys
+import json
+import random
+import tempfile
+import timeit
+import unicodedata
+
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="narratorchat-bench-")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from NarratorChat.config import ASSIGNED_PATH, load_assigned_voices
+from NarratorChat.assigned_voices import AssignedVoicesIndex
+
+
+def legacy_normalize(name: str) -> str:
+    return unicodedata.normalize("NFKC", name).casefold()
+
+
+def legacy_lookup(username: str):
+    chat_user_norm = legacy_normalize(username)
+    for key, val in load_assigned_voices().items():
+        if legacy_normalize(key) == chat_user_norm:
+            return val
+    return None
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    rng = random.Random(1)
+    assigned = {f"Chatter_{i}_Ｆｕｌｌ": rng.randrange(-1, 20) for i in range(entries)}
+    with open(ASSIGNED_PATH, "w", encoding="utf-8") as f:
+        json.dump(assigned, f)
+    names = [f"chatter_{rng.randrange(entries * 2)}_full" for _ in range(200)]
+
+    index = AssignedVoicesIndex()
+    for name in names[:20]:
+        assert index.lookup(name) == legacy_lookup(name), name
+
+    legacy = timeit.timeit(lambda: [legacy_lookup(n) for n in names[:5]], number=2) / 10
+    indexed = timeit.timeit(lambda: [index.lookup(n) for n in names], number=500) / (500 * len(names))
+    print(f"entries: {entries}")
+    print(f"legacy  {legacy * 1e6:12.1f} us/lookup")
+    print(f"index   {indexed * 1e6:12.3f} us/lookup")
+    print(f"speedup {legacy / indexed:12.0f}x")
+
+
+if __name__ == "__main__":
+    main()
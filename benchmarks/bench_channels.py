@@ -0,0 +1,75 @@
+# bench_channels.py
+"""
+Several channels narrated by one bot over a single connection to a local
+fake IRC server. Each channel gets its own voice shift and substitution
+rule; per-channel throughput is reported from TwitchBot.speech_stats().
+
+    python benchmarks/bench_channels.py [channels] [messages_per_channel] [latency_ms]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="narratorchat-bench-")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_irc import NO_ADMISSION, FakeIrcServer, privmsg, use_server
+from NarratorChat.backends import FakeBackend
+from NarratorChat.bot_logic import TwitchBot
+from NarratorChat.config import CONFIG_STORE, load_config, save_config
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    per_channel = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    latency = float(sys.argv[3] if len(sys.argv) > 3 else 0.5) / 1000
+    names = [f"#chan{i}" for i in range(count)]
+
+    server = FakeIrcServer()
+    use_server(server, channels=names)
+    cfg = load_config()
+    cfg["speech_queue"]["max_size"] = per_channel
+    cfg["audio_cache"]["enabled"] = False
+    # one line at a time through speak(), so backend.spoken shows every text
+    cfg["speech_queue"]["lookahead"] = 0
+    cfg["admission"] = NO_ADMISSION
+    cfg["channels"] = {
+        name: {"voice_index": i, "substitutions": [{"pattern": f"\\bchan{i}\\b", "replacement": "home"}]}
+        for i, name in enumerate(names)
+    }
+    save_config(cfg)
+    CONFIG_STORE.reload()
+
+    backend = FakeBackend(latency=latency)
+    bot = TwitchBot(threading.Event(), backend)
+    bot.start()
+    server.joined.wait(5)
+
+    traffic = "".join(
+        privmsg(n * count + c, f"user{n % 200}", name, f"hello chan{c} line {n}")
+        for n in range(per_channel) for c, name in enumerate(names)
+    )
+    start = time.perf_counter()
+    server.send(traffic)
+    total = per_channel * count
+    while bot.speech_stats()["spoken"] < total and time.perf_counter() - start < 120:
+        time.sleep(0.005)
+    elapsed = time.perf_counter() - start
+    stats = bot.speech_stats()
+    bot.shutdown_event.set()
+    server.close()
+
+    joins = [line for line in server.received if line.startswith("JOIN")]
+    print(f"joins sent: {joins}")
+    print(f"total: {stats['spoken']} spoken in {elapsed:.2f}s ({stats['spoken'] / elapsed:,.0f} msg/s)")
+    for name, ch in stats["channels"].items():
+        print(f"{name:>8}: received {ch['received']:>6} spoken {ch['spoken']:>6} "
+              f"({ch['spoken_per_sec']:,.0f}/s) wait avg {ch['wait_avg'] * 1000:.1f} ms")
+    home = sum("home" in text for _, text, _, _ in backend.spoken)
+    print(f"channel substitutions applied: {home}/{total}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# bench_config_reload.py
+"""
+Cost of reading the config and latency of a hot reload.
+
+Compares load_config() (a disk read and JSON parse per call) with the shared
+ConfigStore snapshot, then edits config.json under a running TwitchBot and
+times how long the watcher takes to apply the new voice_index and a newly
+added channel, without reconnecting. Then adds more channels than one
+JOIN window allows (with a shortened window) and shows the JOINs spread
+out under the limit. Runs against a scratch config folder.
+
+    python benchmarks/bench_config_reload.py
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+import timeit
+
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="narratorchat-bench-")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_irc import FakeIrcServer, use_server
+from benchmarks.harness import wait_for
+from NarratorChat.backends import FakeBackend
+from NarratorChat import bot_logic
+from NarratorChat.bot_logic import TwitchBot
+from NarratorChat.config import CONFIG_STORE, load_config, save_config
+
+
+def time_until(predicate, timeout: float = 10.0) -> float:
+    start = time.perf_counter()
+    if not wait_for(predicate, timeout, 0.001):
+        raise TimeoutError("config change was not applied")
+    return time.perf_counter() - start
+
+
+def main():
+    number = 2000
+    disk = timeit.timeit(load_config, number=number) / number * 1e6
+    memory = timeit.timeit(CONFIG_STORE.get, number=number) / number * 1e6
+    print(f"load_config()      {disk:9.2f} us/call")
+    print(f"CONFIG_STORE.get() {memory:9.2f} us/call ({disk / memory:,.0f}x)")
+
+    CONFIG_STORE.interval = 0.05
+    server = FakeIrcServer()
+    use_server(server, channel="#bench")
+    bot = TwitchBot(threading.Event(), FakeBackend())
+    bot.start()
+    server.joined.wait(5)
+    connection = bot.connection
+
+    cfg = load_config()
+    cfg["voice_index"] = 3
+    save_config(cfg)
+    took = time_until(lambda: bot.channels["#bench"].voice_index_shift == 3)
+    print(f"voice_index applied after {took * 1000:.0f} ms (poll interval {CONFIG_STORE.interval * 1000:.0f} ms)")
+
+    cfg["irc"]["channels"] = ["#bench", "#other"]
+    save_config(cfg)
+    took = time_until(lambda: any("JOIN #other" in line for line in server.received))
+    print(f"new channel joined after {took * 1000:.0f} ms, same connection: {bot.connection is connection}")
+
+    bot_logic.JOIN_RATE_WINDOW = 0.5
+    time.sleep(bot_logic.JOIN_RATE_WINDOW)
+    added = [f"#raid{i}" for i in range(bot_logic.JOIN_RATE_LIMIT + 10)]
+    cfg["irc"]["channels"] = ["#bench", "#other"] + added
+    save_config(cfg)
+
+    def joined() -> list[str]:
+        return [c for line in list(server.received) if line.startswith("JOIN #raid")
+                for c in line[5:].split(",")]
+
+    time_until(lambda: joined())
+    at_once = len(joined())
+    took = time_until(lambda: len(joined()) == len(added))
+    print(f"{len(added)} channels added: {at_once} joined at once, the rest after {took * 1000:.0f} ms "
+          f"(limit {bot_logic.JOIN_RATE_LIMIT} per {bot_logic.JOIN_RATE_WINDOW * 1000:.0f} ms)")
+
+    bot.shutdown_event.set()
+    server.close()
+
+
+if __name__ == "__main__":
+    main()
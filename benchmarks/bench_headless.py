@@ -0,0 +1,126 @@
+# bench_headless.py
+"""
+Import time and startup of the headless `narratorchat run` path.
+
+1. In a fresh interpreter, times importing the CLI and then the modules
+   `run` loads (bot_logic and FakeBackend), lists the slowest imports from
+   `python -X importtime`, and checks no tray/GUI module (pystray, PIL)
+   was loaded. The tray path is timed the same way where it can import.
+2. Starts `python -m NarratorChat run --benchmark` against the local fake
+   IRC server, times how long until it is running, sends chat, SIGHUP
+   (reload) and SIGTERM (stop), and checks it exits cleanly having spoken
+   every line.
+
+    python benchmarks/bench_headless.py [lines]
+"""
+import os
+import sys
+import json
+import signal
+import subprocess
+import tempfile
+import time
+
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="narratorchat-bench-")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_irc import NO_ADMISSION, FakeIrcServer, privmsg, use_server
+from NarratorChat.config import load_config, save_config
+
+GUI_MODULES = ("pystray", "PIL", "tkinter")
+
+HEADLESS = """
+import sys, time, json
+start = time.perf_counter()
+import NarratorChat.cli
+cli = time.perf_counter()
+import NarratorChat.bot_logic, NarratorChat.backends
+done = time.perf_counter()
+gui = sorted(m for m in sys.modules if m.split(".")[0] in {gui!r})
+print(json.dumps({{"cli_ms": (cli - start) * 1000, "total_ms": (done - start) * 1000, "gui": gui}}))
+"""
+
+TRAY = """
+import time, json
+start = time.perf_counter()
+import NarratorChat.tray_app
+print(json.dumps({"total_ms": (time.perf_counter() - start) * 1000}))
+"""
+
+
+def child(code: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                          capture_output=True, text=True)
+
+
+def slowest(stderr: str, count: int = 8) -> list[tuple[int, int, str]]:
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((int(self_us), int(cumulative), name))
+    return sorted(rows, reverse=True)[:count]
+
+
+def imports() -> None:
+    result = child(HEADLESS.format(gui=GUI_MODULES))
+    r = json.loads(result.stdout.strip().splitlines()[-1])
+    print(f"headless: cli {r['cli_ms']:.1f} ms, cli + bot modules {r['total_ms']:.1f} ms")
+    print(f"  GUI modules loaded: {', '.join(r['gui']) or 'none'}")
+    print(f"  {'self ms':>8} {'cum ms':>8}  module (slowest by own time)")
+    for self_us, cumulative, name in slowest(result.stderr):
+        print(f"  {self_us / 1000:>8.2f} {cumulative / 1000:>8.2f}  {name.strip()}")
+    result = child(TRAY)
+    if result.returncode == 0:
+        print(f"tray: {json.loads(result.stdout.strip().splitlines()[-1])['total_ms']:.1f} ms")
+    else:
+        print(f"tray: cannot import here ({result.stderr.strip().splitlines()[-1]})")
+
+
+def run(lines: int) -> None:
+    server = FakeIrcServer()
+    use_server(server, channel="#bench")
+    cfg = load_config()
+    cfg["admission"] = NO_ADMISSION
+    cfg["speech_queue"]["max_size"] = lines
+    save_config(cfg)
+
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "NarratorChat", "run", "--benchmark"], cwd=ROOT,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    first = proc.stdout.readline()
+    running = time.perf_counter() - start
+    joined = server.joined.wait(10)
+    print(f"\nrun --benchmark: running after {running * 1000:.0f} ms, joined: {joined}  ({first.strip()})")
+
+    server.send("".join(privmsg(i, f"viewer{i % 40}", "#bench", f"headless line {i}") for i in range(lines)))
+    proc.send_signal(signal.SIGHUP)
+    time.sleep(0.5)
+    start = time.perf_counter()
+    proc.send_signal(signal.SIGTERM)
+    out, _ = proc.communicate(timeout=30)
+    stopped = time.perf_counter() - start
+    server.close()
+    print(f"SIGTERM -> exit {proc.returncode} in {stopped * 1000:.0f} ms")
+    for line in out.splitlines():
+        print(f"  {line[:160]}")
+    spoken = next((line for line in out.splitlines() if line.startswith("spoken ")), "")
+    ok = proc.returncode == 0 and spoken.startswith(f"spoken {lines},")
+    print("PASS" if ok else "FAIL")
+    if not ok:
+        sys.exit(1)
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    imports()
+    if hasattr(signal, "SIGHUP"):
+        run(lines)
+    else:
+        print("\nsignal checks need SIGHUP/SIGTERM (not on Windows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# bench_irc.py
+"""
+Lines/sec through the IRC receive path: framing, tag parsing, substitutions
+and voice assignment, replayed from a local fake IRC server. Speech is
+turned off so only the listener is measured.
+
+    python benchmarks/bench_irc.py [lines | recorded.log]
+
+A recorded.log is raw IRC traffic, one line per message.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="narratorchat-bench-")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_irc import FakeIrcServer, privmsg, use_server
+from NarratorChat.backends import FakeBackend
+from NarratorChat.bot_logic import TwitchBot
+
+
+def traffic(arg: str) -> list[str]:
+    if os.path.isfile(arg):
+        with open(arg, "r", encoding="utf-8") as f:
+            return [line.rstrip("\r\n") + "\r\n" for line in f if line.strip()]
+    lines = []
+    for i in range(int(arg)):
+        user = f"chatter{i % 500}"
+        # multibyte text so UTF-8 sequences straddle recv() boundaries
+        lines.append(privmsg(i, user, "#bench", f"message {i} héllo 👋 PRIVMSG in text", mod=i % 50 == 0))
+        if i % 1000 == 0:
+            lines.append("PING :tmi.twitch.tv\r\n")
+    return lines
+
+
+def main():
+    lines = traffic(sys.argv[1] if len(sys.argv) > 1 else "20000")
+    expected = sum(" PRIVMSG " in line for line in lines)
+
+    server = FakeIrcServer()
+    use_server(server, channel="#bench")
+    bot = TwitchBot(threading.Event(), FakeBackend())
+    bot.start()
+    bot.tts_enabled = False
+    server.joined.wait(5)
+
+    start = time.perf_counter()
+    server.send("".join(lines))
+    while bot.received < expected and time.perf_counter() - start < 120:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    bot.shutdown_event.set()
+    server.close()
+
+    pongs = sum(line.startswith("PONG") for line in server.received)
+    print(f"lines:      {len(lines)} ({expected} PRIVMSG, {pongs} PONG sent)")
+    print(f"received:   {bot.received}")
+    print(f"throughput: {bot.received / elapsed:,.0f} lines/s")
+
+
+if __name__ == "__main__":
+    main()
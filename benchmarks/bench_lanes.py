@@ -0,0 +1,99 @@
+# bench_lanes.py
+"""
+Speech lanes (speech_queue.lanes) on a burst of chat from many chatters.
+
+Every line is queued at once, then drained through SpeechLanes with
+FakeBackend taking `synth_ms` (+1 ms per character) to render a line and
+`play_ms` to play it. Reports total time, queue wait, the most lines heard
+at the same moment (from FakeBackend's output timings), lines per lane, and
+checks that each chatter's lines were still played in order.
+
+    python benchmarks/bench_lanes.py [lines] [chatters] [synth_ms] [play_ms]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="narratorchat-bench-")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from NarratorChat.backends import FakeBackend
+from NarratorChat.lanes import SpeechLanes
+from NarratorChat.metrics import METRICS
+from NarratorChat.speech_queue import SpeechItem
+
+
+class OrderedBackend(FakeBackend):
+    """FakeBackend whose PCM is the text itself, so playback order can be checked."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.order: list[str] = []
+
+    def synthesize(self, voice_id: str, text: str) -> bytes:
+        super().synthesize(voice_id, text)
+        return text.encode("utf-8")
+
+    def play(self, pcm: bytes) -> None:
+        with self._lock:
+            self.order.append(pcm.decode("utf-8"))
+        super().play(pcm)
+
+
+def run(lines: int, chatters: int, synth: float, play: float, **lanes) -> dict:
+    METRICS.reset()
+    backend = OrderedBackend(latency=synth, per_char=0.001, play_latency=play)
+    stop = threading.Event()
+    speech = SpeechLanes(backend=backend, stop_event=stop, max_size=lines, **lanes)
+    for i in range(lines):
+        user = i % chatters
+        speech.put(SpeechItem(f"user{user}", f"fake:natural:{user % 8}", f"user{user} line {i // chatters}"))
+    start = time.perf_counter()
+    speech.start()
+    while speech.spoken + speech.errors < lines:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    speech.wake()
+    speech.join(2)
+    per_user: dict[str, list[int]] = {}
+    for text in backend.order:
+        user, _, k = text.split()
+        per_user.setdefault(user, []).append(int(k))
+    wait = METRICS.snapshot()["stages"].get("queue_wait", {})
+    return {
+        "seconds": elapsed,
+        "wait_p95": wait.get("p95", 0.0),
+        "overlap": backend.peak_overlap(),
+        "per_lane": [lane["spoken"] for lane in speech.stats()["lanes"]],
+        "devices": sorted({device for device, _, _ in backend.outputs if device}),
+        "ordered": all(ks == sorted(ks) for ks in per_user.values()),
+    }
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 80
+    chatters = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    synth = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.030
+    play = float(sys.argv[4]) / 1000 if len(sys.argv) > 4 else 0.250
+    print(f"{lines} lines from {chatters} chatters, synth {synth * 1000:.0f} ms + 1 ms/char, "
+          f"play {play * 1000:.0f} ms")
+    print(f"{'setup':>30} {'total s':>8} {'wait p95 s':>11} {'overlap':>8} {'in order':>9}  lines per lane")
+    setups = [
+        ("1 lane", dict(count=1)),
+        ("2 lanes by user", dict(count=2)),
+        ("4 lanes by user", dict(count=4, devices=["Speakers", "Headset"])),
+        ("4 lanes by user, 2 at once", dict(count=4, max_concurrency=2)),
+        ("4 lanes by voice", dict(count=4, schedule="voice")),
+        ("8 lanes by user", dict(count=8)),
+    ]
+    for name, kwargs in setups:
+        r = run(lines, chatters, synth, play, **kwargs)
+        print(f"{name:>30} {r['seconds']:>8.2f} {r['wait_p95']:>11.2f} {r['overlap']:>8} "
+              f"{str(r['ordered']):>9}  {r['per_lane']}{'  on ' + ', '.join(r['devices']) if r['devices'] else ''}")
+
+
+if __name__ == "__main__":
+    main()
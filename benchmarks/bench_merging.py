@@ -0,0 +1,71 @@
+# bench_merging.py
+"""
+Effect of speech_queue.merge_window_seconds on a chat where people send
+several short lines in a row.
+
+A producer thread feeds the queue in real time (bursts of 1-4 lines per
+chatter, `rate` lines/s overall) while a SpeechWorker drains it through
+FakeBackend, whose every call costs a fixed `call_ms` plus 2 ms per
+character. Reports synthesis calls, calls saved and how long the voice
+took to catch up with the last line.
+
+    python benchmarks/bench_merging.py [lines] [rate] [call_ms]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="narratorchat-bench-")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from NarratorChat.backends import FakeBackend
+from NarratorChat.speech_queue import SpeechItem, SpeechQueue, SpeechWorker
+
+
+def stream(lines: int) -> list[tuple[str, str]]:
+    out = []
+    user = 0
+    while len(out) < lines:
+        for k in range(1 + user % 4):
+            out.append((f"user{user % 25}", f"line {k} from user {user} lol"))
+        user += 1
+    return out[:lines]
+
+
+def run(lines: list[tuple[str, str]], rate: float, call: float, window: float) -> dict:
+    backend = FakeBackend(latency=call, per_char=0.002)
+    queue = SpeechQueue(len(lines), merge_window=window, merge_max_length=200)
+    stop = threading.Event()
+    worker = SpeechWorker(queue, backend, stop)
+    worker.start()
+    start = time.perf_counter()
+    for i, (user, text) in enumerate(lines):
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        queue.put(SpeechItem(user, f"fake:natural:{int(user[4:]) % 8}", text))
+    fed = time.perf_counter()
+    while len(queue) or worker.spoken < queue.dequeued:
+        time.sleep(0.001)
+    done = time.perf_counter()
+    stop.set()
+    worker.join(2)
+    return {"calls": len(backend.spoken), "merged": queue.merged, "catch_up": done - fed, "total": done - start}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 20.0
+    call = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.040
+    lines = stream(count)
+    print(f"{count} lines at {rate:.0f}/s, {call * 1000:.0f} ms per call + 2 ms/char")
+    print(f"{'window s':>9} {'calls':>6} {'saved':>6} {'catch-up s':>11} {'total s':>8}")
+    for window in (0.0, 2.0, 5.0):
+        r = run(lines, rate, call, window)
+        print(f"{window:>9.1f} {r['calls']:>6} {r['merged']:>6} {r['catch_up']:>11.2f} {r['total']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# bench_normalize.py
+"""
+TextNormalizer on adversarial chat: zalgo, character floods, repeated emotes,
+emoji walls and braille ASCII art, next to ordinary lines.
+
+For each input reports raw and normalized length, the cost of normalizing,
+the cost of the default substitutions alone and between the two normalizer
+passes (as the bot runs them), and the synthesis time FakeBackend would
+spend at `ms_per_char`. A second table
+grows one input up to 100k characters with max_length off, to show every
+step stays linear.
+
+    python benchmarks/bench_normalize.py [ms_per_char]
+"""
+import os
+import sys
+import tempfile
+import timeit
+
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="narratorchat-bench-")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from NarratorChat.normalize import TextNormalizer
+from NarratorChat.substitutions import SubstitutionEngine
+
+ZALGO = "".join(chr(0x300 + i % 0x70) for i in range(12))
+
+INPUTS = {
+    "plain": "that play was insane, how did he even hit that shot",
+    "zalgo": "".join(c + ZALGO for c in "he comes to devour the stream"),
+    "char flood": "no" + "o" * 400 + "!" * 90,
+    "emote spam": " ".join(["LUL"] * 120),
+    "mixed emotes": "KEKW KEKW OMEGALUL catJAM catJAM catJAM PogChamp " * 8,
+    "emoji wall": "😂🔥 " * 150,
+    "braille art": "⣿⣿⣿⡿⠿⠛⠋⠉⣀⣤⣴⣶⣿⣿ " * 30 + "hi",
+    "numbers": "I donated 100000 bits, call 555-1111 at 10:00",
+    "long line": ("a much longer message that goes on about the game " * 10)[:490],
+}
+
+
+def per_call_us(fn, text: str, number: int = 2000) -> float:
+    return timeit.timeit(lambda: fn(text), number=number) / number * 1e6
+
+
+def main():
+    ms_per_char = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    normalizer = TextNormalizer(store=None)
+    substitutions = SubstitutionEngine()
+
+    print(f"{'input':>13} {'raw':>6} {'out':>5} {'norm us':>8} {'subs us':>8} "
+          f"{'norm+subs us':>13} {'synth ms':>9} {'after':>7}")
+    for name, text in INPUTS.items():
+        out = normalizer.apply(text)
+        norm = per_call_us(normalizer.apply, text)
+        subs = per_call_us(substitutions.apply, text)
+        # as the bot runs it: prepare, substitutions, finish
+        prepared = normalizer.prepare(text)
+        substituted = substitutions.apply(prepared)
+        both = (per_call_us(normalizer.prepare, text) + per_call_us(substitutions.apply, prepared)
+                + per_call_us(normalizer.finish, substituted))
+        print(f"{name:>13} {len(text):>6} {len(out):>5} {norm:>8.1f} {subs:>8.1f} {both:>13.1f} "
+              f"{len(substitutions.apply(text)) * ms_per_char:>9.0f} "
+              f"{len(normalizer.finish(substituted)) * ms_per_char:>7.0f}")
+    print()
+    for name, text in INPUTS.items():
+        print(f"{name:>13}: {normalizer.apply(text)[:70]!r}")
+
+    print("\nscaling with max_length off")
+    unbounded = TextNormalizer({"max_length": 0}, store=None)
+    seeds = {"zalgo": "a" + ZALGO, "char flood": "o", "emote spam": "LUL ", "mixed": "x😂 LUL aaaa⣿ "}
+    print(f"{'input':>13} " + " ".join(f"{n:>10}" for n in ("1k us", "10k us", "100k us")))
+    for name, seed in seeds.items():
+        times = []
+        for size in (1_000, 10_000, 100_000):
+            text = (seed * (size // len(seed) + 1))[:size]
+            times.append(per_call_us(unbounded.apply, text, number=5))
+        print(f"{name:>13} " + " ".join(f"{t:>10.0f}" for t in times))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# bench_pipeline.py
+"""
+Throughput and latency of the full chat-to-speech pipeline with FakeBackend.
+
+Chat lines are replayed from a local fake IRC server to a real TwitchBot,
+so framing, parsing, substitutions, voice assignment, queueing
+and the speech worker all run as in production. Runs against a scratch
+config folder.
+
+    python benchmarks/bench_pipeline.py [messages] [latency_ms]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="narratorchat-bench-")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_irc import NO_ADMISSION, FakeIrcServer, privmsg, use_server
+from NarratorChat.backends import FakeBackend
+from NarratorChat.bot_logic import TwitchBot
+from NarratorChat.config import CONFIG_STORE, load_config, save_config
+from NarratorChat.metrics import METRICS
+
+
+def main():
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.0
+
+    server = FakeIrcServer()
+    use_server(server, channel="#bench")
+    cfg = load_config()
+    cfg["speech_queue"]["max_size"] = messages
+    cfg["admission"] = NO_ADMISSION
+    save_config(cfg)
+    CONFIG_STORE.reload()
+    backend = FakeBackend(latency=latency)
+    bot = TwitchBot(threading.Event(), backend)
+    bot.start()
+    server.joined.wait(5)
+
+    emotes = ["LUL", "PogChamp", "KEKW", "!commands", "GG"]
+
+    def chat(i: int) -> str:
+        # every third line is a repeat, as in emote spam
+        if i % 3 == 0:
+            return emotes[i % len(emotes)]
+        return f"message {i} with a link https://example.com/{i} and badword1"
+
+    lines = "".join(privmsg(i, f"user{i % 300}", "#bench", chat(i)) for i in range(messages))
+
+    start = time.perf_counter()
+    server.send(lines)
+    while bot.speech_stats()["spoken"] < messages and time.perf_counter() - start < 120:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    bot.shutdown_event.set()
+    server.close()
+
+    stats = bot.speech_stats()
+    print(f"messages:      {messages} (fake latency {latency * 1000:.1f} ms)")
+    print(f"spoken:        {stats['spoken']}")
+    print(f"throughput:    {stats['spoken'] / elapsed:,.0f} msg/s")
+    print(f"queue wait:    avg {stats['wait_avg'] * 1000:.2f} ms, max {stats['wait_max'] * 1000:.2f} ms")
+    print(f"max depth:     {stats['max_depth']}")
+    print(f"voice pool:    {stats['voices']} for {stats['users']} chatters")
+    if "audio_cache" in stats:
+        print(f"audio cache:   {stats['audio_cache']}")
+    print(f"{'stage':>12} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'count':>8}")
+    for name, st in sorted(METRICS.snapshot()["stages"].items()):
+        print(f"{name:>12} {st['p50'] * 1000:9.3f} {st['p95'] * 1000:9.3f} {st['p99'] * 1000:9.3f} {st['count']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# bench_pipelining.py
+"""
+Serial SpeechWorker vs PipelinedSpeechWorker on a backlog of distinct lines.
+
+FakeBackend takes `synth_ms` (+1 ms per character) to synthesize a line and
+`play_ms` to play it. The serial worker pays both for every line; the
+pipelined one renders ahead while the current line plays. Reports total
+time, the silence between consecutive utterances ("gap") and checks that
+lines were played in queue order.
+
+    python benchmarks/bench_pipelining.py [lines] [synth_ms] [play_ms]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="narratorchat-bench-")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from NarratorChat.audio_cache import AudioCache
+from NarratorChat.backends import FakeBackend
+from NarratorChat.metrics import METRICS
+from NarratorChat.speech_queue import PipelinedSpeechWorker, SpeechItem, SpeechQueue, SpeechWorker
+
+
+class OrderedBackend(FakeBackend):
+    """FakeBackend whose PCM is the text itself, so playback order can be checked."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.order: list[str] = []
+
+    def speak(self, voice_id: str, text: str) -> None:
+        super().speak(voice_id, text)
+        self.order.append(text)
+
+    def synthesize(self, voice_id: str, text: str) -> bytes:
+        super().synthesize(voice_id, text)
+        return text.encode("utf-8")
+
+    def play(self, pcm: bytes) -> None:
+        super().play(pcm)
+        self.order.append(pcm.decode("utf-8"))
+
+
+def run(make_worker, texts: list[str], synth: float, play: float) -> tuple[float, dict, bool]:
+    METRICS.reset()
+    backend = OrderedBackend(latency=synth, per_char=0.001, play_latency=play)
+    queue = SpeechQueue(len(texts))
+    for i, text in enumerate(texts):
+        queue.put(SpeechItem(f"user{i % 7}", "fake:natural:0", text))
+    stop = threading.Event()
+    # a memory-only cache makes the serial worker synthesize() then play(),
+    # so its gap is measured where the audio really starts
+    worker = make_worker(queue, backend, stop, AudioCache(folder=None))
+    start = time.perf_counter()
+    worker.start()
+    while worker.spoken + worker.errors < len(texts):
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    worker.join(2)
+    return elapsed, METRICS.snapshot()["stages"].get("gap", {}), backend.order == texts
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    synth = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.080
+    play = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.120
+    # uneven lengths so later lines can finish synthesizing first
+    texts = [f"line {i} " + "word " * ((i * 7) % 11) for i in range(lines)]
+
+    print(f"{lines} lines, synth {synth * 1000:.0f} ms + 1 ms/char, play {play * 1000:.0f} ms")
+    print(f"{'worker':>22} {'total s':>8} {'per line ms':>12} {'gap p50 ms':>11} {'gap p95 ms':>11} {'in order':>9}")
+    workers = [
+        ("serial", lambda q, b, s, c: SpeechWorker(q, b, s, c)),
+        ("pipelined lookahead 1", lambda q, b, s, c: PipelinedSpeechWorker(q, b, s, c, lookahead=1, synth_workers=1)),
+        ("pipelined lookahead 3", lambda q, b, s, c: PipelinedSpeechWorker(q, b, s, c, lookahead=3, synth_workers=2)),
+        ("pipelined lookahead 6", lambda q, b, s, c: PipelinedSpeechWorker(q, b, s, c, lookahead=6, synth_workers=4)),
+    ]
+    for name, make in workers:
+        elapsed, gap, ordered = run(make, texts, synth, play)
+        print(f"{name:>22} {elapsed:>8.2f} {elapsed / lines * 1000:>12.1f} "
+              f"{gap.get('p50', 0) * 1000:>11.1f} {gap.get('p95', 0) * 1000:>11.1f} {str(ordered):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# bench_startup.py
+"""
+Bot startup time cold, warm without RuntimeState.json, and warm with it.
+
+Each start runs in a fresh process against the same scratch config folder,
+which holds an audio cache of `entries` files and a voice list that takes
+`enumerate_ms` to enumerate. Timed: TwitchBot() construction, then the first
+chat line from a returning chatter.
+
+    python benchmarks/bench_startup.py [entries] [enumerate_ms]
+"""
+import os
+import sys
+import json
+import subprocess
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def child(enumerate_ms: float) -> None:
+    sys.path.insert(0, os.path.dirname(HERE))
+    from benchmarks.fake_irc import privmsg
+    from NarratorChat.backends import FakeBackend
+    from NarratorChat.bot_logic import TwitchBot
+    from NarratorChat.irc import parse_message
+    import threading
+
+    backend = FakeBackend(list_latency=enumerate_ms / 1000)
+    start = time.perf_counter()
+    bot = TwitchBot(threading.Event(), backend)
+    init = time.perf_counter() - start
+    start = time.perf_counter()
+    bot._handle_privmsg(parse_message(privmsg(0, "regular0", "#yourchannel", "hello again").rstrip("\r\n")))
+    first = time.perf_counter() - start
+    voice = bot.user_voice_index.get("regular0")
+    # chat from the rest of the regulars, so the next run has them to restore
+    for i in range(1, 5000):
+        bot._handle_privmsg(parse_message(privmsg(i, f"regular{i}", "#yourchannel", "hi").rstrip("\r\n")))
+    bot.save_state()
+    print(json.dumps({"init_ms": init * 1000, "first_ms": first * 1000, "voice": voice,
+                      "users": len(bot.user_voice_index)}))
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    enumerate_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 800
+    appdata = tempfile.mkdtemp(prefix="narratorchat-bench-")
+    folder = os.path.join(appdata, "NarratorChat", "AudioCache")
+    os.makedirs(folder)
+    for i in range(entries):
+        with open(os.path.join(folder, f"{i:064x}.pcm"), "wb") as f:
+            f.write(b"\0" * 1024)
+    env = {**os.environ, "APPDATA": appdata}
+
+    def start(label: str) -> None:
+        out = subprocess.run([sys.executable, __file__, "--child", str(enumerate_ms)], env=env,
+                             capture_output=True, text=True, check=True).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f"{label:>28} {r['init_ms']:>9.1f} {r['first_ms']:>10.2f} {r['voice']!s:>6}")
+
+    print(f"{entries} cached clips, voice enumeration {enumerate_ms:.0f} ms")
+    print(f"{'start':>28} {'init ms':>9} {'first ms':>10} {'voice':>6}")
+    start("first run")
+    os.remove(os.path.join(appdata, "NarratorChat", "RuntimeState.json"))
+    start("restart, no runtime state")
+    start("restart with runtime state")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--child":
+        child(float(sys.argv[2]))
+    else:
+        main()
@@ -0,0 +1,77 @@
+# bench_substitutions.py
+"""
+Per-message cost of the substitution rules versus rule count.
+
+Compares the old path (load_config() + re.sub per rule per message) with the
+compiled SubstitutionEngine. Runs against a scratch config folder.
+
+    python benchmarks/bench_substitutions.py
+"""
+import os
+import sys
+import re
+import tempfile
+import timeit
+
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="narratorchat-bench-")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from NarratorChat.config import CONFIG_STORE, DEFAULT_CONFIG, load_config, save_config
+from NarratorChat.substitutions import SubstitutionEngine
+
+MESSAGES = [
+    "hello chat how is everyone doing tonight",
+    "check out https://www.example.com/some/path?x=1 it's great",
+    "badword1 this is a badword2 message LUL LUL LUL",
+    "PogChamp " * 12,
+    "a much longer message that goes on and on about the game and the stream " * 3,
+]
+
+
+def make_rules(count: int) -> list[dict]:
+    rules = [dict(r) for r in DEFAULT_CONFIG["substitutions"]]
+    i = 0
+    while len(rules) < count:
+        if i % 2:
+            words = "|".join(f"slur{i}x{j}" for j in range(20))
+            rules.append({"pattern": f"\\b({words})\\b", "replacement": "censored"})
+        else:
+            rules.append({"pattern": f"\\bcmd{i}\\s+\\d+", "replacement": f"command {i}"})
+        i += 1
+    return rules[:count]
+
+
+def legacy_apply(text: str) -> str:
+    for rule in load_config().get("substitutions", []):
+        try:
+            text = re.sub(rule["pattern"], rule["replacement"], text, flags=re.IGNORECASE)
+        except re.error:
+            pass
+    return text
+
+
+def per_message_us(fn, number: int) -> float:
+    def run():
+        for m in MESSAGES:
+            fn(m)
+    return timeit.timeit(run, number=number) / (number * len(MESSAGES)) * 1e6
+
+
+def main():
+    print(f"{'rules':>6} {'legacy us/msg':>14} {'engine us/msg':>14} {'speedup':>8}")
+    for count in (2, 10, 50, 200):
+        cfg = dict(DEFAULT_CONFIG)
+        cfg["substitutions"] = make_rules(count)
+        save_config(cfg)
+        CONFIG_STORE.reload()
+        engine = SubstitutionEngine()
+        for m in MESSAGES:
+            assert engine.apply(m) == legacy_apply(m), m
+        legacy = per_message_us(legacy_apply, 50)
+        compiled = per_message_us(engine.apply, 500)
+        print(f"{count:>6} {legacy:>14.1f} {compiled:>14.1f} {legacy / compiled:>7.1f}x")
+        engine.close()
+
+
+if __name__ == "__main__":
+    main()
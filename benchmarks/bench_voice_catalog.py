@@ -0,0 +1,53 @@
+# bench_voice_catalog.py
+"""
+Voice list load time: cold enumeration vs. persisted catalog vs. in-memory hit.
+
+FakeBackend's list_latency stands in for slow SAPI enumeration of online
+Natural voices, and stamp_latency for the registry reads that tell whether
+a persisted catalog is still current (a handful of RegQueryInfoKey calls;
+1 ms is generous). Runs against a scratch config folder.
+
+    python benchmarks/bench_voice_catalog.py [enumerate_ms] [stamp_ms]
+"""
+import os
+import sys
+import tempfile
+import time
+
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="narratorchat-bench-")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from NarratorChat.backends import FakeBackend
+from NarratorChat.voice_catalog import VoiceCatalog
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    enumerate_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 800
+    stamp_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 1
+    backend = FakeBackend(list_latency=enumerate_ms / 1000, stamp_latency=stamp_ms / 1000)
+
+    cold = VoiceCatalog(backend, persist=True)
+    cold_ms = timed(cold.lists)
+    warm_ms = timed(cold.lists)
+    # a fresh process: new catalog object, snapshot still on disk
+    disk_catalog = VoiceCatalog(backend, persist=True)
+    disk_ms = timed(disk_catalog.lists)
+    # a voice removed between runs: the stamp differs, so it enumerates again
+    backend.voices.pop()
+    changed = VoiceCatalog(backend, persist=True)
+    changed_ms = timed(changed.lists)
+
+    print(f"cold enumeration  {cold_ms:9.2f} ms")
+    print(f"persisted catalog {disk_ms:9.2f} ms  (from {disk_catalog.last_load['source']})")
+    print(f"voices changed    {changed_ms:9.2f} ms  (from {changed.last_load['source']})")
+    print(f"in-memory hit     {warm_ms:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
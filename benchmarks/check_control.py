@@ -0,0 +1,174 @@
+# check_control.py
+"""
+Checks for the control API (ControlServer over BotControl) against a real
+TwitchBot, the local fake IRC server and FakeBackend, all headless.
+
+Each endpoint is called over HTTP and its effect asserted: TTS toggling,
+skipping the line being spoken in one channel or all, clearing queued speech, speaking a voice by
+index, the voice test, reconnecting, auth and error replies. Every reply
+must come back quickly, even for actions that take seconds to finish.
+Exits non-zero if any check fails.
+
+    python benchmarks/check_control.py
+"""
+import os
+import sys
+import json
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="narratorchat-bench-")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_irc import NO_ADMISSION, FakeIrcServer, privmsg, use_server
+from benchmarks.harness import check, finish, wait_for
+from NarratorChat.backends import FakeBackend, VoiceInfo
+from NarratorChat.bot_logic import CONNECTED, TwitchBot
+from NarratorChat.config import CONFIG_STORE, load_config, save_config
+from NarratorChat.control import BotControl, ControlServer
+
+# every reply, including queued slow actions, must take less than this
+REPLY_LIMIT = 0.1
+replies = []
+
+
+def call(port: int, method: str, path: str, body: dict | None = None, headers: dict | None = None):
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    request = urllib.request.Request(f"http://127.0.0.1:{port}{path}", data=data, method=method,
+                                     headers={"Content-Type": "application/json", **(headers or {})})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            status, payload = response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        status, payload = e.code, json.loads(e.read() or b"{}")
+    replies.append((f"{method} {path}", time.perf_counter() - start))
+    return status, payload
+
+
+def main():
+    server = FakeIrcServer()
+    use_server(server, channels=["#bench", "#other"])
+    cfg = load_config()
+    cfg["admission"] = NO_ADMISSION
+    cfg["audio_cache"]["enabled"] = False
+    cfg["speech_queue"]["max_size"] = 500
+    save_config(cfg)
+    CONFIG_STORE.reload()
+
+    # chat lines take 0.4 s each; voice tests use a separate, instant backend
+    chat_backend = FakeBackend(latency=0.02, play_latency=0.4)
+    voice_backend = FakeBackend()
+    bot = TwitchBot(threading.Event(), chat_backend)
+    bot.start()
+    check("bot connects", bot.wait_status(CONNECTED, 5))
+    control = BotControl(lambda: bot, voice_backend)
+    api = ControlServer(control)
+    api.start()
+    port = api.port
+
+    status, stats = call(port, "GET", "/stats")
+    check("GET /stats", status == 200 and stats["status"] == CONNECTED and "spoken" in stats,
+          f"status {stats.get('status')}")
+    status, voices = call(port, "GET", "/voices")
+    check("GET /voices", status == 200 and len(voices["voices"]) == 8, f"{len(voices.get('voices', []))} voices")
+
+    voice_backend.voices.append(VoiceInfo("fake:natural:new", "Microsoft FakeNew Online (Natural) - English"))
+    status, r = call(port, "POST", "/refresh-voices")
+    check("POST /refresh-voices queued", status == 202 and r["queued"] is True)
+    check("voices refreshed", wait_for(lambda: len(call(port, "GET", "/voices")[1]["voices"]) == 9, 2))
+
+    status, r = call(port, "POST", "/tts", {"enabled": False})
+    check("POST /tts off", status == 200 and r["tts_enabled"] is False and bot.tts_enabled is False)
+    status, r = call(port, "POST", "/tts")
+    check("POST /tts toggles back on", status == 200 and r["tts_enabled"] is True and bot.tts_enabled is True)
+
+    # lines in #other are longer, so their PCM tells them apart in `played`
+    server.send("".join(privmsg(i, f"user{i}", "#bench", f"control line {i}") for i in range(20)) +
+                "".join(privmsg(20 + i, f"user{i}", "#other", f"a longer line in the other channel {i}")
+                        for i in range(3)))
+    other = bot.channels["#other"].speech_worker
+    check("first lines playing", wait_for(lambda: bot.received == 23 and bot.channels["#bench"].speech_worker.playing
+                                          and other.playing, 5))
+    time.sleep(0.1)
+    status, r = call(port, "POST", "/skip", {"channel": "Bench"})
+    check("POST /skip one channel", status == 200 and r["skipped"] == 1, f"{r.get('skipped')} skipped")
+    wait_for(lambda: len({pcm for pcm, _, _ in chat_backend.played}) == 2, 1)
+    bench_pcm = min((pcm for pcm, _, _ in chat_backend.played), default=0)
+    bench = next(((s, e) for pcm, s, e in chat_backend.played if pcm == bench_pcm), None)
+    other_first = next(((s, e) for pcm, s, e in chat_backend.played if pcm != bench_pcm), None)
+    check("skipped line cut short", bench is not None and bench[1] - bench[0] < 0.3,
+          f"played {(bench[1] - bench[0]) * 1000:.0f} of 400 ms" if bench else "nothing played")
+    check("other channel plays on", other_first is not None and other_first[1] - other_first[0] >= 0.35,
+          f"played {(other_first[1] - other_first[0]) * 1000:.0f} of 400 ms" if other_first else "nothing played")
+    check("other channel playing", wait_for(lambda: other.playing, 1))
+    status, r = call(port, "POST", "/skip")
+    check("POST /skip every channel", status == 200 and r["skipped"] == 2, f"{r.get('skipped')} skipped")
+    wait_for(lambda: sum(pcm != bench_pcm for pcm, _, _ in chat_backend.played) >= 2, 1)
+    other_second = [(s, e) for pcm, s, e in chat_backend.played if pcm != bench_pcm][1:2]
+    check("other channel cut short too", bool(other_second) and other_second[0][1] - other_second[0][0] < 0.3)
+
+    status, r = call(port, "POST", "/clear", {"channel": "bench"})
+    check("POST /clear", status == 200 and r["cleared"] > 10, f"{r.get('cleared')} cleared")
+    worker = bot.channels["#bench"].speech_worker
+    check("queue idle after clear", wait_for(worker.idle, 2),
+          f"{worker.spoken} spoken, {worker.discarded} discarded ahead")
+
+    status, r = call(port, "POST", "/speak", {"index": 2, "text": "hello"})
+    check("POST /speak queued", status == 202 and r["queued"] is True)
+    check("voice 2 spoken", wait_for(lambda: any(t.startswith("Voice 2:") and t.endswith("hello")
+                                                 for _, t, _, _ in voice_backend.spoken), 2))
+    status, r = call(port, "POST", "/speak?index=99")
+    check("POST /speak bad index is 400", status == 400, r.get("error", ""))
+
+    status, r = call(port, "POST", "/test-voices")
+    check("POST /test-voices queued", status == 202)
+    status, stats = call(port, "GET", "/stats")
+    check("stats answered during voice test", status == 200)
+
+    status, r = call(port, "POST", "/reconnect")
+    check("POST /reconnect queued", status == 202 and r["queued"] is True)
+    # reconnect has its own worker, so it does not wait for the voice test (~3 s)
+    def tested() -> int:
+        return sum(t.startswith("Voice ") and "hello" not in t for _, t, _, _ in voice_backend.spoken)
+
+    check("reconnected during voice test", wait_for(lambda: sum(line.startswith("NICK") for line in server.received) == 2
+                                                    and bot.status == CONNECTED, 2) and tested() < 8,
+          f"{tested()} of 8 voices tested")
+    check("voice test finished", wait_for(lambda: tested() == 8, 10))
+
+    status, _ = call(port, "GET", "/stats", headers={"Origin": "http://example.com"})
+    check("request from a web page is 403", status == 403)
+    status, _ = call(port, "GET", "/nothing")
+    check("unknown path is 404", status == 404)
+    status, _ = call(port, "POST", "/skip", {"channel": "#nowhere"})
+    check("unknown channel is 404", status == 404)
+    status, _ = call(port, "POST", "/clear?channel=nowhere")
+    check("unknown channel to clear is 404", status == 404)
+    status, _ = call(port, "POST", "/tts", {"enabled": "maybe"})
+    check("bad value is 400", status == 400)
+
+    secured = ControlServer(control, token="s3cret")
+    secured.start()
+    status, _ = call(secured.port, "GET", "/stats")
+    check("token required", status == 403)
+    status, _ = call(secured.port, "GET", "/stats", headers={"Authorization": "Bearer s3cret"})
+    check("token accepted", status == 200)
+    secured.stop()
+
+    slowest = max(replies, key=lambda r: r[1])
+    check(f"every reply under {REPLY_LIMIT * 1000:.0f} ms", slowest[1] < REPLY_LIMIT,
+          f"slowest {slowest[0]} {slowest[1] * 1000:.1f} ms of {len(replies)}")
+
+    api.stop()
+    bot.stop(timeout=2.0)
+    control.close()
+    server.close()
+    finish()
+
+
+if __name__ == "__main__":
+    main()
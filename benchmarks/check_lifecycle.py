@@ -0,0 +1,189 @@
+# check_lifecycle.py
+"""
+Shutdown and reconnect checks for TwitchBot against the local fake IRC server.
+
+Each check asserts a deadline or a thread/connection count and the script
+exits non-zero if any fails:
+  - stop() while idle returns almost at once (the selector is woken)
+  - stop() drains queued speech for at most drain seconds
+  - stop() while reconnecting to a dead server does not wait out the backoff
+  - repeated reconnect() keeps one listener and one connection, and loses
+    no queued speech
+  - reconnect() while the listener is stuck dialling starts a new one once
+    the dial returns
+  - a failed send (PONG) reconnects, and a line that fails to handle is
+    skipped without stopping the listener
+  - no bot threads or config subscriptions are left afterwards
+
+    python benchmarks/check_lifecycle.py
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="narratorchat-bench-")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_irc import NO_ADMISSION, FakeIrcServer, privmsg, use_server
+from benchmarks.harness import check, finish, wait_for
+from NarratorChat.backends import FakeBackend
+from NarratorChat import bot_logic
+from NarratorChat.bot_logic import CONNECTED, RECONNECTING, STOPPED, TwitchBot
+from NarratorChat.irc import IrcConnection
+from NarratorChat.config import CONFIG_STORE, load_config, save_config
+
+BOT_THREADS = ("TwitchListener", "ListenerRestart", "SpeechWorker", "StateSaver", "MetricsReporter")
+
+
+def bot_threads() -> list[str]:
+    return [t.name for t in threading.enumerate() if t.name.startswith(BOT_THREADS)]
+
+
+def new_bot(server: FakeIrcServer, backend: FakeBackend) -> TwitchBot:
+    use_server(server, channel="#bench")
+    bot = TwitchBot(threading.Event(), backend)
+    bot.start()
+    # the server registers the client only after it is accepted
+    check("connects", bot.wait_status(CONNECTED, 5) and server.joined.wait(5))
+    return bot
+
+
+def timed_stop(bot: TwitchBot, **kwargs) -> tuple[bool, float]:
+    start = time.perf_counter()
+    clean = bot.stop(**kwargs)
+    return clean, time.perf_counter() - start
+
+
+def main():
+    cfg = load_config()
+    cfg["admission"] = NO_ADMISSION
+    cfg["audio_cache"]["enabled"] = False
+    cfg["speech_queue"]["max_size"] = 500
+    save_config(cfg)
+    CONFIG_STORE.reload()
+    subscribers = len(CONFIG_STORE._subscribers)
+
+    # idle: listener blocked in select
+    server = FakeIrcServer()
+    bot = new_bot(server, FakeBackend())
+    clean, took = timed_stop(bot, timeout=2.0)
+    check("idle stop under 0.3s", clean and took < 0.3, f"{took * 1000:.0f} ms")
+    check("status stopped", bot.status == STOPPED)
+    server.close()
+
+    # busy: 100 lines queued, 50 ms each, drain capped at 0.5 s
+    server = FakeIrcServer()
+    bot = new_bot(server, FakeBackend(latency=0.05))
+    server.send("".join(privmsg(i, f"user{i}", "#bench", f"line {i}") for i in range(100)))
+    wait_for(lambda: bot.received == 100, 5)
+    clean, took = timed_stop(bot, timeout=2.0, drain=0.5)
+    spoken = bot.speech_stats()["spoken"]
+    check("drain bounded, stop under 1.0s", clean and took < 1.0, f"{took * 1000:.0f} ms, {spoken} spoken")
+    server.close()
+
+    # dead server: listener sleeping in reconnect backoff
+    server = FakeIrcServer()
+    bot = new_bot(server, FakeBackend())
+    server.close()
+    check("notices the drop", bot.wait_status(RECONNECTING, 5))
+    time.sleep(0.3)
+    clean, took = timed_stop(bot, timeout=2.0)
+    check("stop during backoff under 0.3s", clean and took < 0.3, f"{took * 1000:.0f} ms")
+
+    # reconnect storm with speech queued
+    server = FakeIrcServer()
+    backend = FakeBackend(latency=0.01)
+    bot = new_bot(server, backend)
+    server.send("".join(privmsg(i, f"user{i}", "#bench", f"line {i}") for i in range(200)))
+    wait_for(lambda: bot.received == 200, 5)
+    for _ in range(5):
+        bot.reconnect()
+        check("reconnects", bot.wait_status(CONNECTED, 5))
+        listeners = [n for n in bot_threads() if n == "TwitchListener"]
+        check("one listener", len(listeners) == 1, f"{len(listeners)} alive")
+        check("one connection", wait_for(lambda: len(server.clients) == 1, 2), f"{len(server.clients)} open")
+    check("nothing lost across reconnects", wait_for(lambda: bot.speech_stats()["spoken"] == 200, 10),
+          f"{bot.speech_stats()['spoken']}/200 spoken")
+    clean, took = timed_stop(bot, timeout=2.0)
+    check("stop after reconnects under 0.3s", clean and took < 0.3, f"{took * 1000:.0f} ms")
+    server.close()
+
+    # reconnect() gives up waiting on a listener stuck in a slow dial
+    server = FakeIrcServer()
+    bot = new_bot(server, FakeBackend())
+    connect = IrcConnection.connect
+    slow = threading.Event()
+
+    def slow_connect(conn):
+        if not slow.is_set():
+            slow.set()
+            time.sleep(1.0)
+        connect(conn)
+
+    IrcConnection.connect = slow_connect
+    join_timeout, bot_logic.LISTENER_JOIN_TIMEOUT = bot_logic.LISTENER_JOIN_TIMEOUT, 0.2
+    try:
+        bot.reconnect()
+        slow.wait(2)
+        bot.reconnect()
+        check("listener back after a stuck dial", wait_for(
+            lambda: bot.status == CONNECTED and bot.connected and bot_threads().count("TwitchListener") == 1, 5),
+            f"{bot.status}, connected {bot.connected}, {bot_threads().count('TwitchListener')} listeners")
+    finally:
+        IrcConnection.connect = connect
+        bot_logic.LISTENER_JOIN_TIMEOUT = join_timeout
+    # the abandoned dial never joined; wait until the server has the new client alone
+    wait_for(lambda: sum(line.startswith("JOIN") for line in server.received) == 2 and len(server.clients) == 1, 2)
+    server.send(privmsg(0, "user0", "#bench", "still listening"))
+    check("reads chat after a stuck dial", wait_for(lambda: bot.received == 1, 2))
+    clean, took = timed_stop(bot, timeout=2.0)
+    check("stop after a stuck dial under 0.3s", clean and took < 0.3, f"{took * 1000:.0f} ms")
+    server.close()
+
+    # a PONG that cannot be sent drops the connection and reconnects
+    server = FakeIrcServer()
+    bot = new_bot(server, FakeBackend())
+    connection = bot.connection
+    send_line = connection.send_line
+
+    def broken_send(line: str) -> None:
+        if line.startswith("PONG"):
+            raise BrokenPipeError(32, "Broken pipe")
+        send_line(line)
+
+    connection.send_line = broken_send
+    server.joined.clear()
+    server.send("PING :tmi.twitch.tv\r\n")
+    # RECONNECTING lasts only a few ms against a live server, so look for the new connection
+    check("reconnects after failed send", wait_for(lambda: bot.connection is not connection, 5)
+          and bot.wait_status(CONNECTED, 5) and server.joined.wait(5), bot.status)
+
+    # a line that fails to handle is skipped; the reader keeps going
+    handle_privmsg = bot._handle_privmsg
+
+    def failing_handle(msg, received_at=0.0):
+        if msg.trailing == "bad line":
+            raise RuntimeError("handler failed")
+        handle_privmsg(msg, received_at)
+
+    bot._handle_privmsg = failing_handle
+    received = bot.received
+    server.send(privmsg(0, "user0", "#bench", "bad line") + privmsg(1, "user1", "#bench", "good line"))
+    check("line after a failing one is handled", wait_for(lambda: bot.received == received + 1, 2),
+          f"{bot.received - received} handled")
+    check("listener still running", bot.status == CONNECTED and "TwitchListener" in bot_threads())
+    clean, took = timed_stop(bot, timeout=2.0)
+    check("stop after failures under 0.3s", clean and took < 0.3, f"{took * 1000:.0f} ms")
+    server.close()
+
+    check("no bot threads left", wait_for(lambda: not bot_threads(), 1.5), ", ".join(bot_threads()))
+    # each bot subscribes itself, its normalizer and every channel's rules
+    check("no config subscriptions left", len(CONFIG_STORE._subscribers) == subscribers,
+          f"{len(CONFIG_STORE._subscribers) - subscribers} left")
+    finish()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# check_profiling.py
+"""
+Checks for the slow-message trace and the sampling profiler against a real
+TwitchBot, the local fake IRC server and FakeBackend, all headless.
+
+With a 1 ms threshold every spoken line is slow: the log must show the
+per-stage breakdown, rate limited to one line per interval. A one-shot
+capture (POST /profile) and the continuous one switched on in config must
+write profiles holding the listener's and the speech worker's stacks.
+Also prints what the trace costs per line and what sampling costs in CPU.
+Exits non-zero if any check fails.
+
+    python benchmarks/check_profiling.py
+"""
+import os
+import sys
+import json
+import tempfile
+import threading
+import time
+import urllib.request
+
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="narratorchat-bench-")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_irc import NO_ADMISSION, FakeIrcServer, privmsg, use_server
+from benchmarks.harness import check, finish, wait_for
+from NarratorChat.backends import FakeBackend
+from NarratorChat.bot_logic import CONNECTED, TwitchBot
+from NarratorChat.config import CONFIG_STORE, LOG_FILE, PROFILE_FOLDER, flush_service_log, load_config, save_config
+from NarratorChat.control import BotControl, ControlServer
+from NarratorChat.profiling import SLOW_MESSAGES, SlowMessageTracer
+from NarratorChat.speech_queue import SpeechItem
+
+
+def slow_lines() -> list[str]:
+    flush_service_log()
+    with open(LOG_FILE, encoding="utf-8") as f:
+        return [line for line in f if "Slow message" in line]
+
+
+def profiles() -> set[str]:
+    return set(os.listdir(PROFILE_FOLDER)) if os.path.isdir(PROFILE_FOLDER) else set()
+
+
+def read_folded(names: set[str]) -> str:
+    return "".join(open(os.path.join(PROFILE_FOLDER, n), encoding="utf-8").read()
+                   for n in sorted(names) if n.endswith(".folded"))
+
+
+def control_call(port: int, body: dict) -> tuple[int, bool]:
+    request = urllib.request.Request(f"http://127.0.0.1:{port}/profile", data=json.dumps(body).encode("utf-8"),
+                                     method="POST", headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return response.status, json.loads(response.read())["started"]
+
+
+def overhead() -> None:
+    tracer = SlowMessageTracer(5000)
+    fast = SpeechItem("user", "fake:natural:0", "hi", received_at=1.0,
+                      stages={"read": 0.001, "queue_wait": 0.1, "to_audio": 0.2, "speak": 0.5})
+    n = 100_000
+    start = time.perf_counter()
+    for _ in range(n):
+        tracer.observe("bench", fast)
+    under = (time.perf_counter() - start) / n
+    tracer.threshold = 0.1
+    tracer.observe("bench", fast)  # logged; the rest are rate limited
+    start = time.perf_counter()
+    for _ in range(n):
+        tracer.observe("bench", fast)
+    over = (time.perf_counter() - start) / n
+    print(f"trace cost per spoken line: {under * 1e6:.2f} us under the threshold, "
+          f"{over * 1e6:.2f} us when slow but rate limited")
+
+
+def main():
+    server = FakeIrcServer()
+    use_server(server, channel="#bench")
+    cfg = load_config()
+    cfg["admission"] = NO_ADMISSION
+    cfg["audio_cache"]["enabled"] = False
+    cfg["speech_queue"]["max_size"] = 500
+    cfg["profiling"] = {"slow_message_ms": 1, "capture": False, "capture_seconds": 1, "sample_ms": 5}
+    save_config(cfg)
+    CONFIG_STORE.reload()
+
+    backend = FakeBackend(latency=0.01, play_latency=0.02)
+    bot = TwitchBot(threading.Event(), backend)
+    bot.start()
+    check("bot connects", bot.wait_status(CONNECTED, 5))
+    control = BotControl(lambda: bot, FakeBackend())
+    api = ControlServer(control)
+    api.start()
+
+    # slow-message trace
+    server.send("".join(privmsg(i, f"user{i}", "#bench", f"slow line {i}") for i in range(20)))
+    worker = bot.channels["#bench"].speech_worker
+    check("lines spoken", wait_for(lambda: worker.spoken >= 20, 10), f"{worker.spoken} spoken")
+    lines = slow_lines()
+    check("slow line logged", len(lines) >= 1, f"{len(lines)} logged")
+    check("breakdown has every stage", bool(lines) and all(
+        stage in lines[0] for stage in ("read", "normalize", "substitute", "assign", "dispatch",
+                                        "queue_wait", "synthesize", "speak", "other")), lines[0].strip() if lines else "")
+    check("rate limited", len(lines) <= 2 and SLOW_MESSAGES.slow >= 20,
+          f"{SLOW_MESSAGES.slow} slow, {len(lines)} logged")
+
+    # one-shot capture over the control API while chat is read and spoken
+    before = profiles()
+    status, started = control_call(api.port, {"seconds": 1})
+    check("POST /profile starts a capture", status == 202 and started, f"status {status}")
+    check("second capture refused while running", control.profile(1) is False)
+    for i in range(50):
+        server.send(privmsg(100 + i, f"user{i}", "#bench", f"profiled line {i} " + "word " * 20))
+        time.sleep(0.015)
+    check("capture finished", wait_for(lambda: not bot.profiler.running, 5))
+    written = profiles() - before
+    check("profile files written", any(n.endswith(".txt") for n in written) and any(n.endswith(".folded") for n in written),
+          ", ".join(sorted(written)))
+    folded = read_folded(written)
+    check("listener stacks sampled", "TwitchListener;" in folded and "_listen_loop" in folded)
+    check("speech stacks sampled", "SpeechWorker" in folded and "_run" in folded)
+
+    # continuous capture switched on in config, as the tray menu does
+    time.sleep(1.1)  # profile names have one-second resolution
+    before = profiles()
+    check("config starts continuous profiling", control.set_profiling(True) is True
+          and wait_for(lambda: bot.profiler.running, 2))
+    check("profiles keep coming", wait_for(lambda: len(profiles() - before) >= 4, 5),
+          f"{len(profiles() - before)} files")
+    control.set_profiling(False)
+    check("config stops it", wait_for(lambda: not bot.profiler.running, 3))
+
+    # CPU the sampler takes from an idle bot
+    cpu = {}
+    for capture in (False, True):
+        if capture:
+            bot.profiler.capture(2)
+        start = time.process_time()
+        time.sleep(2)
+        cpu[capture] = time.process_time() - start
+    bot.profiler.stop()
+    print(f"idle bot CPU over 2 s: {cpu[False] * 1000:.0f} ms, {cpu[True] * 1000:.0f} ms while sampling "
+          f"every {bot.profiler.interval * 1000:g} ms")
+    overhead()
+
+    api.stop()
+    bot.stop(timeout=2.0)
+    control.close()
+    server.close()
+    finish()
+
+
+if __name__ == "__main__":
+    main()
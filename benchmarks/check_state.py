@@ -0,0 +1,122 @@
+# check_state.py
+"""
+Checks that returning chatters keep the voice they heard across restarts
+(RuntimeState.json), with per-channel voice_index shifts and a voice list
+that changes between runs. The voice catalog is not persisted, so each run
+sees the installed voices as they are.
+
+Run 1 voices chatters in two channels with different shifts and saves
+state. Each later run starts a fresh TwitchBot on a changed voice list and
+checks every chatter whose voice is still installed hears the same one in
+both channels. Then the same with the catalog persisted across runs, and
+with refresh_voices() on a running bot. Exits non-zero if any check fails.
+
+    python benchmarks/check_state.py
+"""
+import os
+import sys
+import tempfile
+import threading
+
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="narratorchat-bench-")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_irc import NO_ADMISSION, privmsg
+from benchmarks.harness import check, finish
+from NarratorChat.backends import DEFAULT_FAKE_VOICES, FakeBackend, VoiceInfo
+from NarratorChat.bot_logic import TwitchBot
+from NarratorChat.config import CONFIG_STORE, load_config, save_config
+from NarratorChat.irc import parse_message
+
+CHANNELS = ("#first", "#second")
+CHATTERS = [f"regular{i}" for i in range(40)]
+NATURAL = [v for v in DEFAULT_FAKE_VOICES if "(Natural)" in v.description]
+NEW_VOICE = VoiceInfo("fake:natural:new", "Microsoft FakeNew Online (Natural) - English")
+
+
+def new_bot(voices: list[VoiceInfo]) -> TwitchBot:
+    return TwitchBot(threading.Event(), FakeBackend(voices=voices))
+
+
+def chat(bot: TwitchBot, channel: str, username: str) -> None:
+    bot._handle_privmsg(parse_message(privmsg(0, username, channel, "hello again").rstrip("\r\n")))
+
+
+def heard(bot: TwitchBot, channel: str, username: str) -> str:
+    voices = bot.preferred_voices
+    state = bot.channels[channel]
+    idx = state.voice_overrides.get(username)
+    if idx is None:
+        idx = (bot.user_voice_index[username] + state.voice_index_shift) % len(voices)
+    return voices[idx].id
+
+
+def restart(label: str, before: dict, voices: list[VoiceInfo]) -> None:
+    bot = new_bot(voices)
+    installed = {v.id for v in voices}
+    kept = changed = 0
+    for (channel, username), voice_id in before.items():
+        chat(bot, channel, username)
+        if voice_id not in installed:
+            continue
+        if heard(bot, channel, username) == voice_id:
+            kept += 1
+        else:
+            changed += 1
+    check(f"{label}: chatters keep their voice", changed == 0 and kept > 0, f"{kept} kept, {changed} changed")
+    bot.save_state()
+
+
+def main():
+    cfg = load_config()
+    cfg["admission"] = NO_ADMISSION
+    cfg["audio_cache"]["enabled"] = False
+    cfg["voice_catalog"] = {"persist": False}
+    # default voice_index 10 shifts #first; #second has its own shift
+    cfg["irc"]["channels"] = list(CHANNELS)
+    cfg["channels"] = {"#second": {"voice_index": 3}}
+    save_config(cfg)
+    CONFIG_STORE.reload()
+
+    bot = new_bot(NATURAL)
+    before = {}
+    for i, username in enumerate(CHATTERS):
+        # every chatter is last heard in one channel, some in both
+        channels = CHANNELS if i % 3 == 0 else (CHANNELS[i % 2],)
+        for channel in channels:
+            chat(bot, channel, username)
+            before[(channel, username)] = heard(bot, channel, username)
+    check("state saved", bot.save_state())
+    shifted = sum(heard(bot, c, u) != bot.preferred_voices[bot.user_voice_index[u]].id for c, u in before)
+    check("shift changes the voice heard", shifted > 0, f"{shifted} of {len(before)}")
+
+    restart("same voices", before, NATURAL)
+    restart("voice installed", before, [NEW_VOICE] + NATURAL)
+    restart("voice removed", before, NATURAL[:3] + [NEW_VOICE] + NATURAL[4:])
+
+    # persisted catalog: voices swapped or installed between runs are still picked up
+    cfg["voice_catalog"] = {"persist": True}
+    save_config(cfg)
+    CONFIG_STORE.reload()
+    new_bot(NATURAL)
+    swapped = new_bot(NATURAL[:-1] + [NEW_VOICE])
+    check("saved catalog notices a swapped voice", NEW_VOICE in swapped.preferred_voices
+          and NATURAL[-1] not in swapped.preferred_voices)
+    bot = new_bot(NATURAL + [NEW_VOICE])
+    check("saved catalog notices an installed voice", len(bot.preferred_voices) == len(NATURAL) + 1,
+          f"{len(bot.preferred_voices)} voices")
+
+    # refresh while running: the bot switches lists, chatters keep their voice
+    for channel, username in before:
+        chat(bot, channel, username)
+    heard_before = {key: heard(bot, *key) for key in before}
+    bot.backend.voices = [NEW_VOICE] + NATURAL[1:] + [NATURAL[0]]
+    check("refresh picks up the new list", bot.refresh_voices() == len(NATURAL) + 1
+          and bot.preferred_voices[0] == NEW_VOICE)
+    changed = sum(heard(bot, *key) != voice_id for key, voice_id in heard_before.items())
+    check("refresh keeps chatter voices", changed == 0, f"{changed} of {len(heard_before)} changed")
+    finish()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# fake_irc.py
+"""Local stand-in for irc.chat.twitch.tv used by the benchmarks."""
+import os
+import sys
+import socket
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from NarratorChat.irc import LineFramer
+
+
+def privmsg(i: int, user: str, channel: str, text: str, mod: bool = False) -> str:
+    badges = "moderator/1" if mod else "subscriber/12"
+    tags = (f"@badges={badges};color=#1E90FF;display-name={user.title()};"
+            f"id=00000000-0000-0000-0000-{i:012d};mod={int(mod)};subscriber=1;"
+            f"tmi-sent-ts=1700000000000;user-type=")
+    return f"{tags} :{user}!{user}@{user}.tmi.twitch.tv PRIVMSG {channel} :{text}\r\n"
+
+
+class FakeIrcServer:
+    """
+    Accepts bot connections on localhost, records every line they send in
+    `received` and lets the caller push raw IRC traffic with send().
+    `joined` is set once a client has sent JOIN.
+    """
+
+    def __init__(self, host: str = "127.0.0.1"):
+        self.listener = socket.create_server((host, 0))
+        self.host, self.port = self.listener.getsockname()[:2]
+        self.clients: list[socket.socket] = []
+        self.received: list[str] = []
+        self.joined = threading.Event()
+        self._lock = threading.Lock()
+        self._closed = False
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def _accept_loop(self):
+        while not self._closed:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            with self._lock:
+                self.clients.append(conn)
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: socket.socket):
+        framer = LineFramer()
+        while True:
+            try:
+                data = conn.recv(65536)
+            except OSError:
+                break
+            if not data:
+                break
+            for line in framer.feed(data):
+                with self._lock:
+                    self.received.append(line)
+                if line.startswith("JOIN"):
+                    self.joined.set()
+        with self._lock:
+            if conn in self.clients:
+                self.clients.remove(conn)
+
+    def send(self, data: str | bytes) -> None:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        with self._lock:
+            clients = list(self.clients)
+        for conn in clients:
+            conn.sendall(data)
+
+    def drop_clients(self) -> None:
+        """Close every client connection, as a server restart would."""
+        with self._lock:
+            clients, self.clients = self.clients, []
+        for conn in clients:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+                conn.close()
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        self._closed = True
+        try:
+            # wakes the blocked accept(); close() alone leaves it listening on Linux
+            self.listener.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.listener.close()
+        self.drop_clients()
+
+
+# admission limits off, so every line reaches the speech queue
+NO_ADMISSION = {"messages_per_second": 0, "user_cooldown_seconds": 0,
+                "duplicate_window_seconds": 0, "max_length": 0, "max_age_seconds": 0}
+
+
+def use_server(server: FakeIrcServer, **irc) -> None:
+    """Point config.json's irc section at server (plus any overrides)."""
+    from NarratorChat.config import CONFIG_STORE, load_config, save_config
+    cfg = load_config()
+    cfg["irc"] = {**cfg["irc"], "host": server.host, "port": server.port, **irc}
+    save_config(cfg)
+    CONFIG_STORE.reload()
@@ -0,0 +1,32 @@
+# harness.py
+"""Pass/fail reporting and polling shared by the check scripts."""
+import sys
+import time
+
+
+# names of the failed check() calls, reported by finish()
+failures: list[str] = []
+
+
+def check(name: str, ok: bool, detail: str = "") -> None:
+    print(f"{'PASS' if ok else 'FAIL'}  {name}{f'  ({detail})' if detail else ''}")
+    if not ok:
+        failures.append(name)
+
+
+def wait_for(predicate, timeout: float, interval: float = 0.005) -> bool:
+    """Poll predicate until it is true (True) or timeout seconds pass (False)."""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(interval)
+    return True
+
+
+def finish() -> None:
+    """Print the check() summary and exit non-zero if any failed."""
+    if failures:
+        print(f"\n{len(failures)} check(s) failed")
+        sys.exit(1)
+    print("\nall checks passed")
@@ -0,0 +1,262 @@
+# suite.py
+"""
+Chat replay / load-generation suite for the whole receive-to-speech path.
+
+Each scenario replays IRC traffic from a local fake IRC server into a real
+TwitchBot using FakeBackend, so framing, tag parsing, substitutions, voice
+assignment, queueing and the speech worker all run as in production.
+Admission limits are turned off so every line does the full amount of work.
+
+Scenarios:
+  steady         ordinary chat from a few hundred regulars
+  raid           thousands of first-time chatters in one burst
+  emote_spam     emote-only lines repeated over and over
+  long_messages  lines near Twitch's 500 character limit
+  huge_assigned  steady chat with a 200k entry AssignedVoices.json
+  replay         raw IRC lines from --replay FILE (one message per line)
+
+For each it reports throughput, per-stage p50/p95/p99 latency and memory.
+--json writes the results for tracking between versions, and --compare
+prints the change against an earlier results file.
+
+    python benchmarks/suite.py [scenario ...] [--scale 1.0] [--latency-ms 0]
+                               [--replay FILE] [--trace-memory]
+                               [--json results.json] [--compare old.json]
+"""
+import os
+import sys
+import json
+import argparse
+import platform
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="narratorchat-bench-")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from benchmarks.fake_irc import NO_ADMISSION, FakeIrcServer, privmsg, use_server
+from NarratorChat.backends import DEFAULT_FAKE_VOICES, FakeBackend
+from NarratorChat.bot_logic import TwitchBot
+from NarratorChat.config import ASSIGNED_PATH, CONFIG_STORE, load_config, save_config
+from NarratorChat.metrics import METRICS
+
+CHANNEL = "#bench"
+EMOTES = ["LUL", "PogChamp", "KEKW", "Kappa", "monkaS", "OMEGALUL", "catJAM", "Sadge"]
+WORDS = ("the stream is great today what did he just do that play was insane "
+         "check https://example.com/clip and badword1 gg wp").split()
+
+
+def _sentence(i: int, words: int) -> str:
+    return " ".join(WORDS[(i * 7 + k * 3) % len(WORDS)] for k in range(words)) + f" {i}"
+
+
+def steady(n: int) -> tuple[list[str], dict]:
+    return [privmsg(i, f"regular{i % 300}", CHANNEL, _sentence(i, 8), mod=i % 97 == 0)
+            for i in range(n)], {}
+
+
+def raid(n: int) -> tuple[list[str], dict]:
+    lines = []
+    for i in range(n):
+        text = "RAID HYPE " + " ".join(EMOTES[:3]) if i % 2 else f"hello from raider number {i}"
+        lines.append(privmsg(i, f"raider_{i}_ÄÖ", CHANNEL, text))
+    return lines, {}
+
+
+def emote_spam(n: int) -> tuple[list[str], dict]:
+    return [privmsg(i, f"spammer{i % 50}", CHANNEL, " ".join([EMOTES[i % len(EMOTES)]] * (1 + i % 6)))
+            for i in range(n)], {}
+
+
+def long_messages(n: int) -> tuple[list[str], dict]:
+    return [privmsg(i, f"essayist{i % 40}", CHANNEL, _sentence(i, 80)[:490]) for i in range(n)], {}
+
+
+def huge_assigned(n: int) -> tuple[list[str], dict]:
+    voices = sum(v.preferred for v in DEFAULT_FAKE_VOICES)
+    assigned = {f"viewer_{i}": i % voices for i in range(200_000)}
+    # a third of the chat comes from assigned viewers
+    lines = [privmsg(i, f"viewer_{i * 613 % 200_000}" if i % 3 == 0 else f"regular{i % 300}",
+                     CHANNEL, _sentence(i, 8)) for i in range(n)]
+    return lines, assigned
+
+
+def replay(path: str, n: int) -> tuple[list[str], dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [line.rstrip("\r\n") + "\r\n" for line in f if " PRIVMSG " in line]
+    # point every recorded channel at the one the bot joined
+    out = []
+    for line in lines[:n]:
+        head, _, text = line.partition(" PRIVMSG ")
+        _, _, rest = text.partition(" ")
+        out.append(f"{head} PRIVMSG {CHANNEL} {rest}")
+    return out, {}
+
+
+SCENARIOS = {
+    "steady": (steady, 5000),
+    "raid": (raid, 3000),
+    "emote_spam": (emote_spam, 5000),
+    "long_messages": (long_messages, 1000),
+    "huge_assigned": (huge_assigned, 5000),
+}
+
+
+def _peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_scenario(name: str, lines: list[str], assigned: dict, latency: float, trace_memory: bool) -> dict:
+    with open(ASSIGNED_PATH, "w", encoding="utf-8") as f:
+        json.dump(assigned or {"chatter1": 0, "chatter2": 1}, f)
+    server = FakeIrcServer()
+    use_server(server, channel=CHANNEL)
+    cfg = load_config()
+    cfg["speech_queue"]["max_size"] = len(lines)
+    cfg["admission"] = NO_ADMISSION
+    save_config(cfg)
+    CONFIG_STORE.reload()
+
+    METRICS.reset()
+    if trace_memory:
+        tracemalloc.start()
+    bot = TwitchBot(threading.Event(), FakeBackend(latency=latency))
+    bot.start()
+    server.joined.wait(5)
+
+    payload = "".join(lines)
+    start = time.perf_counter()
+    server.send(payload)
+    deadline = start + 60
+    while time.perf_counter() < deadline:
+        stats = bot.speech_stats()
+        if stats["spoken"] + stats["filtered"] >= len(lines):
+            break
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+
+    heap_peak = None
+    if trace_memory:
+        heap_peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+    stats = bot.speech_stats()
+    bot.shutdown_event.set()
+    server.close()
+    for channel in bot.channels.values():
+        channel.speech_worker.join(2)
+
+    snapshot = METRICS.snapshot()
+    return {
+        "scenario": name,
+        "messages": len(lines),
+        "bytes": len(payload.encode("utf-8")),
+        "spoken": stats["spoken"],
+        "filtered": stats["filtered"],
+        "complete": stats["spoken"] + stats["filtered"] >= len(lines),
+        "seconds": elapsed,
+        "throughput": stats["spoken"] / elapsed if elapsed else 0.0,
+        "queue_wait_max": stats["wait_max"],
+        "max_depth": stats["max_depth"],
+        "users": stats["users"],
+        "stages": snapshot["stages"],
+        "counters": snapshot["counters"],
+        "heap_peak_mb": heap_peak,
+        "rss_peak_mb": _peak_rss_mb(),
+    }
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def print_result(r: dict) -> None:
+    memory = f"heap peak {r['heap_peak_mb']:.1f} MB" if r["heap_peak_mb"] is not None else ""
+    if r["rss_peak_mb"] is not None:
+        memory += f"{', ' if memory else ''}rss peak {r['rss_peak_mb']:.1f} MB"
+    status = "" if r["complete"] else "  (INCOMPLETE)"
+    print(f"\n{r['scenario']}: {r['spoken']}/{r['messages']} spoken, {r.get('filtered', 0)} empty, "
+          f"in {r['seconds']:.2f}s = {r['throughput']:,.0f} msg/s; {memory}{status}")
+    print(f"  {'stage':>12} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'count':>8}")
+    for stage, s in sorted(r["stages"].items()):
+        print(f"  {stage:>12} {s['p50'] * 1000:9.3f} {s['p95'] * 1000:9.3f} {s['p99'] * 1000:9.3f} {s['count']:>8}")
+
+
+def compare(old: dict, new: dict) -> None:
+    """Print throughput and p95 stage latency changes against an earlier run."""
+    before = {r["scenario"]: r for r in old.get("results", [])}
+    print(f"\ncompared with {old.get('revision') or 'previous run'}:")
+    for r in new["results"]:
+        prev = before.get(r["scenario"])
+        if prev is None or not prev["throughput"]:
+            continue
+        change = (r["throughput"] / prev["throughput"] - 1) * 100
+        print(f"  {r['scenario']:>14} throughput {change:+6.1f}%")
+        for stage, s in sorted(r["stages"].items()):
+            p95 = prev["stages"].get(stage, {}).get("p95")
+            if p95:
+                print(f"  {'':>14} {stage:>12} p95 {(s['p95'] / p95 - 1) * 100:+6.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scenarios", nargs="*", help=f"any of {', '.join(SCENARIOS)}, replay (default: all)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every scenario's message count")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="fake synthesizer latency per line")
+    parser.add_argument("--replay", help="raw IRC log to replay as the 'replay' scenario")
+    parser.add_argument("--trace-memory", action="store_true", help="track Python heap peak (slower)")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="earlier --json results to compare against")
+    args = parser.parse_args()
+
+    names = args.scenarios or list(SCENARIOS) + (["replay"] if args.replay else [])
+    results = []
+    for name in names:
+        if name == "replay":
+            if not args.replay:
+                parser.error("the replay scenario needs --replay FILE")
+            lines, assigned = replay(args.replay, int(1_000_000 * args.scale))
+        elif name in SCENARIOS:
+            make, count = SCENARIOS[name]
+            lines, assigned = make(max(1, int(count * args.scale)))
+        else:
+            parser.error(f"unknown scenario {name}")
+        result = run_scenario(name, lines, assigned, args.latency_ms / 1000, args.trace_memory)
+        results.append(result)
+        print_result(result)
+
+    report = {
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "latency_ms": args.latency_ms,
+        "scale": args.scale,
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nresults written to {args.json}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,7 @@
-import pythoncom
-import win32com.client as wincl
+from NarratorChat.backends import SapiBackend
 
 def list_natural_voices():
-    pythoncom.CoInitialize()
-    try:
-        probe = wincl.Dispatch("SAPI.SpVoice")
-        tokens = probe.GetVoices()
-        naturals = []
-        for i in range(tokens.Count):
-            desc = tokens.Item(i).GetDescription()
-            if "(Natural)" in desc:
-                naturals.append(desc)
-        return naturals
-    finally:
-        pythoncom.CoUninitialize()
+    return [v.description for v in SapiBackend().list_voices() if "(Natural)" in v.description]
 
 if __name__ == "__main__":
     for idx, name in enumerate(list_natural_voices()):
@@ -14,7 +14,7 @@ setup(
     ],
     entry_points={
         "console_scripts": [
-            # optional: you could define a CLI command here later if needed
+            "narratorchat = NarratorChat.cli:main",
         ],
     },
     python_requires=">=3.8",